@@ -0,0 +1,4 @@
+"""Benchmarks of the alignment hot paths, on synthetic inputs of given
+   durations. Run them with ``python -m benchmarks run``, and compare two
+   result files with ``python -m benchmarks compare``.
+"""
@@ -0,0 +1,116 @@
+# pylint: disable=C0103
+"""Run the benchmarks of the alignment hot paths on synthetic inputs,
+compare two result files, or measure the accuracy and the cost of
+alignment parameters on a corpus of correctly timed subtitles.
+"""
+import sys
+import argparse
+from benchmarks import suite
+from benchmarks import accuracy
+
+
+parser = argparse.ArgumentParser(
+    description=__doc__,
+    formatter_class=argparse.ArgumentDefaultsHelpFormatter
+)
+parser.add_argument("action", type=str, help="action to perform",
+                    choices=["run", "report", "compare", "accuracy"])
+parser.add_argument("files", type=str, nargs="*",
+                    help="result files to report (report), the base and new "
+                         "result files (compare), or a folder of subtitle "
+                         "files or a JSON manifest of reference and input "
+                         "files (accuracy)")
+parser.add_argument("-d", "--durations", type=float, nargs="+",
+                    help="durations of the synthetic inputs, in minutes",
+                    default=suite.DEFAULT_DURATIONS)
+parser.add_argument("-b", "--benchmarks", type=str, nargs="+",
+                    help="benchmarks to run (default: all)",
+                    choices=list(suite.CASES), default=None)
+parser.add_argument("-r", "--repeat", type=int,
+                    help="number of timed runs of each benchmark; the "
+                         "shortest one is kept",
+                    default=3)
+parser.add_argument("-vs", "--vocabulary-size", type=int,
+                    help="number of distinct words of the synthetic subtitles",
+                    default=2000, dest="vocabulary_size")
+parser.add_argument("-s", "--seed", type=int,
+                    help="seed of the synthetic inputs",
+                    default=0)
+parser.add_argument("--offset", type=float,
+                    help="offset of the synthetic input subtitles, in seconds",
+                    default=suite.DEFAULT_OFFSET)
+parser.add_argument("-tmp", "--temp-folder", type=str,
+                    help="folder where to generate the synthetic inputs",
+                    default=None, dest="temp_folder")
+parser.add_argument("-o", "--output-file", type=str,
+                    help="path to the JSON results file (run)",
+                    default="benchmark-results.json", dest="output_file")
+parser.add_argument("-t", "--threshold", type=float,
+                    help="relative change reported as slower or faster (compare)",
+                    default=suite.DEFAULT_THRESHOLD)
+parser.add_argument("-p", "--parameter", type=str, action="append",
+                    help="subalign option and its comma-separated values to "
+                         "try, such as fragment_count=5,10,20 (accuracy)",
+                    default=[], dest="parameters")
+parser.add_argument("-n", "--shifts", type=int,
+                    help="number of random shifts per corpus file (accuracy)",
+                    default=5)
+parser.add_argument("--max-shift", type=float,
+                    help="maximum absolute shift, in seconds (accuracy)",
+                    default=accuracy.DEFAULT_MAX_SHIFT, dest="max_shift")
+parser.add_argument("--slo", type=float,
+                    help="maximum absolute error of an alignment, in seconds "
+                         "(accuracy)",
+                    default=accuracy.DEFAULT_SLO)
+parser.add_argument("--slo-rate", type=float,
+                    help="share of the alignments that must meet the SLO "
+                         "(accuracy)",
+                    default=accuracy.DEFAULT_SLO_RATE, dest="slo_rate")
+parser.add_argument("-ao", "--align-options", type=str,
+                    help="options given to every alignment (accuracy)",
+                    default="-rl en -il en --no-cache", dest="align_options")
+args = parser.parse_args()
+if args.action == "compare" and len(args.files) != 2:
+    parser.error("the compare action requires two result files")
+if args.action == "accuracy" and len(args.files) != 1:
+    parser.error("the accuracy action requires a corpus folder or manifest")
+if args.action == "report" and len(args.files) == 0:
+    parser.error("the report action requires result files")
+
+if args.action == "run":
+    data = suite.run_benchmarks(
+        args.durations,
+        args.benchmarks,
+        args.repeat,
+        args.vocabulary_size,
+        args.seed,
+        args.offset,
+        args.temp_folder
+    )
+    suite.save_results(data, args.output_file)
+    print(suite.format_report(data))
+elif args.action == "report":
+    for filename in args.files:
+        print(filename)
+        print(suite.format_report(suite.load_results(filename)))
+elif args.action == "compare":
+    rows = suite.compare_results(
+        suite.load_results(args.files[0]),
+        suite.load_results(args.files[1]),
+        args.threshold
+    )
+    print(suite.format_comparison(rows))
+    sys.exit(1 if any("slower" in row[-1] for row in rows) else 0)
+elif args.action == "accuracy":
+    summaries, trials = accuracy.evaluate(
+        accuracy.list_corpus(args.files[0]),
+        accuracy.parameter_grid(args.parameters),
+        accuracy.split_options(args.align_options),
+        args.shifts,
+        args.max_shift,
+        args.seed,
+        args.slo,
+        args.temp_folder
+    )
+    suite.save_results({"summaries": summaries, "trials": trials}, args.output_file)
+    print(accuracy.format_table(summaries, args.slo, args.slo_rate))
@@ -0,0 +1,221 @@
+"""Accuracy against cost of the alignment parameters. Correctly timed
+   subtitles are shifted by known random offsets and aligned back with
+   core.align, for every set of a grid of parameters. References may be
+   subtitle files, so that no audio is needed.
+"""
+
+import os
+import math
+import time
+import shlex
+import random
+import logging
+import itertools
+import statistics
+import tempfile
+import subalign.core
+from subalign import profiling
+from subalign.batch import list_files
+from subalign.batch import read_manifest
+from subalign.batch import SUBTITLE_EXTENSIONS
+from subalign.cli import build_parser
+from subalign.subtitles import SubtitleFactory
+from subalign.subtitles import shift_subs
+
+# Maximum absolute error of a successful alignment, in seconds
+DEFAULT_SLO = .05
+
+# Share of the alignments that must be within the SLO
+DEFAULT_SLO_RATE = .95
+
+# Shifts are drawn uniformly within this many seconds in both directions
+DEFAULT_MAX_SHIFT = 30
+
+
+def list_corpus(path):
+    """Return the pairs (reference, input) of a corpus: the pairs of a JSON
+       manifest (see batch.read_manifest), or each subtitle file of a folder
+       paired with itself
+    """
+    if os.path.isfile(path):
+        return [(reference, input_file) for reference, input_file, _ in read_manifest(path)]
+    return [(filename, filename) for filename in list_files(path, SUBTITLE_EXTENSIONS)]
+
+
+def parameter_grid(specifications):
+    """Return the list of the parameter dicts of the cartesian product of
+       specifications of the form 'name=value1,value2', where names are the
+       destinations of the command line options. Values are converted with
+       the types of the options.
+    """
+    types = {
+        action.dest: action.type or str
+        for action in build_parser()._actions  # pylint: disable=W0212
+    }
+    names, values = list(), list()
+    for specification in specifications:
+        name, _, choices = specification.partition("=")
+        name = name.strip().replace("-", "_")
+        if name not in types:
+            raise ValueError("Unknown parameter '%s'" % name)
+        names.append(name)
+        values.append([types[name](value) for value in choices.split(",")])
+    return [dict(zip(names, combination)) for combination in itertools.product(*values)]
+
+
+def run_trial(base_args, reference, input_file, shift, parameters, folder):  # pylint: disable=R0913
+    """Shift the input subtitles by shift seconds, align them back on the
+       reference with parameters, and return a dict with the error of the
+       found offset (in seconds, None if the alignment failed), its
+       confidence, the wall time and the decoded audio seconds
+    """
+    factory = SubtitleFactory("utf8")
+    shifted_file = os.path.join(folder, "shifted.srt")
+    factory.write(shift_subs(factory.read(input_file), shift), shifted_file)
+    args = build_parser().parse_args(
+        ["align", reference, shifted_file] + base_args)
+    args.output_file = os.path.join(folder, "aligned.srt")
+    args.temp_folder = os.path.join(folder, "tmp")
+    for name, value in parameters.items():
+        setattr(args, name, value)
+    profiler = profiling.activate()
+    start = time.perf_counter()
+    error, confidence = None, None
+    try:
+        result = subalign.core.run_alignment(args)
+        error, confidence = result["offset"] + shift, result["confidence"]
+    except Exception:  # pylint: disable=W0703
+        logging.exception("Could not align %s on %s", input_file, reference)
+    finally:
+        profiling.deactivate()
+    return {
+        "reference": reference,
+        "input": input_file,
+        "shift": shift,
+        "error": error,
+        "confidence": confidence,
+        "seconds": time.perf_counter() - start,
+        "decoded_seconds": profiler.counters["decoded_seconds"],
+    }
+
+
+def summarize(parameters, trials, slo):
+    """Return the summary of the trials of a parameter set. Failed
+       alignments count as errors above the SLO.
+    """
+    errors = sorted(
+        math.inf if trial["error"] is None else abs(trial["error"])
+        for trial in trials
+    )
+
+    def percentile(share):
+        """Return the error below which a share of the trials fall"""
+        value = errors[min(len(errors) - 1, int(share * len(errors)))]
+        return None if math.isinf(value) else value
+
+    return {
+        "parameters": parameters,
+        "trials": len(trials),
+        "failures": sum(trial["error"] is None for trial in trials),
+        "median_error": percentile(.5),
+        "p90_error": percentile(.9),
+        "max_error": percentile(1),
+        "within_slo": sum(error <= slo for error in errors) / len(errors),
+        "seconds": statistics.mean(trial["seconds"] for trial in trials),
+        "decoded_seconds": statistics.mean(trial["decoded_seconds"] for trial in trials),
+    }
+
+
+def pareto_front(summaries):
+    """Mark the summaries that no other summary beats on cost (seconds) and
+       accuracy (share within the SLO) at once, setting their 'pareto' key
+    """
+    for summary in summaries:
+        summary["pareto"] = not any(
+            other["seconds"] <= summary["seconds"]
+            and other["within_slo"] >= summary["within_slo"]
+            and (other["seconds"] < summary["seconds"]
+                 or other["within_slo"] > summary["within_slo"])
+            for other in summaries
+        )
+    return summaries
+
+
+def evaluate(corpus, grid, base_args=None, shifts=5, max_shift=DEFAULT_MAX_SHIFT,  # pylint: disable=R0913,R0914
+             seed=0, slo=DEFAULT_SLO, folder=None):
+    """Align each pair of a corpus shifted by shifts random offsets, with
+       each parameter set of a grid. Every parameter set sees the same
+       shifts. Return a list of summaries (see summarize and pareto_front),
+       sorted by cost, and the list of all trials.
+    """
+    base_args = list() if base_args is None else base_args
+    rng = random.Random(seed)
+    jobs = [
+        (reference, input_file, round(rng.uniform(-max_shift, max_shift), 3))
+        for reference, input_file in corpus
+        for _ in range(shifts)
+    ]
+    summaries, all_trials = list(), list()
+    with tempfile.TemporaryDirectory(dir=folder) as temp_folder:
+        for parameters in grid:
+            trials = [
+                run_trial(base_args, reference, input_file, shift, parameters, temp_folder)
+                for reference, input_file, shift in jobs
+            ]
+            for trial in trials:
+                trial["parameters"] = parameters
+            summaries.append(summarize(parameters, trials, slo))
+            all_trials += trials
+    summaries.sort(key=lambda summary: summary["seconds"])
+    return pareto_front(summaries), all_trials
+
+
+def cheapest_within_slo(summaries, slo_rate=DEFAULT_SLO_RATE):
+    """Return the cheapest summary with at least a share slo_rate of the
+       trials within the SLO, or None
+    """
+    candidates = [summary for summary in summaries if summary["within_slo"] >= slo_rate]
+    if len(candidates) == 0:
+        return None
+    return min(candidates, key=lambda summary: summary["seconds"])
+
+
+def format_table(summaries, slo=DEFAULT_SLO, slo_rate=DEFAULT_SLO_RATE):
+    """Return a text table of the summaries, sorted by cost. Pareto-optimal
+       parameter sets are starred, and the cheapest one meeting the SLO is
+       pointed at.
+    """
+
+    def milliseconds(value):
+        """Format an error in milliseconds"""
+        return "fail" if value is None else "%.0f" % (value * 1000)
+
+    best = cheapest_within_slo(summaries, slo_rate)
+    lines = ["   %-50s %8s %8s %8s %9s %9s %10s" % (
+        "parameters", "med (ms)", "p90 (ms)", "max (ms)",
+        "<=%gms" % (slo * 1000), "wall (s)", "audio (s)")]
+    for summary in summaries:
+        lines.append("%s%s %-50s %8s %8s %8s %8.0f%% %9.2f %10.0f" % (
+            ">" if summary is best else " ",
+            "*" if summary["pareto"] else " ",
+            " ".join("%s=%s" % item for item in sorted(summary["parameters"].items())),
+            milliseconds(summary["median_error"]),
+            milliseconds(summary["p90_error"]),
+            milliseconds(summary["max_error"]),
+            summary["within_slo"] * 100,
+            summary["seconds"],
+            summary["decoded_seconds"],
+        ))
+    lines.append("")
+    lines.append("* Pareto-optimal on wall time and share within the SLO")
+    if best is None:
+        lines.append("No parameter set meets the SLO for %.0f%% of the trials" % (slo_rate * 100))
+    else:
+        lines.append("> Cheapest parameter set meeting the SLO for %.0f%% of the trials"
+                     % (slo_rate * 100))
+    return "\n".join(lines)
+
+
+def split_options(options):
+    """Split a string of subalign command line options"""
+    return shlex.split(options or "")
@@ -0,0 +1,125 @@
+"""Seeded generators of synthetic benchmark inputs: subtitles, transcript
+   sequences and speech-like audio, of any duration and with a known offset
+"""
+
+import wave
+import random
+import datetime
+import numpy  # pylint: disable=E0401
+from subalign.audio import SAMPLE_RATE
+from subalign.audio import SAMPLE_WIDTH
+from subalign.sequence import WordSequence
+from subalign.subtitles import Subtitle
+
+# Letters of the pseudo-words, alternating consonants and vowels
+CONSONANTS = "bcdfghjklmnprstvz"
+VOWELS = "aeiou"
+
+# Cue durations and gaps between cues (in milliseconds), and number of words
+# per cue: about ten cues of eight words per minute, as in dialogue
+CUE_DURATION = (1000, 4500)
+CUE_GAP = (200, 6000)
+CUE_WORDS = (2, 14)
+
+# Share of the words of the cues heard by speech-to-text
+TRANSCRIPT_RECALL = .5
+
+# Fundamental frequencies of the voiced segments of the audio (in Hz)
+VOICE_FREQUENCIES = (90, 260)
+
+
+def pseudo_words(size, seed=0):
+    """Return a list of size distinct pronounceable pseudo-words"""
+    rng = random.Random(seed)
+    words = list()
+    known = set()
+    while len(words) < size:
+        word = "".join(
+            rng.choice(CONSONANTS) + rng.choice(VOWELS)
+            for _ in range(rng.randint(2, 4))
+        )
+        if word not in known:
+            known.add(word)
+            words.append(word)
+    return words
+
+
+def synthetic_subtitles(minutes, vocabulary_size=2000, seed=0, offset=0):
+    """Return a list of Subtitle lasting minutes, with words drawn from a
+       vocabulary following Zipf's law, and shifted by offset seconds
+    """
+    rng = random.Random(seed)
+    words = pseudo_words(vocabulary_size, seed)
+    cumulated = numpy.cumsum(1 / numpy.arange(1, vocabulary_size + 1)).tolist()
+    delta = round(offset * 1000)
+    subs = list()
+    time = rng.randint(*CUE_GAP)
+    while time < minutes * 60000:
+        duration = rng.randint(*CUE_DURATION)
+        text = " ".join(rng.choices(words, cum_weights=cumulated, k=rng.randint(*CUE_WORDS)))
+        subs.append(Subtitle(time + delta, time + duration + delta, text.capitalize() + "."))
+        time += duration + rng.randint(*CUE_GAP)
+    return subs
+
+
+def transcript_sequence(subs, seed=0, recall=TRANSCRIPT_RECALL):
+    """Return a WordSequence imitating the speech-to-text transcript of the
+       audio of subtitles: words are spread over the duration of their cue,
+       and only a share recall of them is kept
+    """
+    rng = random.Random(seed)
+    elements = list()
+    for sub in subs:
+        words = sub.text.rstrip(".").lower().split()
+        step = (sub.end - sub.start) / len(words)
+        for i, word in enumerate(words):
+            if rng.random() < recall:
+                start = sub.start + i * step + rng.uniform(-.1, .1) * step
+                elements.append((
+                    word,
+                    datetime.timedelta(milliseconds=max(0, start)),
+                    datetime.timedelta(milliseconds=max(0, start + step)),
+                ))
+    return WordSequence.from_list(elements)
+
+
+def write_wave(filename, subs, minutes, seed=0, block_seconds=60):
+    """Write a 16kHz mono 16bit WAVE file lasting minutes, with voiced sound
+       during the subtitle cues and faint noise elsewhere. Blocks of
+       block_seconds are generated at once to bound the memory.
+    """
+    rng = numpy.random.default_rng(seed)
+    total = int(minutes * 60 * SAMPLE_RATE)
+    starts = numpy.array([sub.start for sub in subs]) * SAMPLE_RATE // 1000
+    ends = numpy.array([sub.end for sub in subs]) * SAMPLE_RATE // 1000
+    frequencies = rng.uniform(*VOICE_FREQUENCIES, size=len(subs))
+    with wave.open(filename, "wb") as file:
+        file.setnchannels(1)
+        file.setsampwidth(SAMPLE_WIDTH)
+        file.setframerate(SAMPLE_RATE)
+        for low in range(0, total, block_seconds * SAMPLE_RATE):
+            high = min(total, low + block_seconds * SAMPLE_RATE)
+            samples = rng.normal(0, 30, size=high - low)
+            first = numpy.searchsorted(ends, low)
+            last = numpy.searchsorted(starts, high)
+            for start, end, frequency in zip(
+                    starts[first:last], ends[first:last], frequencies[first:last]):
+                span = numpy.arange(max(start, low), min(end, high))
+                phase = 2 * numpy.pi * frequency * span / SAMPLE_RATE
+                envelope = 4000 * (1 + numpy.sin(2 * numpy.pi * 3 * span / SAMPLE_RATE)) / 2
+                samples[span - low] += envelope * (numpy.sin(phase) + .5 * numpy.sin(2 * phase))
+            file.writeframes(numpy.clip(samples, -32768, 32767).astype("<i2").tobytes())
+
+
+class SyntheticTranslator:
+    """Imitation of a word2word translator, so that translation benchmarks
+       run offline: known words get three uppercase translations
+    """
+
+    def __init__(self, words):
+        self.words = frozenset(words)
+
+    def __call__(self, word):
+        if word not in self.words:
+            raise KeyError(word)
+        return [word.upper(), word.upper() + "a", word.upper() + "o"]
@@ -0,0 +1,367 @@
+"""Benchmark cases, runner, and comparison of result files"""
+
+import os
+import gc
+import sys
+import json
+import math
+import time
+import platform
+import tempfile
+import functools
+import tracemalloc
+import unittest.mock
+import numpy  # pylint: disable=E0401
+import subalign
+import subalign.translate
+from subalign import profiling
+from subalign.activity import select_fragments
+from subalign.columnar import ColumnarWordSequence
+from subalign.sequence import BUCKET_WIDTHS
+from subalign.sequence import WordBucketPyramid
+from subalign.sequence import WordBucketSequence
+from subalign.sequence import WordEncoder
+from subalign.sequence import WordSequence
+from subalign.sequence import vote_offsets
+from subalign.subtitles import SubtitleFactory
+from subalign.translate import translate
+from .generators import SyntheticTranslator
+from .generators import synthetic_subtitles
+from .generators import transcript_sequence
+from .generators import write_wave
+
+# Durations of a TV episode and of a long film, in minutes
+DEFAULT_DURATIONS = [20, 180]
+
+# Language of the synthetic words (for stopwords and stemming)
+LANGUAGE = "english"
+
+# Offset of the synthetic input subtitles, in seconds
+DEFAULT_OFFSET = 42.5
+
+# Number of offsets searched at the coarsest bucket width
+MAX_ITERS = 100
+
+# Relative change of duration or memory reported by compare
+DEFAULT_THRESHOLD = .1
+
+
+class Workspace:
+    """Synthetic inputs for one duration, generated on first use and kept
+       for the following cases
+    """
+
+    def __init__(self, folder, minutes, vocabulary_size, seed, offset):
+        self.folder = folder
+        self.minutes = minutes
+        self.vocabulary_size = vocabulary_size
+        self.seed = seed
+        self.offset = offset
+
+    @functools.cached_property
+    def reference_subs(self):
+        """Subtitles matching the reference audio"""
+        return synthetic_subtitles(self.minutes, self.vocabulary_size, self.seed)
+
+    @functools.cached_property
+    def input_subs(self):
+        """Subtitles to align, shifted by the offset"""
+        return synthetic_subtitles(
+            self.minutes, self.vocabulary_size, self.seed, self.offset)
+
+    @functools.cached_property
+    def subtitle_file(self):
+        """Path to the SubRip file of the input subtitles"""
+        filename = os.path.join(self.folder, "input-%g.srt" % self.minutes)
+        SubtitleFactory("utf8").write(self.input_subs, filename)
+        return filename
+
+    @functools.cached_property
+    def reference_sequence(self):
+        """Imitation of the transcript of the reference audio"""
+        return transcript_sequence(self.reference_subs, self.seed)
+
+    @functools.cached_property
+    def input_sequence(self):
+        """WordSequence of the input subtitles"""
+        return WordSequence.from_subs(self.input_subs, LANGUAGE, False, "regex")
+
+    @functools.cached_property
+    def wave_file(self):
+        """Path to the WAVE file of the reference audio"""
+        filename = os.path.join(self.folder, "reference-%g.wav" % self.minutes)
+        write_wave(filename, self.reference_subs, self.minutes, self.seed)
+        return filename
+
+
+def case_srt_read(workspace):
+    """Parse the SubRip file of the input subtitles"""
+    filename = workspace.subtitle_file
+    factory = SubtitleFactory("utf8")
+    return lambda: factory.read(filename), len(workspace.input_subs)
+
+
+def case_srt_write(workspace):
+    """Write the input subtitles shifted back to a SubRip file"""
+    subs = workspace.input_subs
+    filename = os.path.join(workspace.folder, "output.srt")
+    factory = SubtitleFactory("utf8")
+    return lambda: factory.write(subs, filename), len(subs)
+
+
+def case_from_subs(workspace):
+    """Tokenize the input subtitles into a WordSequence"""
+    subs = workspace.input_subs
+    return lambda: WordSequence.from_subs(subs, LANGUAGE, False), len(subs)
+
+
+def case_from_subs_columnar(workspace):
+    """Tokenize the input subtitles into a ColumnarWordSequence"""
+    subs = workspace.input_subs
+    return lambda: ColumnarWordSequence.from_subs(subs, LANGUAGE, False), len(subs)
+
+
+def case_bucket_sequence(workspace):
+    """Hash the reference sequence into buckets of every width, one
+       WordBucketSequence at a time
+    """
+    sequence = workspace.reference_sequence
+    encoder = WordEncoder(LANGUAGE)
+
+    def run():
+        for width in BUCKET_WIDTHS:
+            with profiling.span("bucket_sequence %gs" % width):
+                WordBucketSequence(encoder, sequence, width, 0)
+
+    return run, len(sequence)
+
+
+def case_bucket_pyramid(workspace):
+    """Hash the reference sequence into buckets of every width through a
+       WordBucketPyramid
+    """
+    sequence = workspace.reference_sequence
+
+    def run():
+        pyramid = WordBucketPyramid(WordEncoder(LANGUAGE), sequence)
+        for width in BUCKET_WIDTHS:
+            with profiling.span("level %gs" % width):
+                pyramid.level(width)
+
+    return run, len(sequence)
+
+
+def find_offset_case(search_engine):
+    """Return a case searching the offset between the reference sequence and
+       the input sequence with a search engine. The duration of each width
+       is recorded by the instrumentation of find_offset.
+    """
+
+    def case(workspace):
+        reference, target = workspace.reference_sequence, workspace.input_sequence
+        return lambda: reference.find_offset(
+            target,
+            LANGUAGE,
+            MAX_ITERS,
+            "overlap-count",
+            search_engine,
+            encoder=WordEncoder(LANGUAGE)
+        ), len(reference) + len(target)
+
+    case.__doc__ = "Find the offset with the %s search engine" % search_engine
+    return case
+
+
+def case_vote_offsets(workspace):
+    """Vote for offsets between the reference sequence and the input sequence"""
+    reference, target = workspace.reference_sequence, workspace.input_sequence
+    return lambda: vote_offsets(
+        WordEncoder(LANGUAGE), reference, target), len(reference) + len(target)
+
+
+def case_translate(workspace):
+    """Translate the input sequence with an offline imitation of word2word"""
+    sequence = workspace.input_sequence
+    translator = SyntheticTranslator(list(sequence.words())[::2])
+
+    def run():
+        with unittest.mock.patch.dict(subalign.translate.TRANSLATORS, {("xx", "yy"): translator}):
+            translate(sequence, "xx", "yy")
+
+    return run, len(sequence)
+
+
+def case_select_fragments(workspace):
+    """Select speech fragments of the reference audio by voice activity"""
+    filename = workspace.wave_file
+    return lambda: select_fragments(filename, 60, 10), workspace.minutes * 60
+
+
+# Benchmark cases by name. A case builds a pair (function, items) from a
+# Workspace: the function to time, and the number of items it processes.
+CASES = {
+    "srt_read": case_srt_read,
+    "srt_write": case_srt_write,
+    "from_subs": case_from_subs,
+    "from_subs_columnar": case_from_subs_columnar,
+    "bucket_sequence": case_bucket_sequence,
+    "bucket_pyramid": case_bucket_pyramid,
+    "find_offset": find_offset_case("bruteforce"),
+    "find_offset_fft": find_offset_case("fft"),
+    "vote_offsets": case_vote_offsets,
+    "translate": case_translate,
+    "select_fragments": case_select_fragments,
+}
+
+
+def measure(function, repeat):
+    """Run a function repeat times, and return the shortest duration (in
+       seconds), the durations of the spans it recorded during that run
+       (see profiling), and the peak memory allocated by an extra run (in
+       bytes, as traced by tracemalloc)
+    """
+    best, spans = None, None
+    for _ in range(repeat):
+        gc.collect()
+        profiler = profiling.activate()
+        start = time.perf_counter()
+        try:
+            function()
+        finally:
+            seconds = time.perf_counter() - start
+            profiling.deactivate()
+        if best is None or seconds < best:
+            best = seconds
+            spans = {name: total for name, _, _, total in profiler.summary()[0]}
+    gc.collect()
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, spans, peak
+
+
+def run_benchmarks(durations=None, names=None, repeat=3, vocabulary_size=2000,  # pylint: disable=R0913
+                   seed=0, offset=DEFAULT_OFFSET, folder=None):
+    """Run benchmark cases (all of them if names is None) on synthetic
+       inputs of each duration (in minutes), and return a results dict
+    """
+    durations = DEFAULT_DURATIONS if durations is None else durations
+    names = list(CASES) if names is None else names
+    results = list()
+    with tempfile.TemporaryDirectory(dir=folder) as temp_folder:
+        for minutes in durations:
+            workspace = Workspace(temp_folder, minutes, vocabulary_size, seed, offset)
+            for name in names:
+                function, items = CASES[name](workspace)
+                seconds, spans, peak = measure(function, repeat)
+                results.append({
+                    "benchmark": name,
+                    "minutes": minutes,
+                    "items": items,
+                    "seconds": seconds,
+                    "items_per_second": items / seconds if seconds > 0 else None,
+                    "peak_memory": peak,
+                    "spans": spans,
+                })
+                print(
+                    "%-20s %6g min %10.4f s %12.0f items/s %10.1f MiB" % (
+                        name, minutes, seconds,
+                        results[-1]["items_per_second"] or 0,
+                        peak / 2 ** 20),
+                    file=sys.stderr
+                )
+    return {
+        "subalign": subalign.__version__,
+        "python": platform.python_version(),
+        "numpy": numpy.__version__,
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "vocabulary_size": vocabulary_size,
+        "seed": seed,
+        "offset": offset,
+        "results": results,
+    }
+
+
+def scaling_exponent(results):
+    """Return the exponent k such that the duration of a benchmark grows as
+       minutes ** k between its shortest and its longest input, or None if
+       it ran on a single duration
+    """
+    results = sorted(results, key=lambda result: result["minutes"])
+    first, last = results[0], results[-1]
+    if first["minutes"] == last["minutes"] or first["seconds"] <= 0:
+        return None
+    return math.log(last["seconds"] / first["seconds"])\
+        / math.log(last["minutes"] / first["minutes"])
+
+
+def format_report(data):
+    """Return a text table of the durations of each benchmark, with one
+       column per input duration and the scaling exponent
+    """
+    durations = sorted({result["minutes"] for result in data["results"]})
+    by_name = dict()
+    for result in data["results"]:
+        by_name.setdefault(result["benchmark"], list()).append(result)
+    lines = ["%-20s" % "benchmark" + "".join(
+        "%12s" % ("%g min (s)" % minutes) for minutes in durations) + "%10s" % "scaling"]
+    for name, results in by_name.items():
+        seconds = {result["minutes"]: result["seconds"] for result in results}
+        exponent = scaling_exponent(results)
+        lines.append("%-20s" % name + "".join(
+            "%12.4f" % seconds[minutes] if minutes in seconds else "%12s" % "-"
+            for minutes in durations
+        ) + ("%10s" % "-" if exponent is None else "%10.2f" % exponent))
+    return "\n".join(lines)
+
+
+def compare_results(base, new, threshold=DEFAULT_THRESHOLD):
+    """Compare two results dicts. Return a list of rows (benchmark, minutes,
+       duration ratio, memory ratio, verdict), the ratios being new over
+       base, for the cases run in both
+    """
+    base_results = {
+        (result["benchmark"], result["minutes"]): result
+        for result in base["results"]
+    }
+    rows = list()
+    for result in new["results"]:
+        key = (result["benchmark"], result["minutes"])
+        if key not in base_results:
+            continue
+        time_ratio = result["seconds"] / max(base_results[key]["seconds"], 1e-9)
+        memory_ratio = result["peak_memory"] / max(base_results[key]["peak_memory"], 1)
+        verdict = ""
+        if time_ratio > 1 + threshold:
+            verdict = "slower"
+        elif time_ratio < 1 / (1 + threshold):
+            verdict = "faster"
+        if memory_ratio > 1 + threshold:
+            verdict = (verdict + " more memory").strip()
+        rows.append(key + (time_ratio, memory_ratio, verdict))
+    return rows
+
+
+def format_comparison(rows):
+    """Return a text table of compared results"""
+    lines = ["%-20s %8s %10s %10s  %s" % ("benchmark", "minutes", "time", "memory", "")]
+    for name, minutes, time_ratio, memory_ratio, verdict in rows:
+        lines.append("%-20s %8g %9.2fx %9.2fx  %s" % (
+            name, minutes, time_ratio, memory_ratio, verdict))
+    return "\n".join(lines)
+
+
+def load_results(filename):
+    """Read a results file"""
+    with open(filename, "r", encoding="utf8") as file:
+        return json.load(file)
+
+
+def save_results(data, filename):
+    """Write a results file"""
+    with open(filename, "w", encoding="utf8") as file:
+        json.dump(data, file, indent=4)
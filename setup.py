@@ -41,6 +41,7 @@ setup(
     ],
     install_requires=[
         "nltk",
+        "numpy",
         "pocketsphinx",
         "word2word"
     ],
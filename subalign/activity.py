@@ -0,0 +1,108 @@
+"""Voice activity detection, to select the audio fragments worth decoding"""
+
+import logging
+import numpy  # pylint: disable=E0401
+from .audio import open_audio
+from . import profiling
+
+# Number of samples per analysis frame (30ms at 16kHz)
+FRAME_SIZE = 480
+FRAME_DURATION = FRAME_SIZE / 16000
+
+# Number of frames processed at once
+BLOCK_FRAMES = 2000
+
+# Frames whose zero-crossing rate is above this are considered as noise
+MAX_SPEECH_CROSSING_RATE = .25
+
+# Relative position of the activity threshold between the noise floor
+# (20th percentile) and the loud level (95th percentile) of the log energy
+ENERGY_THRESHOLD = .3
+
+
+def activity_envelope(audio):
+    """Compute the log-energy and the zero-crossing rate of each frame of an
+       audio file name or audio source (see audio.open_audio). Return two
+       NumPy arrays.
+    """
+    energies, crossings = list(), list()
+    frame_bytes = 2 * FRAME_SIZE
+    with open_audio(audio) as source:
+        for block in source.iter_blocks(frame_bytes * BLOCK_FRAMES):
+            samples = numpy.frombuffer(
+                block[:len(block) // frame_bytes * frame_bytes],
+                dtype="<i2"
+            ).astype(numpy.float32).reshape(-1, FRAME_SIZE)
+            block.release()
+            energies.append(numpy.log10(1 + numpy.mean(samples ** 2, axis=1)))
+            crossings.append(numpy.mean(
+                numpy.diff(numpy.signbit(samples), axis=1), axis=1))
+    if len(energies) == 0:
+        return numpy.zeros(0), numpy.zeros(0)
+    return numpy.concatenate(energies), numpy.concatenate(crossings)
+
+
+def speech_activity(energies, crossings):
+    """Return a boolean NumPy array telling which frames are likely to
+       contain speech: loud enough, with a speech-like zero-crossing rate.
+    """
+    if len(energies) == 0:
+        return numpy.zeros(0, dtype=bool)
+    floor, ceiling = numpy.percentile(energies, [20, 95])
+    threshold = floor + ENERGY_THRESHOLD * (ceiling - floor)
+    return (energies > threshold) & (crossings < MAX_SPEECH_CROSSING_RATE)
+
+
+def dialogue_activity(sequence, frame_count):
+    """Return a boolean NumPy array telling which frames are covered by a
+       word of a sequence
+    """
+    changes = numpy.zeros(frame_count + 1, dtype=int)
+    for _, start, end in sequence.iter_groups():
+        first = min(frame_count, max(0, int(start / FRAME_DURATION)))
+        last = min(frame_count, max(0, int(end / FRAME_DURATION) + 1))
+        changes[first] += 1
+        changes[last] -= 1
+    return numpy.cumsum(changes)[:-1] > 0
+
+
+def rank_windows(activity, window_frames, hop_frames):
+    """Score every window of window_frames frames, starting every hop_frames
+       frames, by its density of active frames. Return two NumPy arrays:
+       window first frames and scores.
+    """
+    cumulated = numpy.concatenate(([0], numpy.cumsum(activity)))
+    firsts = numpy.arange(0, max(1, len(activity) - window_frames + 1), hop_frames)
+    lasts = numpy.minimum(firsts + window_frames, len(activity))
+    return firsts, (cumulated[lasts] - cumulated[firsts]) / window_frames
+
+
+@profiling.profiled
+def select_fragments(audio, fragment_count, fragment_duration,
+                     sequence=None, dialogue_weight=0):
+    """Select the fragment_count non-overlapping windows of an audio file
+       name or audio source with the highest speech density, optionally mixed with the dialogue
+       density of a subtitle sequence. Return their anchors as byte offsets
+       in the data chunk, in increasing order.
+    """
+    logging.info("Selecting speech fragments of %s", audio)
+    energies, crossings = activity_envelope(audio)
+    density = speech_activity(energies, crossings).astype(float)
+    if sequence is not None and dialogue_weight > 0:
+        density = (1 - dialogue_weight) * density\
+            + dialogue_weight * dialogue_activity(sequence, len(density))
+    window_frames = max(1, int(round(fragment_duration / FRAME_DURATION)))
+    firsts, scores = rank_windows(density, window_frames, max(1, window_frames // 2))
+    selection = list()
+    for index in numpy.argsort(-scores, kind="stable"):
+        first = firsts[index]
+        if all(abs(first - other) >= window_frames for other in selection):
+            selection.append(first)
+            logging.debug(
+                "Selected fragment at %.2fs (density: %.2f)",
+                first * FRAME_DURATION,
+                scores[index]
+            )
+        if len(selection) == fragment_count:
+            break
+    return sorted(int(first) * FRAME_SIZE * 2 for first in selection)
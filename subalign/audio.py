@@ -0,0 +1,194 @@
+"""Audio input for speech-to-text"""
+
+import os
+import mmap
+import struct
+import logging
+from .extract import probe_duration
+from .extract import check_stream
+from .extract import stream_audio_for_stt
+
+# CMUSphinx input format: 16kHz sampling frequency, mono, 16bit PCM
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+BYTE_RATE = SAMPLE_RATE * SAMPLE_WIDTH
+
+# WAVE audio format codes
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def find_wave_data(buffer):
+    """Scan the chunks of a RIFF/WAVE buffer, check that its format is the
+       CMUSphinx input format, and return the (start, end) byte positions of
+       its data chunk. Raise a ValueError if the buffer is not supported.
+    """
+    if len(buffer) < 12 or bytes(buffer[0:4]) != b"RIFF" or bytes(buffer[8:12]) != b"WAVE":
+        raise ValueError("Not a RIFF/WAVE file")
+    position, fmt = 12, None
+    while position + 8 <= len(buffer):
+        chunk_id = bytes(buffer[position:position + 4])
+        chunk_size, = struct.unpack("<I", buffer[position + 4:position + 8])
+        start = position + 8
+        if chunk_id == b"fmt ":
+            if chunk_size < 16 or start + 16 > len(buffer):
+                raise ValueError("Truncated WAVE fmt chunk")
+            fmt = struct.unpack("<HHIIHH", buffer[start:start + 16])
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("WAVE data chunk found before fmt chunk")
+            audio_format, channels, sample_rate, _, block_align, bits = fmt
+            if (audio_format not in (WAVE_FORMAT_PCM, WAVE_FORMAT_EXTENSIBLE)
+                    or channels != 1
+                    or sample_rate != SAMPLE_RATE
+                    or block_align != SAMPLE_WIDTH
+                    or bits != 8 * SAMPLE_WIDTH):
+                raise ValueError(
+                    "Unsupported WAVE format (format %d, %d channel(s), %dHz, %d bits)"
+                    % (audio_format, channels, sample_rate, bits))
+            # Streamed files may have a placeholder or truncated data size
+            end = min(len(buffer), start + chunk_size)
+            return start, start + (end - start) // SAMPLE_WIDTH * SAMPLE_WIDTH
+        position = start + chunk_size + chunk_size % 2
+    raise ValueError("No WAVE data chunk found")
+
+
+class WaveFile:
+    """Memory-mapped 16kHz mono 16bit PCM WAVE file, exposing its samples as
+       a zero-copy memoryview
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.file = open(filename, "rb")  # pylint: disable=R1732
+        try:
+            self.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            self.file.close()
+            raise
+        try:
+            start, end = find_wave_data(self.mmap)
+        except ValueError:
+            self.mmap.close()
+            self.file.close()
+            raise
+        self.data = memoryview(self.mmap)[start:end]
+        logging.debug(
+            "Mapped %s (%.2fs of audio)",
+            os.path.realpath(filename),
+            self.duration()
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self):
+        """Release the memory map and the file"""
+        self.data.release()
+        self.mmap.close()
+        self.file.close()
+
+    def bytesize(self):
+        """Return the size of the audio data in bytes"""
+        return len(self.data)
+
+    def duration(self):
+        """Return the duration of the audio data in seconds"""
+        return len(self.data) / BYTE_RATE
+
+    def fragment(self, anchor, duration):
+        """Return a memoryview on the samples starting at byte anchor (rounded
+           down to a sample boundary) and lasting duration seconds
+        """
+        start = anchor // SAMPLE_WIDTH * SAMPLE_WIDTH
+        end = min(len(self.data), start + int(duration * SAMPLE_RATE) * SAMPLE_WIDTH)
+        return self.data[start:end]
+
+    def iter_blocks(self, block_size):
+        """Iterate over the samples as memoryviews of block_size bytes (the
+           last one may be shorter)
+        """
+        for start in range(0, len(self.data), block_size):
+            yield self.data[start:start + block_size]
+
+    def __str__(self):
+        return os.path.realpath(self.filename)
+
+
+class FFmpegAudio:
+    """Audio track of a media file, decoded on demand by FFMPEG into the
+       CMUSphinx input format through a pipe, without intermediate files.
+       It exposes the same interface as WaveFile, and can be sent to worker
+       processes.
+    """
+
+    def __init__(self, ffmpeg, source, track_id=None):
+        self.ffmpeg = ffmpeg
+        self.source = source
+        self.track_id = track_id
+        self.seconds = probe_duration(ffmpeg, source)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self):
+        """Nothing to release: FFMPEG processes only live during one call"""
+
+    def bytesize(self):
+        """Return the size of the decoded audio data in bytes"""
+        return int(self.seconds * SAMPLE_RATE) * SAMPLE_WIDTH
+
+    def duration(self):
+        """Return the duration of the audio data in seconds"""
+        return self.seconds
+
+    def fragment(self, anchor, duration):
+        """Return the samples starting at byte anchor (rounded down to a
+           sample boundary) and lasting duration seconds. FFMPEG only decodes
+           that time range, seeking the input.
+        """
+        start = anchor // SAMPLE_WIDTH * SAMPLE_WIDTH / BYTE_RATE
+        process = stream_audio_for_stt(self.ffmpeg, self.source, self.track_id, start, duration)
+        samples, stderr = process.communicate()
+        check_stream(process, stderr)
+        return memoryview(samples[:len(samples) // SAMPLE_WIDTH * SAMPLE_WIDTH])
+
+    def iter_blocks(self, block_size):
+        """Iterate over the whole decoded audio by blocks of block_size bytes
+           (the last one may be shorter). Raise a ValueError if FFMPEG fails.
+        """
+        process = stream_audio_for_stt(self.ffmpeg, self.source, self.track_id)
+        try:
+            while True:
+                block = process.stdout.read(block_size)
+                if not block:
+                    break
+                yield memoryview(block)
+            stderr = process.stderr.read()
+            process.wait()
+            check_stream(process, stderr)
+        finally:
+            process.stdout.close()
+            process.stderr.close()
+            process.kill()
+            process.wait()
+
+    def __str__(self):
+        if self.track_id is None:
+            return os.path.realpath(self.source)
+        return "%s (track %d)" % (os.path.realpath(self.source), self.track_id)
+
+
+def open_audio(audio):
+    """Return an audio source: a WaveFile if audio is a filename, audio
+       itself otherwise
+    """
+    if isinstance(audio, str):
+        return WaveFile(audio)
+    return audio
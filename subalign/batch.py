@@ -0,0 +1,80 @@
+"""Tools to gather the reference/input file pairs of a batch alignment"""
+
+import os
+import re
+import json
+import logging
+
+VIDEO_EXTENSIONS = frozenset([".mkv", ".mp4", ".avi", ".mov", ".m4v", ".webm", ".wav"])
+SUBTITLE_EXTENSIONS = frozenset([".srt"])
+
+# Season and episode numbers, such as S01E02, s1.e2 or 1x02
+EPISODE_PATTERN = re.compile(r"[sS](\d{1,2})[ ._-]?[eE](\d{1,3})|\b(\d{1,2})x(\d{2,3})\b")
+
+# Trailing language tag of a subtitle file name, such as '.fr' or '-en'
+LANGUAGE_TAG_PATTERN = re.compile(r"[ ._-][a-zA-Z]{2}$")
+
+
+def pair_key(filename):
+    """Return the key matching a video file and its subtitles: the season
+       and episode numbers if the file name has them, otherwise the lower
+       case file name without extension and language tag
+    """
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    match = EPISODE_PATTERN.search(stem)
+    if match is not None:
+        numbers = [group for group in match.groups() if group is not None]
+        return tuple(map(int, numbers))
+    return LANGUAGE_TAG_PATTERN.sub("", stem).lower()
+
+
+def list_files(folder, extensions):
+    """Return the sorted paths of the files of a folder with given extensions"""
+    return sorted(
+        os.path.join(folder, filename)
+        for filename in os.listdir(folder)
+        if os.path.splitext(filename)[1].lower() in extensions
+    )
+
+
+def match_pairs(reference_folder, input_folder):
+    """Match the video files of a folder with the subtitle files of another
+       (see pair_key). Return a sorted list of pairs (reference, input).
+    """
+    references = dict()
+    for filename in list_files(reference_folder, VIDEO_EXTENSIONS):
+        key = pair_key(filename)
+        if key in references:
+            logging.warning("Ignoring %s: same episode as %s", filename, references[key])
+            continue
+        references[key] = filename
+    pairs = list()
+    for filename in list_files(input_folder, SUBTITLE_EXTENSIONS):
+        reference = references.pop(pair_key(filename), None)
+        if reference is None:
+            logging.warning("No reference file found for %s", filename)
+            continue
+        pairs.append((reference, filename))
+    for filename in references.values():
+        logging.warning("No input file found for %s", filename)
+    return sorted(pairs)
+
+
+def read_manifest(filename):
+    """Read a JSON manifest: a list of objects with 'reference', 'input' and
+       optionally 'output' paths, relative to the manifest folder. Return a
+       list of triples (reference, input, output), output being None if it
+       is not given.
+    """
+    folder = os.path.dirname(os.path.abspath(filename))
+    with open(filename, "r", encoding="utf8") as file:
+        entries = json.load(file)
+    triples = list()
+    for entry in entries:
+        if "reference" not in entry or "input" not in entry:
+            raise ValueError("Manifest entries need 'reference' and 'input' paths")
+        triples.append(tuple(
+            None if entry.get(field) is None else os.path.join(folder, entry[field])
+            for field in ["reference", "input", "output"]
+        ))
+    return triples
@@ -0,0 +1,206 @@
+"""Persistent, content-addressed cache for the outputs of the pipeline stages"""
+
+import os
+import re
+import json
+import time
+import shutil
+import hashlib
+import logging
+import contextlib
+from . import profiling
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt  # pylint: disable=E0401
+
+# Size of the chunks read when hashing a file
+HASH_CHUNK_SIZE = 1 << 20
+
+# Files of the cache folder storing entries (see Cache.path)
+ENTRY_PATTERN = re.compile(r"^[0-9a-f]{64}-")
+
+# Seconds after which an entry file missing from the index is removed, as
+# another process may be about to add it
+ORPHAN_GRACE = 3600
+
+
+@contextlib.contextmanager
+def lock_file(path):
+    """Context manager holding an exclusive lock on a file, shared by the
+       processes of the machine
+    """
+    with open(path, "a+b") as file:
+        if fcntl is not None:
+            fcntl.flock(file, fcntl.LOCK_EX)
+        else:
+            file.seek(0)
+            msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(file, fcntl.LOCK_UN)
+            else:
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class Cache:
+    """Folder of files addressed by keys derived from the content of the
+       input files and the parameters of the stage producing them. The total
+       size is bounded by evicting the least recently used entries. Several
+       processes may share a cache: the index is read again and updated
+       under a file lock before each write (see update_index).
+    """
+
+    INDEX_FILENAME = "index.json"
+    LOCK_FILENAME = "index.lock"
+
+    def __init__(self, folder, max_size):
+        self.folder = folder
+        self.max_size = max_size
+        os.makedirs(folder, exist_ok=True)
+        self.index = self.read_index()
+
+    def read_index(self):
+        """Return the index stored in the cache folder, or an empty one"""
+        index_path = os.path.join(self.folder, Cache.INDEX_FILENAME)
+        if os.path.isfile(index_path):
+            try:
+                with open(index_path, "r", encoding="utf8") as file:
+                    return json.load(file)
+            except (OSError, ValueError):
+                logging.warning("Ignoring corrupted cache index %s", index_path)
+        return {"entries": dict(), "hashes": dict()}
+
+    @contextlib.contextmanager
+    def update_index(self):
+        """Context manager yielding the latest index under the lock of the
+           cache folder, and saving it on exit, so that the changes of
+           concurrent processes are merged instead of overwritten
+        """
+        with lock_file(os.path.join(self.folder, Cache.LOCK_FILENAME)):
+            self.index = self.read_index()
+            yield self.index
+            self.save_index()
+
+    def save_index(self):
+        """Atomically write the index to the cache folder"""
+        index_path = os.path.join(self.folder, Cache.INDEX_FILENAME)
+        temp_path = "%s.%d" % (index_path, os.getpid())
+        with open(temp_path, "w", encoding="utf8") as file:
+            json.dump(self.index, file)
+        os.replace(temp_path, index_path)
+
+    def file_hash(self, filename):
+        """Return the SHA-256 digest of a file content. Digests are memoized
+           by path, size and modification time.
+        """
+        path = os.path.realpath(filename)
+        stat = os.stat(path)
+        memo = self.index["hashes"].get(path)
+        if memo is not None and memo[:2] == [stat.st_size, stat.st_mtime_ns]:
+            return memo[2]
+        logging.debug("Hashing %s", path)
+        digest = hashlib.sha256()
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        with self.update_index() as index:
+            index["hashes"][path] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+        return digest.hexdigest()
+
+    def key(self, *parts):
+        """Return the key for a stage output, from JSON serializable parts"""
+        return hashlib.sha256(json.dumps(parts).encode("utf8")).hexdigest()
+
+    def path(self, key, filename):
+        """Return the path where an entry is stored. The original file name
+           is kept as a suffix for readability.
+        """
+        return os.path.join(self.folder, "%s-%s" % (key, os.path.basename(filename)))
+
+    def get(self, key, filename):
+        """Return the path of a cached entry, or None if it is missing"""
+        path = self.path(key, filename)
+        with self.update_index() as index:
+            entry = index["entries"].get(key)
+            if entry is None or not os.path.isfile(path):
+                return None
+            entry["used"] = time.time()
+        return path
+
+    def put(self, key, filename):
+        """Copy a file into the cache as the entry for key, and evict least
+           recently used entries if the cache is too large
+        """
+        path = self.path(key, filename)
+        shutil.copyfile(filename, path)
+        with self.update_index() as index:
+            index["entries"][key] = {
+                "path": path,
+                "size": os.path.getsize(path),
+                "used": time.time(),
+            }
+            self.evict(keep=key)
+            self.remove_orphans()
+        return path
+
+    def size(self):
+        """Return the total size of the cached entries in bytes"""
+        return sum(entry["size"] for entry in self.index["entries"].values())
+
+    def evict(self, keep=None):
+        """Remove least recently used entries, except keep, until the cache
+           size fits its maximum size
+        """
+        total = self.size()
+        for key, entry in sorted(self.index["entries"].items(),
+                                 key=lambda item: item[1]["used"]):
+            if total <= self.max_size:
+                break
+            if key == keep:
+                continue
+            logging.debug("Evicting %s from cache", entry["path"])
+            if os.path.isfile(entry["path"]):
+                os.remove(entry["path"])
+            total -= entry["size"]
+            del self.index["entries"][key]
+
+    def remove_orphans(self):
+        """Remove the entry files missing from the index, such as those lost
+           by earlier versions sharing a cache between processes, once they
+           are older than ORPHAN_GRACE seconds
+        """
+        paths = {os.path.realpath(entry["path"]) for entry in self.index["entries"].values()}
+        limit = time.time() - ORPHAN_GRACE
+        for item in os.scandir(self.folder):
+            if (ENTRY_PATTERN.match(item.name) and item.is_file()
+                    and os.path.realpath(item.path) not in paths
+                    and item.stat().st_mtime < limit):
+                logging.debug("Removing orphan %s from cache", item.path)
+                os.remove(item.path)
+
+
+def run_stage(cache, key_parts, filename, build, load):
+    """Run a pipeline stage through a cache (which may be None). If the cache
+       holds an entry for key_parts, it is read with load(path). Otherwise,
+       build(filename) computes the stage output, writes it to filename and
+       returns it, and the file is added to the cache.
+    """
+    name = "stage %s" % os.path.basename(filename)
+    if cache is None:
+        with profiling.span(name, cached=False):
+            return build(filename)
+    key = cache.key(*key_parts)
+    path = cache.get(key, filename)
+    if path is not None:
+        logging.info("Using cached %s", path)
+        with profiling.span(name, cached=True):
+            return load(path)
+    with profiling.span(name, cached=False):
+        result = build(filename)
+    cache.put(key, filename)
+    return result
@@ -0,0 +1,188 @@
+"""Command line arguments of the actions"""
+
+import os
+import argparse
+from .tokens import TOKENIZERS
+from .svg import PLOT_UNITS
+
+# Default folder of the persistent cache, shared by the runs of the user
+DEFAULT_CACHE_FOLDER = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "subalign"
+)
+
+
+def build_parser(description=None):
+    """Return the argument parser of the command line interface"""
+    parser = argparse.ArgumentParser(
+        description=description,
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("action", type=str, help="action to perform",
+                        choices=["align", "plot", "index", "batch", "serve"])
+    parser.add_argument("reference_file", type=str, nargs="?",
+                        help="path to the reference video or subtitle file (align), "
+                             "to the reference subtitle file (plot, or video with --curve), "
+                             "or to the reference folder or JSON manifest (batch)")
+    parser.add_argument("input_file", type=str, nargs="?",
+                        help="path to the input subtitle file (align and plot), "
+                             "or to the input folder (batch)")
+    parser.add_argument("-o", "--output-file", type=str,
+                        help="path to the output subtitle file",
+                        default="subtitles-aligned.srt", dest="output_file")
+    parser.add_argument("-of", "--output-folder", type=str,
+                        help="path to the output subtitle folder (batch)",
+                        default="aligned", dest="output_folder")
+    parser.add_argument("--summary-file", type=str,
+                        help="path to the JSON summary of the alignments (batch)",
+                        default="batch-summary.json", dest="summary_file")
+    parser.add_argument("--host", type=str,
+                        help="address the server listens on (serve)",
+                        default="127.0.0.1")
+    parser.add_argument("--port", type=int,
+                        help="port the server listens on (serve)",
+                        default=8765)
+    parser.add_argument("--queue-size", type=int,
+                        help="maximum number of requests waiting for a worker (serve)",
+                        default=16, dest="queue_size")
+    parser.add_argument("-rl", "--reference-language", type=str,
+                        help="reference file language (ISO 639-1)",
+                        default="en", dest="reference_language")
+    parser.add_argument("-il", "--input-language", type=str,
+                        help="input file language (ISO 639-1)",
+                        default="fr", dest="input_language")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="display debug information")
+    parser.add_argument("--mkvmerge", type=str,
+                        help="path to MKVMerge executable",
+                        default="mkvmerge")
+    parser.add_argument("--mkvextract", type=str,
+                        help="path to MKVExtract executable",
+                        default="mkvextract")
+    parser.add_argument("--ffmpeg", type=str,
+                        help="path to FFMPEG executable",
+                        default="ffmpeg")
+    parser.add_argument("-sa", "--stream-audio", action="store_true",
+                        help="decode speech-to-text fragments directly from the "
+                             "reference file with FFMPEG, without temporary audio files",
+                        dest="stream_audio")
+    parser.add_argument("-fc", "--fragment-count", type=int,
+                        help="number of speech-to-text extracted fragment",
+                        default=10, dest="fragment_count")
+    parser.add_argument("-fd", "--fragment-duration", type=int,
+                        help="duration of one speech-to-text fragment in seconds",
+                        default=5, dest="fragment_duration")
+    parser.add_argument("-fs", "--fragment-selection", type=str,
+                        help="placement of speech-to-text fragments: evenly spaced, "
+                             "or on the windows with the most voice activity",
+                        choices=["uniform", "vad"],
+                        default="uniform", dest="fragment_selection")
+    parser.add_argument("-dw", "--dialogue-weight", type=float,
+                        help="weight of the input subtitles dialogue density when "
+                             "selecting fragments with voice activity detection",
+                        default=0, dest="dialogue_weight")
+    parser.add_argument("-ad", "--adaptive", action="store_true",
+                        help="stop speech-to-text once the offset is clearly "
+                             "found; fragment count becomes a maximum")
+    parser.add_argument("-cr", "--confidence-ratio", type=float,
+                        help="minimum ratio between the best and the runner-up "
+                             "offset votes for the adaptive mode to stop",
+                        default=2, dest="confidence_ratio")
+    parser.add_argument("-kd", "--keyword-decoding", action="store_true",
+                        help="only spot the words of the input subtitles during "
+                             "speech-to-text, instead of using the full language model",
+                        dest="keyword_decoding")
+    parser.add_argument("-j", "--jobs", type=int,
+                        help="number of processes decoding speech-to-text "
+                             "fragments, or aligning pairs (batch and serve)",
+                        default=1)
+    parser.add_argument("-mi", "--max-iters", type=int,
+                        help="maximum iterations for one round of alignment",
+                        default=100, dest="max_iters")
+    parser.add_argument("-tmp", "--temp_folder", type=str,
+                        help="path to the temporary folder",
+                        default="tmp")
+    parser.add_argument("--cache-folder", type=str,
+                        help="path to the persistent cache of transcripts and "
+                             "word sequences",
+                        default=DEFAULT_CACHE_FOLDER, dest="cache_folder")
+    parser.add_argument("--cache-size", type=int,
+                        help="maximum size of the cache in megabytes",
+                        default=4096, dest="cache_size")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="disable the persistent cache",
+                        dest="no_cache")
+    parser.add_argument("--cache-audio", action="store_true",
+                        help="also cache the audio converted for speech-to-text, "
+                             "which is as large as the uncompressed audio track",
+                        dest="cache_audio")
+    parser.add_argument("-rr", "--reuse-reference", action="store_true",
+                        help="re-use previously computed reference WordSequence")
+    parser.add_argument("-rt", "--reuse-target", action="store_true",
+                        help="re-use previously computed target WordSequence")
+    parser.add_argument("-sm", "--similarity-measure", type=str,
+                        help="similarity function to use to compare buckets",
+                        choices=["jaccard-index",
+                                 "overlap-coeff", "overlap-count"],
+                        default="overlap-coeff", dest="similarity_measure")
+    parser.add_argument("-se", "--search-engine", type=str,
+                        help="method used to search for the best offset between buckets",
+                        choices=["bruteforce", "fft"],
+                        default="bruteforce", dest="search_engine")
+    parser.add_argument("-st", "--strategy", type=str,
+                        help="alignment strategy: successive bucket widths, or "
+                             "inverted-index anchor voting refined with buckets",
+                        choices=["bucket-ladder", "anchor-voting"],
+                        default="bucket-ladder")
+    parser.add_argument("-ks", "--keep-subs", action="store_true",
+                        help="prevent subtitles split into arbitrary lengthed words",
+                        dest="keep_subs")
+    parser.add_argument("-tk", "--tokenizer", type=str,
+                        help="subtitles tokenizer: NLTK with sentence splitting, or "
+                             "faster batched regular expressions, without sentence "
+                             "splitting",
+                        choices=TOKENIZERS,
+                        default="nltk")
+    parser.add_argument("-si", "--stem-index", action="store_true",
+                        help="encode input words through the precompiled "
+                             "cross-lingual stem index instead of translating them",
+                        dest="stem_index")
+    parser.add_argument("--all-pairs", action="store_true",
+                        help="index every language pair (index)",
+                        dest="all_pairs")
+    parser.add_argument("-cs", "--columnar", action="store_true",
+                        help="store word sequences as compact arrays")
+    parser.add_argument("-ps", "--plot-start", type=float,
+                        help="start of the plotted time range, in seconds (plot)",
+                        default=None, dest="plot_start")
+    parser.add_argument("-pe", "--plot-end", type=float,
+                        help="end of the plotted time range, in seconds (plot)",
+                        default=None, dest="plot_end")
+    parser.add_argument("-pr", "--plot-resolution", type=float,
+                        help="duration in seconds under which word groups are "
+                             "merged, and above which labels are left out; "
+                             "defaults to the plotted duration over %d (plot)"
+                             % PLOT_UNITS,
+                        default=None, dest="plot_resolution")
+    parser.add_argument("--curve", action="store_true",
+                        help="plot the similarity of the searched offsets of "
+                             "each round of the alignment instead of the "
+                             "subtitles (plot)")
+    parser.add_argument("--dump-curve", type=str,
+                        help="path to a CSV or SVG file (by extension) of the "
+                             "similarity of the searched offsets of each round; "
+                             "in batch, written next to each output file with "
+                             "the same extension",
+                        default=None, dest="dump_curve")
+    parser.add_argument("--min-confidence", type=float,
+                        help="minimum sharpness of the similarity peak of the "
+                             "first round, between 0 and 1, under which an "
+                             "alignment is rejected",
+                        default=0, dest="min_confidence")
+    parser.add_argument("--profile", type=str,
+                        help="path to a Chrome trace JSON file recording the "
+                             "duration of each stage",
+                        default=None, dest="profile_file")
+    parser.add_argument("--stats", action="store_true",
+                        help="print the duration of each stage and the counters")
+    return parser
@@ -0,0 +1,235 @@
+"""This module provides a compact, array-backed variant of WordSequence"""
+import array
+import codecs
+import datetime
+import numpy  # pylint: disable=E0401
+from .sequence import WordSequence
+from .sequence import WordSequenceElement
+from .tokens import tokenize_subs
+
+
+def to_seconds(timecode):
+    """Convert a datetime.timedelta object or a number into seconds"""
+    if isinstance(timecode, datetime.timedelta):
+        return timecode.total_seconds()
+    return float(timecode)
+
+
+class Vocabulary:
+    """Bidirectional mapping between words and integer ids. One vocabulary
+       can be shared among several sequences.
+    """
+
+    def __init__(self):
+        self.words = list()  # list of words, indexed by id
+        self.ids = dict()  # dict of {word: id}
+
+    def __len__(self):
+        return len(self.words)
+
+    def __getitem__(self, word_id):
+        return self.words[word_id]
+
+    def add(self, word):
+        """Return the id of a word, registering it if needed"""
+        word_id = self.ids.get(word)
+        if word_id is None:
+            word_id = len(self.words)
+            self.ids[word] = word_id
+            self.words.append(word)
+        return word_id
+
+
+class ColumnarWordSequence:
+    """Sequence of timed words stored as three columns: an int32 array of
+       word ids in a Vocabulary, and two float64 arrays of start and end
+       times in seconds. It exposes the same interface as WordSequence.
+    """
+
+    def __init__(self, vocabulary, word_ids, starts, ends):
+        self.vocabulary = vocabulary
+        self.word_ids = word_ids
+        self.starts = starts
+        self.ends = ends
+
+    def __len__(self):
+        return len(self.word_ids)
+
+    def __getitem__(self, index):
+        return WordSequenceElement(
+            self.vocabulary[self.word_ids[index]],
+            datetime.timedelta(seconds=float(self.starts[index])),
+            datetime.timedelta(seconds=float(self.ends[index]))
+        )
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def iter_groups(self, min_start=None, max_end=None):
+        """Iterates over elements, grouping together elements with same
+           start_time and end_time attributes.
+        """
+        if len(self) == 0:
+            return
+        changes = numpy.flatnonzero(
+            (self.starts[1:] != self.starts[:-1])
+            | (self.ends[1:] != self.ends[:-1])
+        ) + 1
+        bounds = numpy.concatenate(([0], changes, [len(self)]))
+        for low, high in zip(bounds[:-1], bounds[1:]):
+            start, end = float(self.starts[low]), float(self.ends[low])
+            if ((min_start is None or start >= min_start)
+                    and (max_end is None or end < max_end)):
+                yield (
+                    " ".join(self.vocabulary[word_id] for word_id in self.word_ids[low:high]),
+                    start,
+                    end
+                )
+
+    def offset(self, amount):
+        """Return a new ColumnarWordSequence with shifted elements. The word
+           ids array and the vocabulary are shared with the original.
+        """
+        return ColumnarWordSequence(
+            self.vocabulary,
+            self.word_ids,
+            self.starts + amount,
+            self.ends + amount
+        )
+
+    def map_words(self, function):
+        """Return a new ColumnarWordSequence with words transformed by a
+           function, which is called once per vocabulary entry.
+        """
+        vocabulary = Vocabulary()
+        lookup = numpy.array(
+            [vocabulary.add(function(word)) for word in self.vocabulary.words],
+            dtype=numpy.int32
+        )
+        return ColumnarWordSequence(
+            vocabulary,
+            lookup[self.word_ids] if len(lookup) > 0 else self.word_ids,
+            self.starts,
+            self.ends
+        )
+
+    def words(self):
+        """Return the words of the vocabulary"""
+        return self.vocabulary.words
+
+    def encode(self, encoder):
+        """Encode the words of the sequence, and return three NumPy arrays:
+           encodings, start times and end times (in seconds). Each vocabulary
+           entry is encoded once. Elements whose word has no encoding are
+           left out.
+        """
+        lookup = numpy.array([
+            -1 if encoding is None else encoding
+            for encoding in map(encoder.encode, self.vocabulary.words)
+        ], dtype=int)
+        if len(lookup) == 0:
+            return numpy.zeros(0, dtype=int), numpy.zeros(0), numpy.zeros(0)
+        encodings = lookup[self.word_ids]
+        mask = encodings >= 0
+        return encodings[mask], self.starts[mask], self.ends[mask]
+
+    def to_word_sequence(self):
+        """Convert to a regular WordSequence"""
+        sequence = WordSequence()
+        sequence.extend(self)
+        return sequence
+
+    def save(self, filename, codec):
+        """Write the sequence to a .tsv file"""
+        with codecs.open(filename, "w", codec) as file:
+            for word_id, start, end in zip(self.word_ids, self.starts, self.ends):
+                file.write("%s\t%s\t%s\n" % (
+                    self.vocabulary[word_id],
+                    float(start),
+                    float(end)
+                ))
+
+    def start(self):
+        """Return the first time index of the sequence"""
+        return datetime.timedelta(seconds=float(self.starts[0]))
+
+    def end(self):
+        """Return the last time index of the sequence"""
+        return datetime.timedelta(seconds=float(self.ends[-1]))
+
+    def duration(self):
+        """Return duration of the sequence"""
+        return self.end() - self.start()
+
+    find_offset = WordSequence.find_offset
+    find_offset_by_voting = WordSequence.find_offset_by_voting
+    svg = WordSequence.svg
+
+    def from_columns(vocabulary, word_ids, starts, ends):  # pylint: disable=E0213
+        """Build a ColumnarWordSequence from array.array buffers"""
+        return ColumnarWordSequence(
+            vocabulary,
+            numpy.frombuffer(word_ids, dtype=numpy.int32),
+            numpy.frombuffer(starts, dtype=numpy.float64),
+            numpy.frombuffer(ends, dtype=numpy.float64),
+        )
+
+    def from_list(elements, vocabulary=None):  # pylint: disable=E0213
+        """Build a ColumnarWordSequence from a list of triples of the form
+           (word, start_time, end_time). Times are either datetime.timedelta
+           objects or numbers of seconds.
+        """
+        if vocabulary is None:
+            vocabulary = Vocabulary()
+        words, starts, ends = array.array("i"), array.array("d"), array.array("d")
+        for word, start_time, end_time in elements:
+            words.append(vocabulary.add(word))
+            starts.append(to_seconds(start_time))
+            ends.append(to_seconds(end_time))
+        return ColumnarWordSequence.from_columns(vocabulary, words, starts, ends)
+
+    def from_file(filename, codec, vocabulary=None):  # pylint: disable=E0213
+        """Load a ColumnarWordSequence from a .tsv file"""
+        if vocabulary is None:
+            vocabulary = Vocabulary()
+        words, starts, ends = array.array("i"), array.array("d"), array.array("d")
+        with codecs.open(filename, "r", codec) as file:
+            for line in file:
+                split = line.strip().split("\t")
+                if len(split) != 3:
+                    continue
+                words.append(vocabulary.add(split[0].strip()))
+                starts.append(float(split[1]))
+                ends.append(float(split[2]))
+        return ColumnarWordSequence.from_columns(vocabulary, words, starts, ends)
+
+    def from_subs(subs, language, keep_subs, vocabulary=None,  # pylint: disable=E0213
+                  tokenizer="nltk"):
+        """Build a ColumnarWordSequence from a list of Subtitle"""
+        if vocabulary is None:
+            vocabulary = Vocabulary()
+        words, starts, ends = array.array("i"), array.array("d"), array.array("d")
+        for sub, tokens in tokenize_subs(subs, language, tokenizer):
+            sub_start = sub.start / 1000
+            sub_end = sub.end / 1000
+            total_chars = sum(map(len, tokens))
+            current_offset = 0
+            for token in tokens:
+                words.append(vocabulary.add(token))
+                if keep_subs:
+                    starts.append(sub_start)
+                    ends.append(sub_end)
+                else:
+                    token_duration = len(token) / total_chars * (sub_end - sub_start)
+                    starts.append(sub_start + current_offset)
+                    ends.append(sub_start + current_offset + token_duration)
+                    current_offset += token_duration
+        return ColumnarWordSequence.from_columns(vocabulary, words, starts, ends)
+
+    def from_sequence(sequence, vocabulary=None):  # pylint: disable=E0213
+        """Build a ColumnarWordSequence from a WordSequence"""
+        return ColumnarWordSequence.from_list(
+            ((element.word, element.start_time, element.end_time) for element in sequence),
+            vocabulary
+        )
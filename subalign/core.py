@@ -1,118 +1,686 @@
 """This module contains the performable actions"""
 
 import logging
+import functools
+import multiprocessing
 import shutil
+import json
+import time
+import copy
 import os
 from .extract import gather_video_properties
 from .extract import extract_audio_file
 from .extract import convert_audio_for_stt
 from .extract import select_track
+from .audio import FFmpegAudio
 from .speech import speech_to_text
+from .speech import Transcript
+from .speech import write_keyword_list
+from .activity import select_fragments
 from .subtitles import SubtitleFactory
 from .subtitles import shift_subs
 from .translate import translate
+from .translate import translate_words
 from .sequence import WordSequence
+from .sequence import WordEncoder
+from .sequence import vote_offsets
+from .sequence import vote_confidence
+from .curves import write_curves
+from .columnar import ColumnarWordSequence
 from .lang import LANGUAGES
+from .cache import Cache
+from .cache import run_stage
+from .store import LemmaStore
+from .store import TranslationStore
+from .stemindex import build_stem_index
+from .stemindex import load_stem_index
+from .stemindex import CrossLingualEncoder
+from .batch import match_pairs
+from .batch import read_manifest
+from .batch import SUBTITLE_EXTENSIONS
+from . import profiling
 
+# Adaptive speech-to-text decodes at least this many fragments, and stops
+# only once the voted offset peak gathers at least this many votes
+ADAPTIVE_MIN_FRAGMENTS = 2
+ADAPTIVE_MIN_VOTES = 3
 
-def align(args):
-    """Align action"""
-    logging.info("Entering align action")
+
+def confidence_reached(tgt_seq, sequence_class, encoder, confidence_ratio,
+                       target_encoder=None):
+    """Return a stop function for adaptive speech-to-text, telling whether
+       the offset voted between the partial transcript and the target is
+       clearly ahead of the runner-up
+    """
+
+    def stop(transcript):
+        """Re-estimate the offset with the fragments decoded so far"""
+        if len(transcript) < ADAPTIVE_MIN_FRAGMENTS:
+            return False
+        offsets, votes = vote_offsets(
+            encoder,
+            sequence_class.from_list(transcript.to_list()),
+            tgt_seq,
+            target_encoder=target_encoder
+        )
+        peak, ratio = vote_confidence(offsets, votes)
+        logging.debug(
+            "Offset confidence after %d fragments: peak %.2f, ratio %.2f",
+            len(transcript),
+            peak,
+            ratio
+        )
+        return peak >= ADAPTIVE_MIN_VOTES and ratio >= confidence_ratio
+
+    return stop
+
+
+def build_target_sequence(args, cache, sequence_class, tgt_subs, stem_index=None):
+    """Return the target WordSequence built from the input subtitles,
+       translated in the reference language if needed, and the cache key
+       parts identifying it. With a stem index, the sequence is left in the
+       input language.
+    """
     ref_lang = LANGUAGES[args.reference_language]
     tgt_lang = LANGUAGES[args.input_language]
-    if not args.reuse_reference and not args.reuse_target:
-        if os.path.isdir(args.temp_folder):
-            shutil.rmtree(args.temp_folder, ignore_errors=True)
-    os.makedirs(args.temp_folder, exist_ok=True)
+    load = functools.partial(sequence_class.from_file, codec="utf8")
+    key_parts = [
+        "target",
+        cache.file_hash(args.input_file) if cache is not None else None,
+        tgt_lang.iso,
+        args.keep_subs,
+        args.tokenizer,
+    ]
 
-    if args.reuse_reference:
-        ref_seq = WordSequence.from_file(
-            os.path.join(args.temp_folder, "ref_seq.tsv"),
-            "utf8")
-    else:
-        if os.path.splitext(args.reference_file)[1] == ".mkv":
-            video_properties = gather_video_properties(
-                args.mkvmerge,
-                args.reference_file
+    def build_original(filename):
+        """Tokenize the input subtitles"""
+        with profiling.span("from_subs"):
+            sequence = sequence_class.from_subs(
+                tgt_subs,
+                tgt_lang.nltk,
+                args.keep_subs,
+                tokenizer=args.tokenizer
+            )
+        sequence.save(filename, "utf8")
+        return sequence
+
+    tgt_seq = run_stage(
+        cache,
+        key_parts,
+        os.path.join(args.temp_folder, "tgt_seq_original.tsv"),
+        build_original,
+        load
+    )
+    if tgt_lang == ref_lang:
+        return tgt_seq, key_parts
+    if stem_index is not None:
+        return tgt_seq, key_parts + ["stems", ref_lang.iso]
+
+    def build_translated(filename):
+        """Translate the target sequence"""
+        store = None
+        if cache is not None:
+            store = TranslationStore(
+                os.path.join(cache.folder, "translations.sqlite"),
+                tgt_lang.word2word,
+                ref_lang.word2word
+            )
+        sequence = translate(tgt_seq, tgt_lang.word2word, ref_lang.word2word, store)
+        if store is not None:
+            store.close()
+        sequence.save(filename, "utf8")
+        return sequence
+
+    key_parts = key_parts + ["translated", ref_lang.iso]
+    tgt_seq = run_stage(
+        cache,
+        key_parts,
+        os.path.join(args.temp_folder, "tgt_seq_translated.tsv"),
+        build_translated,
+        load
+    )
+    return tgt_seq, key_parts
+
+
+def select_sequence_fragments(sequence, fragment_count, fragment_duration):
+    """Return the elements of a sequence starting within fragment_count
+       evenly spaced windows of fragment_duration seconds, as triples (word,
+       start_time, end_time): the words speech-to-text would hear with the
+       uniform fragment selection
+    """
+    if len(sequence) == 0:
+        return list()
+    end = max(element.end_time for element in sequence).total_seconds()
+    step = end / fragment_count
+    windows = [(i * step, i * step + fragment_duration) for i in range(fragment_count)]
+    profiling.count("decoded_seconds", sum(
+        min(fragment_duration, end - start) for start, _ in windows))
+    return [
+        (element.word, element.start_time, element.end_time)
+        for element in sequence
+        if any(start <= element.start_time.total_seconds() < stop for start, stop in windows)
+    ]
+
+
+def build_subtitle_reference(args, cache, sequence_class):
+    """Return the reference WordSequence read from correctly timed subtitles
+       instead of a video file, and its cache key (None without cache). Only
+       the words within the speech-to-text fragments are kept (see
+       select_sequence_fragments), so that the fragment options have the
+       same effect as with audio.
+    """
+    ref_lang = LANGUAGES[args.reference_language]
+    if args.fragment_selection != "uniform" or args.adaptive or args.keyword_decoding:
+        logging.warning("Subtitle references only support the uniform fragment selection")
+    key_parts = [
+        "subtitles",
+        cache.file_hash(args.reference_file) if cache is not None else None,
+        ref_lang.iso,
+        args.fragment_count,
+        args.fragment_duration,
+        args.keep_subs,
+        args.tokenizer,
+    ]
+
+    def build_sequence(filename):
+        """Tokenize the reference subtitles and keep the fragment words"""
+        with profiling.span("from_subs"):
+            sequence = WordSequence.from_subs(
+                SubtitleFactory("utf8").read(args.reference_file),
+                ref_lang.nltk,
+                args.keep_subs,
+                tokenizer=args.tokenizer
             )
-            track = select_track(video_properties, "audio", ref_lang)
+        sequence = sequence_class.from_list(select_sequence_fragments(
+            sequence,
+            args.fragment_count,
+            args.fragment_duration
+        ))
+        sequence.save(filename, "utf8")
+        return sequence
+
+    reference_sequence = run_stage(
+        cache,
+        ["reference"] + key_parts,
+        os.path.join(args.temp_folder, "ref_seq.tsv"),
+        build_sequence,
+        functools.partial(sequence_class.from_file, codec="utf8")
+    )
+    if cache is None:
+        return reference_sequence, None
+    return reference_sequence, cache.key("reference", *key_parts)
+
+
+def build_reference_sequence(args, cache, sequence_class, tgt_seq, tgt_key_parts,  # pylint: disable=R0913
+                             encoder, target_encoder):
+    """Return the reference WordSequence, transcribed from the reference
+       video file, or read from the reference subtitle file
+    """
+    if os.path.splitext(args.reference_file)[1].lower() in SUBTITLE_EXTENSIONS:
+        return build_subtitle_reference(args, cache, sequence_class)
+    ref_lang = LANGUAGES[args.reference_language]
+    track_id = None
+    if os.path.splitext(args.reference_file)[1] == ".mkv":
+        video_properties = gather_video_properties(
+            args.mkvmerge,
+            args.reference_file
+        )
+        track_id = select_track(video_properties, "audio", ref_lang)["id"]
+    ref_hash = cache.file_hash(args.reference_file) if cache is not None else None
+    key_parts = [
+        ref_hash,
+        track_id,
+        args.fragment_count,
+        args.fragment_duration,
+        ref_lang.iso,
+        args.fragment_selection,
+        args.adaptive,
+        args.keyword_decoding,
+    ]
+    if ((args.fragment_selection == "vad" and args.dialogue_weight > 0)
+            or args.adaptive or args.keyword_decoding):
+        key_parts += [args.dialogue_weight, args.confidence_ratio, tgt_key_parts]
+
+    def build_audio(filename):
+        """Convert the reference audio for speech-to-text"""
+        if track_id is not None:
             extract_audio_file(
                 args.mkvextract,
                 args.reference_file,
-                track["id"],
+                track_id,
                 os.path.join(args.temp_folder, "audio.raw")
             )
             convert_audio_for_stt(
                 args.ffmpeg,
                 os.path.join(args.temp_folder, "audio.raw"),
-                os.path.join(args.temp_folder, "audio.wav"),
+                filename,
             )
         else:
             convert_audio_for_stt(
                 args.ffmpeg,
                 args.reference_file,
+                filename,
+            )
+        return filename
+
+    def build_transcript(filename):
+        """Run speech-to-text on the reference audio"""
+        if args.stream_audio:
+            audio = FFmpegAudio(args.ffmpeg, args.reference_file, track_id)
+        else:
+            audio = run_stage(
+                cache if args.cache_audio else None,
+                ["audio", ref_hash, track_id],
                 os.path.join(args.temp_folder, "audio.wav"),
+                build_audio,
+                lambda path: path
+            )
+        anchors = None
+        if args.fragment_selection == "vad":
+            anchors = select_fragments(
+                audio,
+                args.fragment_count,
+                args.fragment_duration,
+                tgt_seq,
+                args.dialogue_weight
+            )
+        stop = None
+        if args.adaptive:
+            stop = confidence_reached(
+                tgt_seq,
+                sequence_class,
+                encoder,
+                args.confidence_ratio,
+                target_encoder
+            )
+        keywords = None
+        if args.keyword_decoding:
+            keywords = os.path.join(args.temp_folder, "keywords.txt")
+            words = tgt_seq.words()
+            if target_encoder is not encoder:
+                tgt_lang = LANGUAGES[args.input_language]
+                words = translate_words(words, tgt_lang.word2word, ref_lang.word2word)
+                words = [word for word in words.values() if word is not None]
+            count = write_keyword_list(
+                (sub_word for word in words for sub_word in word.split(" ")),
+                ref_lang.iso,
+                keywords,
+                encoder.stopwords
             )
-        ref_transcript = speech_to_text(
-            os.path.join(args.temp_folder, "audio.wav"),
+            if count == 0:
+                logging.warning(
+                    "No input word is in the pronunciation dictionary, "
+                    "decoding with the full language model"
+                )
+                keywords = None
+        transcript = speech_to_text(
+            audio,
             args.fragment_count,
             args.fragment_duration,
-            ref_lang.iso
+            ref_lang.iso,
+            args.jobs,
+            anchors,
+            stop,
+            keywords
         )
-        ref_transcript.save(
+        transcript.save(filename, "utf8")
+        return transcript
+
+    def build_sequence(filename):
+        """Build the reference sequence from the transcript"""
+        transcript = run_stage(
+            cache,
+            ["transcript"] + key_parts,
             os.path.join(args.temp_folder, "transcript.tsv"),
-            "utf8"
+            build_transcript,
+            functools.partial(Transcript.from_file, codec="utf8")
         )
-        ref_seq = WordSequence.from_list(ref_transcript.to_list())
-        ref_seq.save(os.path.join(args.temp_folder, "ref_seq.tsv"), "utf8")
+        sequence = sequence_class.from_list(transcript.to_list())
+        sequence.save(filename, "utf8")
+        return sequence
+
+    reference_sequence = run_stage(
+        cache,
+        ["reference"] + key_parts,
+        os.path.join(args.temp_folder, "ref_seq.tsv"),
+        build_sequence,
+        functools.partial(sequence_class.from_file, codec="utf8")
+    )
+    if cache is None:
+        return reference_sequence, None
+    return reference_sequence, cache.key("reference", *key_parts)
+
+
+class UnknownReferenceError(Exception):
+    """Error raised when a reference id is missing from the cache"""
+
+
+class LowConfidenceError(Exception):
+    """Error raised when an offset is found with a confidence below
+       args.min_confidence
+    """
+
+
+def load_cached_reference(cache, sequence_class, reference_id):
+    """Return the reference WordSequence cached under an id returned by a
+       previous alignment. Raise an UnknownReferenceError if it is not in
+       the cache.
+    """
+    if cache is None:
+        raise ValueError("Reference ids require the cache")
+    path = cache.get(reference_id, "ref_seq.tsv")
+    if path is None:
+        raise UnknownReferenceError("Unknown reference id %s" % reference_id)
+    logging.info("Using cached reference %s", path)
+    return sequence_class.from_file(path, "utf8")
+
+
+@profiling.profiled
+def align(args):
+    """Align action. Return the offset, or None if it was rejected for its
+       low confidence.
+    """
+    logging.info("Entering align action")
+    try:
+        return run_alignment(args)["offset"]
+    except LowConfidenceError as error:
+        logging.error("%s", error)
+        return None
+
+
+def run_alignment(args):
+    """Align the input subtitles on the reference and write the shifted
+       subtitles. Return a dict with the offset and the id of the reference
+       sequence in the cache (None without cache), that later alignments
+       can pass as args.reference_id instead of a reference file.
+    """
+    ref_lang = LANGUAGES[args.reference_language]
+    sequence_class = ColumnarWordSequence if args.columnar else WordSequence
+    if not args.reuse_reference and not args.reuse_target:
+        if os.path.isdir(args.temp_folder):
+            shutil.rmtree(args.temp_folder, ignore_errors=True)
+    os.makedirs(args.temp_folder, exist_ok=True)
+    cache, lemma_store = None, None
+    if not args.no_cache:
+        cache = Cache(args.cache_folder, args.cache_size * 1024 * 1024)
+        lemma_store = LemmaStore(
+            os.path.join(args.cache_folder, "lemmas.sqlite"),
+            ref_lang.nltk
+        )
+    stem_index = None
+    if args.stem_index and args.input_language != args.reference_language:
+        stem_index = load_stem_index(
+            os.path.join(args.cache_folder, "stems"),
+            LANGUAGES[args.input_language],
+            ref_lang
+        )
+    encoder = WordEncoder(
+        ref_lang.nltk,
+        lemma_store,
+        None if stem_index is None else stem_index.to_stems
+    )
+    target_encoder = encoder
+    if stem_index is not None:
+        target_encoder = CrossLingualEncoder(
+            encoder,
+            stem_index,
+            LANGUAGES[args.input_language].nltk
+        )
+
     factory = SubtitleFactory("utf8")
     tgt_subs = factory.read(args.input_file)
     if args.reuse_target:
-        if os.path.isfile(os.path.join(args.temp_folder, "tgt_seq_translated.tsv")):
-            tgt_seq = WordSequence.from_file(
-                os.path.join(args.temp_folder, "tgt_seq_translated.tsv"),
-                "utf8")
-        else:
-            tgt_seq = WordSequence.from_file(
-                os.path.join(args.temp_folder, "tgt_seq_original.tsv"),
-                "utf8")
+        tgt_path = os.path.join(args.temp_folder, "tgt_seq_translated.tsv")
+        if not os.path.isfile(tgt_path):
+            tgt_path = os.path.join(args.temp_folder, "tgt_seq_original.tsv")
+        tgt_seq = sequence_class.from_file(tgt_path, "utf8")
+        tgt_key_parts = [
+            "target-file",
+            cache.file_hash(tgt_path) if cache is not None else None
+        ]
     else:
-        tgt_seq = WordSequence.from_subs(tgt_subs, tgt_lang.nltk, args.keep_subs)
-        tgt_seq.save(
-            os.path.join(args.temp_folder, "tgt_seq_original.tsv"),
-            "utf8"
+        tgt_seq, tgt_key_parts = build_target_sequence(
+            args,
+            cache,
+            sequence_class,
+            tgt_subs,
+            stem_index
         )
-        if tgt_lang != ref_lang:
-            tgt_seq = translate(tgt_seq, tgt_lang.word2word, ref_lang.word2word)
-            tgt_seq.save(
-                os.path.join(args.temp_folder, "tgt_seq_translated.tsv"),
-                "utf8"
-            )
-    offset = ref_seq.find_offset(
+    if target_encoder is encoder:
+        encoder.prefetch(tgt_seq.words())
+
+    reference_id = getattr(args, "reference_id", None)
+    if reference_id is not None:
+        ref_seq = load_cached_reference(cache, sequence_class, reference_id)
+    elif args.reuse_reference:
+        ref_seq = sequence_class.from_file(
+            os.path.join(args.temp_folder, "ref_seq.tsv"),
+            "utf8")
+    else:
+        ref_seq, reference_id = build_reference_sequence(
+            args,
+            cache,
+            sequence_class,
+            tgt_seq,
+            tgt_key_parts,
+            encoder,
+            target_encoder
+        )
+    encoder.prefetch(ref_seq.words())
+    if args.strategy == "anchor-voting":
+        find_offset = ref_seq.find_offset_by_voting
+    else:
+        find_offset = ref_seq.find_offset
+    curves = list()
+    offset = find_offset(
         tgt_seq,
         ref_lang.nltk,
         args.max_iters,
         args.similarity_measure,
+        args.search_engine,
+        encoder=encoder,
+        target_encoder=target_encoder,
+        curves=curves,
     )
+    encoder.flush()
+    profiling.count("encoder_cache_hits", encoder.hits)
+    profiling.count("encoder_cache_misses", encoder.misses)
+    if lemma_store is not None:
+        lemma_store.close()
+    confidence = curves[0]["confidence"] if len(curves) > 0 else 0.
     logging.info(
-        "Found an offset of %.2f seconds (i.e. target subs are shown too %s)",
+        "Found an offset of %.2f seconds (i.e. target subs are shown too %s), "
+        "with a confidence of %.2f",
         -offset,
-        "late" if offset < 0 else "soon"
+        "late" if offset < 0 else "soon",
+        confidence
     )
+    if args.dump_curve is not None:
+        write_curves(curves, args.dump_curve)
+        logging.info("Wrote similarity curves to %s", os.path.realpath(args.dump_curve))
+    if confidence < args.min_confidence:
+        raise LowConfidenceError(
+            "Offset of %.2f seconds rejected: confidence %.2f is below %.2f" % (
+                -offset, confidence, args.min_confidence))
     factory.write(
         shift_subs(tgt_subs, offset),
         args.output_file,
     )
-    return offset
+    return {"offset": offset, "confidence": confidence, "reference_id": reference_id}
+
+
+# Base arguments of the actions run by a worker process
+WORKER_STATE = dict()
+
+
+def initialize_worker(args):
+    """Store the base arguments in a worker process"""
+    WORKER_STATE["args"] = args
+    profiling.initialize_worker()
+
+
+def worker_temp_folder(args, number):
+    """Return the temporary folder of the numbered job of a worker"""
+    return os.path.join(args.temp_folder, "%04d" % number)
+
+
+def run_in_worker(job):
+    """Run an action ('align' or 'plot') in a worker process, with the
+       arguments stored by initialize_worker updated by a dict of options.
+       Decoders, translators, stopwords and stemmers are loaded once per
+       process and stay warm for the next jobs. Return a summary dict of
+       an alignment, or None for a plot. Alignment errors are reported in
+       the summary, other errors are raised.
+    """
+    action, number, options = job
+    args = copy.copy(WORKER_STATE["args"])
+    args.reference_id = None
+    for key, value in options.items():
+        setattr(args, key, value)
+    args.temp_folder = worker_temp_folder(args, number)
+    args.reuse_reference = args.reuse_target = False
+    args.jobs = 1
+    if action == "plot":
+        plot(args)
+        return None
+    result = {
+        "reference": args.reference_file,
+        "input": args.input_file,
+        "output": args.output_file,
+        "offset": None,
+        "confidence": None,
+        "reference_id": None,
+        "error": None,
+    }
+    start = time.time()
+    try:
+        with profiling.span("align", input=args.input_file):
+            result.update(run_alignment(args))
+    except Exception as error:  # pylint: disable=W0703
+        logging.exception("Could not align %s", args.input_file)
+        result["error"] = "%s: %s" % (type(error).__name__, error)
+    result["seconds"] = time.time() - start
+    result["profile"] = profiling.take()
+    return result
+
+
+def check_output_file(input_file, output_file):
+    """Raise a ValueError if writing the output file would overwrite the
+       input file
+    """
+    if os.path.realpath(input_file) == os.path.realpath(output_file):
+        raise ValueError("Output file %s would overwrite its input" % output_file)
+
+
+def batch(args):
+    """Batch action: align every pair of a manifest, or of a reference
+       folder and an input folder, and write a JSON summary
+    """
+    logging.info("Entering batch action")
+    if os.path.isfile(args.reference_file):
+        jobs = read_manifest(args.reference_file)
+    else:
+        jobs = [
+            (reference_file, input_file, None)
+            for reference_file, input_file in match_pairs(args.reference_file, args.input_file)
+        ]
+    jobs = [
+        ("align", number, {
+            "reference_file": reference_file,
+            "input_file": input_file,
+            "output_file": output_file or os.path.join(
+                args.output_folder,
+                os.path.basename(input_file)
+            ),
+        })
+        for number, (reference_file, input_file, output_file) in enumerate(jobs)
+    ]
+    for _, _, options in jobs:
+        check_output_file(options["input_file"], options["output_file"])
+        os.makedirs(os.path.dirname(os.path.abspath(options["output_file"])), exist_ok=True)
+        if args.dump_curve is not None:
+            options["dump_curve"] = os.path.splitext(options["output_file"])[0]\
+                + ".curve" + (os.path.splitext(args.dump_curve)[1] or ".csv")
+    logging.info("Aligning %d pairs with %d worker(s)", len(jobs), args.jobs)
+    start = time.time()
+    if args.jobs <= 1 or len(jobs) <= 1:
+        initialize_worker(args)
+        results = list(map(run_in_worker, jobs))
+    else:
+        with multiprocessing.Pool(
+                min(args.jobs, len(jobs)),
+                initializer=initialize_worker,
+                initargs=(args,)) as pool:
+            results = list(pool.imap(run_in_worker, jobs))
+    for result in results:
+        profiling.merge(result.pop("profile"))
+    summary = {
+        "seconds": time.time() - start,
+        "aligned": sum(result["error"] is None for result in results),
+        "failed": sum(result["error"] is not None for result in results),
+        "results": results,
+    }
+    with open(args.summary_file, "w", encoding="utf8") as file:
+        json.dump(summary, file, indent=4)
+    logging.info(
+        "Aligned %d pairs (%d failed) in %.2fs, summary written to %s",
+        summary["aligned"],
+        summary["failed"],
+        summary["seconds"],
+        os.path.realpath(args.summary_file)
+    )
+    return summary
+
+
+def index(args):
+    """Index action: build the cross-lingual stem index from the input
+       language to the reference language, or of every language pair
+    """
+    logging.info("Entering index action")
+    folder = os.path.join(args.cache_folder, "stems")
+    if args.all_pairs:
+        pairs = [
+            (from_language, to_language)
+            for from_language in LANGUAGES.values()
+            for to_language in LANGUAGES.values()
+            if from_language != to_language
+        ]
+    else:
+        pairs = [(LANGUAGES[args.input_language], LANGUAGES[args.reference_language])]
+    for from_language, to_language in pairs:
+        build_stem_index(folder, from_language, to_language)
 
 
+@profiling.profiled
 def plot(args):
-    """Plot action"""
+    """Plot action: compare the input subtitles with the reference ones, or
+       with --curve, plot the similarity curves of their alignment
+    """
     logging.info("Entering plot action")
+    if args.curve:
+        curve_args = copy.copy(args)
+        curve_args.dump_curve = args.output_file
+        curve_args.output_file = os.path.join(args.temp_folder, "plot-aligned.srt")
+        curve_args.min_confidence = 0
+        run_alignment(curve_args)
+        return
     ref_lang = LANGUAGES[args.reference_language]
     tgt_lang = LANGUAGES[args.input_language]
     factory = SubtitleFactory("utf8")
-    WordSequence.from_subs(factory.read(args.reference_file), ref_lang.nltk, args.keep_subs).svg(
-        WordSequence.from_subs(factory.read(args.input_file), tgt_lang.nltk, args.keep_subs),
-        args.output_file
+    WordSequence.from_subs(
+        factory.read(args.reference_file),
+        ref_lang.nltk,
+        args.keep_subs,
+        args.tokenizer
+    ).svg(
+        WordSequence.from_subs(
+            factory.read(args.input_file),
+            tgt_lang.nltk,
+            args.keep_subs,
+            args.tokenizer
+        ),
+        args.output_file,
+        args.plot_start,
+        args.plot_end,
+        args.plot_resolution
     )
@@ -0,0 +1,92 @@
+"""Similarity curves of the offset search (see WordSequence.find_offset),
+   written as CSV rows or as an SVG figure with one panel per round, to
+   triage misalignments without rerunning them.
+"""
+
+import csv
+import codecs
+from xml.sax.saxutils import escape
+
+# Width and height of a panel, and vertical space of its title, in SVG units
+PANEL_WIDTH = 800
+PANEL_HEIGHT = 120
+PANEL_TITLE = 24
+PANEL_MARGIN = 10
+
+
+def write_csv(curves, filename):
+    """Write the curves as CSV rows (level, confidence, offset, similarity)"""
+    with open(filename, "w", encoding="utf8", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["level", "confidence", "offset", "similarity"])
+        for curve in curves:
+            for offset, value in zip(curve["offsets"].tolist(), curve["values"].tolist()):
+                writer.writerow([
+                    curve["level"],
+                    "%.4f" % curve["confidence"],
+                    "%.3f" % offset,
+                    "%.6g" % value
+                ])
+
+
+def write_panel(file, curve, top):
+    """Write the panel of one curve, top being its vertical position"""
+    offsets, values = curve["offsets"], curve["values"]
+    file.write('<text x="%d" y="%d">%s</text>' % (
+        PANEL_MARGIN, top + PANEL_TITLE - 8, escape(
+            "%s: %d offsets, best %s, confidence %.2f" % (
+                curve["level"],
+                len(offsets),
+                "-" if curve["best"] is None else "%.2fs" % curve["best"],
+                curve["confidence"]))))
+    top += PANEL_TITLE
+    file.write('<rect x="%d" y="%d" width="%d" height="%d" fill="none" stroke="gray" />' % (
+        PANEL_MARGIN, top, PANEL_WIDTH, PANEL_HEIGHT))
+    if len(offsets) == 0:
+        return
+
+    def position(offset, value):
+        """Return the SVG coordinates of a point of the curve"""
+        return (
+            PANEL_MARGIN + PANEL_WIDTH * (offset - low) / max(high - low, 1e-9),
+            top + PANEL_HEIGHT * (1 - (value - bottom) / max(peak - bottom, 1e-9))
+        )
+
+    low, high = float(offsets.min()), float(offsets.max())
+    bottom, peak = float(values.min()), float(values.max())
+    file.write('<polyline fill="none" stroke="#4c72b0" stroke-width="1" points="')
+    for offset, value in zip(offsets.tolist(), values.tolist()):
+        file.write("%.2f,%.2f " % position(offset, value))
+    file.write('" />')
+    x, y = position(curve["best"], peak)
+    file.write('<circle cx="%.2f" cy="%.2f" r="3" fill="#dd8452" />' % (x, y))
+    file.write('<text x="%d" y="%d">%.2fs</text>' % (
+        PANEL_MARGIN, top + PANEL_HEIGHT + 14, low))
+    file.write('<text x="%d" y="%d" text-anchor="end">%.2fs</text>' % (
+        PANEL_MARGIN + PANEL_WIDTH, top + PANEL_HEIGHT + 14, high))
+
+
+def write_svg(curves, filename):
+    """Write the curves as an SVG figure, one panel per round, each with
+       its own offset range (in seconds) and similarity range
+    """
+    panel = PANEL_TITLE + PANEL_HEIGHT + 2 * PANEL_MARGIN
+    width, height = PANEL_WIDTH + 2 * PANEL_MARGIN, panel * len(curves) + PANEL_MARGIN
+    with codecs.open(filename, "w", "utf8") as file:
+        file.write('<?xml version="1.0" encoding="UTF-8" standalone="no"?>')
+        file.write('<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 %d %d">' % (width, height))
+        file.write('<rect width="%d" height="%d" fill="white" />' % (width, height))
+        file.write('<g font-family="Segoe UI" font-size="12">')
+        for i, curve in enumerate(curves):
+            write_panel(file, curve, i * panel)
+        file.write("</g></svg>")
+
+
+def write_curves(curves, filename):
+    """Write the curves as SVG if the filename ends with .svg, as CSV
+       otherwise
+    """
+    if filename.lower().endswith(".svg"):
+        write_svg(curves, filename)
+    else:
+        write_csv(curves, filename)
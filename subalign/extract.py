@@ -1,10 +1,13 @@
 """Wrapper for mkvmerge, mkvextract and ffmpeg tools"""
 import os
+import re
 import json
 import subprocess
 import logging
+from . import profiling
 
 
+@profiling.profiled
 def gather_video_properties(mkvmerge, video_path):
     """Use the mkvmerge --identify option to extract tracks information from a
        video file.
@@ -48,6 +51,7 @@ def select_track(video_properties, track_type, language):
     return selection
 
 
+@profiling.profiled
 def extract_audio_file(mkvextract, video_path, track_id, output_file):
     """Extract an audio track from a video file using mkvextract"""
     logging.info(
@@ -68,6 +72,7 @@ def extract_audio_file(mkvextract, video_path, track_id, output_file):
         logging.error(output)
 
 
+@profiling.profiled
 def convert_audio_for_stt(ffmpeg, source, destination):
     """Convert an audio file, using FFMPEG, to the CMUSphinx input format:
        16kHz sampling frequency, mono, 16bit PCM little endian.
@@ -96,3 +101,59 @@ def convert_audio_for_stt(ffmpeg, source, destination):
     output = process.stderr.read().decode("utf8").strip()
     if len(output) > 0:
         logging.error(output)
+
+
+def parse_ffmpeg_duration(output):
+    """Return the duration in seconds announced in FFMPEG output, or None"""
+    match = re.search(r"Duration: (\d+):(\d{2}):(\d{2}(?:\.\d+)?)", output)
+    if match is None:
+        return None
+    hours, minutes, seconds = match.groups()
+    return 3600 * int(hours) + 60 * int(minutes) + float(seconds)
+
+
+def probe_duration(ffmpeg, source):
+    """Use FFMPEG to find the duration of a media file, in seconds"""
+    logging.debug("Probing duration of %s", os.path.realpath(source))
+    command = [ffmpeg, "-hide_banner", "-i", os.path.realpath(source)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    _, stderr = process.communicate()
+    duration = parse_ffmpeg_duration(stderr.decode("utf8", errors="replace"))
+    if duration is None:
+        raise ValueError("Could not find the duration of %s" % source)
+    return duration
+
+
+def stream_audio_for_stt(ffmpeg, source, track_id=None, start=None, duration=None):
+    """Start FFMPEG to decode an audio track of a media file (the first audio
+       track if track_id is None) into the CMUSphinx input format, written to
+       a pipe as raw samples. If start is given, FFMPEG seeks the input to
+       that time (in seconds) before decoding. Return the Popen object, whose
+       errors are written to its stderr pipe (see check_stream).
+    """
+    command = [ffmpeg, "-v", "error"]
+    if start is not None:
+        command += ["-ss", "%.3f" % start]
+    command += ["-i", os.path.realpath(source)]
+    if duration is not None:
+        command += ["-t", "%.3f" % duration]
+    command += [
+        "-map", "0:a:0" if track_id is None else "0:%d" % track_id,
+        "-ar", "16000",
+        "-ac", "1",
+        "-f", "s16le",
+        "-acodec", "pcm_s16le",
+        "pipe:1",
+    ]
+    return subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+
+def check_stream(process, stderr):
+    """Raise a ValueError with the FFMPEG error messages if a stream started
+       by stream_audio_for_stt exited with an error
+    """
+    if process.returncode != 0:
+        raise ValueError("FFMPEG exited with code %d: %s" % (
+            process.returncode,
+            stderr.decode("utf8", errors="replace").strip()
+        ))
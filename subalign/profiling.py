@@ -0,0 +1,195 @@
+"""Instrumentation of the alignment stages: nestable timed spans and
+   counters, exported as Chrome trace events (to open with chrome://tracing
+   or Perfetto) or as a summary table. Nothing is recorded unless a Profiler
+   is activated; otherwise, spans and counters only check a global.
+"""
+
+import os
+import json
+import time
+import functools
+import threading
+import contextlib
+import collections
+
+# Active Profiler of the process, if any
+ACTIVE = None
+
+
+class Profiler:
+    """Recorder of the spans and counters of one process. Timestamps are
+       read from time.perf_counter, which is shared by the processes of a
+       machine on Linux, so that the recordings of worker processes can be
+       merged into their parent's.
+    """
+
+    def __init__(self, origin=None):
+        self.origin = time.perf_counter() if origin is None else origin
+        self.pid = os.getpid()
+        self.events = list()  # list of Chrome trace events
+        self.counters = collections.Counter()
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def timestamp(self, seconds):
+        """Convert a time.perf_counter value into trace microseconds"""
+        return (seconds - self.origin) * 1e6
+
+    @contextlib.contextmanager
+    def span(self, name, **args):
+        """Context manager recording a span around its block"""
+        depth = getattr(self.local, "depth", 0)
+        self.local.depth = depth + 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self.local.depth = depth
+            event = {
+                "name": name,
+                "ph": "X",
+                "ts": self.timestamp(start),
+                "dur": (end - start) * 1e6,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": dict(args, depth=depth),
+            }
+            with self.lock:
+                self.events.append(event)
+
+    def count(self, name, value=1):
+        """Add a value to a counter"""
+        with self.lock:
+            self.counters[name] += value
+            self.events.append({
+                "name": name,
+                "ph": "C",
+                "ts": self.timestamp(time.perf_counter()),
+                "pid": os.getpid(),
+                "args": {name: self.counters[name]},
+            })
+
+    def take(self):
+        """Return and forget the events and counters recorded so far"""
+        with self.lock:
+            recording = self.events, self.counters
+            self.events, self.counters = list(), collections.Counter()
+        return recording
+
+    def merge(self, events, counters):
+        """Add the events and counters taken from another Profiler"""
+        with self.lock:
+            self.events.extend(events)
+            self.counters.update(counters)
+
+    def write_trace(self, filename):
+        """Write the recorded events as a Chrome trace JSON file"""
+        with self.lock:
+            events = sorted(self.events, key=lambda event: event["ts"])
+        with open(filename, "w", encoding="utf8") as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+
+    def summary(self):
+        """Return a list of rows (name, depth, calls, total seconds) for the
+           spans, grouped by name in order of first start, and a sorted list
+           of pairs (name, value) for the counters
+        """
+        with self.lock:
+            events = sorted(
+                (event for event in self.events if event["ph"] == "X"),
+                key=lambda event: event["ts"]
+            )
+            counters = sorted(self.counters.items())
+        rows = collections.OrderedDict()
+        for event in events:
+            depth, calls, total = rows.get(event["name"], (event["args"]["depth"], 0, 0))
+            rows[event["name"]] = depth, calls + 1, total + event["dur"] / 1e6
+        return [(name,) + row for name, row in rows.items()], counters
+
+    def format_summary(self):
+        """Return the summary as a text table"""
+        rows, counters = self.summary()
+        lines = ["%-40s %8s %12s %12s" % ("stage", "calls", "total (s)", "mean (ms)")]
+        for name, depth, calls, total in rows:
+            lines.append("%-40s %8d %12.3f %12.3f" % (
+                "  " * depth + name, calls, total, total / calls * 1000))
+        if len(counters) > 0:
+            lines.append("")
+            lines.append("%-40s %12s" % ("counter", "value"))
+            for name, value in counters:
+                lines.append("%-40s %12s" % (name, ("%.2f" % value).rstrip("0").rstrip(".")))
+        return "\n".join(lines)
+
+
+def activate():
+    """Start recording in this process, and return the Profiler"""
+    global ACTIVE  # pylint: disable=W0603
+    ACTIVE = Profiler()
+    return ACTIVE
+
+
+def deactivate():
+    """Stop recording in this process, and return the Profiler, if any"""
+    global ACTIVE  # pylint: disable=W0603
+    profiler, ACTIVE = ACTIVE, None
+    return profiler
+
+
+def enabled():
+    """Tell whether a Profiler is active"""
+    return ACTIVE is not None
+
+
+def span(name, **args):
+    """Context manager recording a span around its block, if a Profiler is
+       active
+    """
+    if ACTIVE is None:
+        return contextlib.nullcontext()
+    return ACTIVE.span(name, **args)
+
+
+def count(name, value=1):
+    """Add a value to a counter, if a Profiler is active"""
+    if ACTIVE is not None:
+        ACTIVE.count(name, value)
+
+
+def profiled(function):
+    """Decorator recording a span named after the function at each call"""
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if ACTIVE is None:
+            return function(*args, **kwargs)
+        with ACTIVE.span(function.__name__):
+            return function(*args, **kwargs)
+
+    return wrapper
+
+
+def initialize_worker():
+    """Restart recording from scratch in a forked worker process if its
+       parent was recording, so that the parent's records are not taken
+       twice (see take). Does nothing in the process that activated it.
+    """
+    global ACTIVE  # pylint: disable=W0603
+    if ACTIVE is not None and ACTIVE.pid != os.getpid():
+        ACTIVE = Profiler(ACTIVE.origin)
+
+
+def take():
+    """Return and forget the records of this process, as a pair (events,
+       counters) to give to merge in the parent process, or None if no
+       Profiler is active
+    """
+    if ACTIVE is None:
+        return None
+    return ACTIVE.take()
+
+
+def merge(recording):
+    """Add the records taken from a worker process, if a Profiler is active"""
+    if ACTIVE is not None and recording is not None:
+        ACTIVE.merge(*recording)
@@ -1,20 +1,18 @@
 """This modules provides tools to align target subs on reference subs"""
 import codecs
 import datetime
+import functools
 import math
 import logging
-import re
-import nltk  # pylint: disable=E0401
+import numpy  # pylint: disable=E0401
+from .tokens import tokenize_subs
+from .svg import write_comparison
+from . import profiling
 
 
-def time_to_timedelta(timeobj):
-    """Convert a datetime.time object into datetime.timedelta"""
-    return datetime.timedelta(
-        hours=timeobj.hour,
-        minutes=timeobj.minute,
-        seconds=timeobj.second,
-        microseconds=int(timeobj.strftime("%f"))
-    )
+def ms_to_timedelta(milliseconds):
+    """Convert a number of milliseconds into datetime.timedelta"""
+    return datetime.timedelta(milliseconds=milliseconds)
 
 
 class WordSequenceElement:
@@ -78,95 +76,11 @@ class WordSequence(list):
             ))
         return sequence
 
-    def svg(self, other, filename, **options):
-        """Draw a SVG object comparing two word sequences"""
-        options.setdefault("padding", .2)
-        # options.setdefault("step", .1)
-        options.setdefault("sup_step", 1)
-        options.setdefault("min_start", None)
-        options.setdefault("max_end", None)
-
-        boundaries = [0, 0]
-        if options["min_start"] is None:
-            boundaries[0] = min(self.start(), other.start()).total_seconds()\
-                - options["padding"]
-        else:
-            boundaries[0] = max(
-                options["min_start"],
-                min(self.start(), other.start()).total_seconds()
-            ) - options["padding"]
-        if options["max_end"] is None:
-            boundaries[1] = max(self.end(), other.end()).total_seconds()\
-                + options["padding"]
-        else:
-            boundaries[1] = min(
-                options["max_end"],
-                max(self.end(), other.end()).total_seconds()
-            ) + options["padding"]
-        view_box = (boundaries[0], -1.5, boundaries[1] - boundaries[0], 3)
-        svg_core = ""
-
-        # Plot background
-        svg_core += '<rect x="%f" y="%f" width="%f" height="%f" fill="white" />' % view_box
-
-        # Plot grid and axis
-        svg_core += "".join(map(lambda s: s.strip(), ("""
-        <defs>
-            <pattern id="small_grid" width=".1" height=".1" patternUnits="userSpaceOnUse">
-                <path d="M 0 0 L 0 0 0 .1" fill="none" stroke="gray" stroke-width=".002"/>
-            </pattern>
-            <pattern id="grid" width="1" height="1" patternUnits="userSpaceOnUse">
-                <rect width="1" height="1" fill="url(#small_grid)"/>
-                <path d="M 0 0 L 0 0 0 1" fill="none" stroke="gray" stroke-width=".02"/>
-            </pattern>
-        </defs>
-        <rect x="%f" y="%f" width="%f" height="%f" fill="url(#grid)" />
-        """.split("\n")))) % view_box
-        svg_core += '<line stroke="black" stroke-width=".01" x1="%f" y1="%f" x2="%f" y2="%f" />'\
-            % (boundaries[0], 0, boundaries[1], 0)
-        svg_core += '<g font-family="Segoe UI" font-size=".09" text-anchor="middle" >'
-        for i in range(
-                int(boundaries[0] / options["sup_step"]),
-                int(boundaries[1] / options["sup_step"])):
-            svg_core += '<text x="%.2f" y=".12">%s</text>'\
-                % (i * options["sup_step"], datetime.timedelta(seconds=i * options["sup_step"]))
-        svg_core += '</g>'
-
-        # Plot rectangles
-        svg_core += '<g fill="#4c72b0" stroke="black" stroke-width="0.005">'
-        for _, start, end in self.iter_groups(options["min_start"], options["max_end"]):
-            svg_core += '<rect x="%.3f" y="%.3f" width="%.3f" height="%.3f" />'\
-                % (start, -1.3, end - start, 1)
-        svg_core += "</g>"
-        svg_core += '<g fill="#dd8452" stroke="black" stroke-width="0.005">'
-        for _, start, end in other.iter_groups(options["min_start"], options["max_end"]):
-            svg_core += '<rect x="%.3f" y="%.3f" width="%.3f" height="%.3f" />'\
-                % (start, .3, end - start, 1)
-        svg_core += "</g>"
-
-        # Plot texts
-        svg_core += '<g font-family="Segoe UI" font-size=".1" text-anchor="middle" fill="black">'
-        for i, (text, start, end) in\
-            enumerate(self.iter_groups(options["min_start"], options["max_end"])):
-            svg_core += '<text x="%.3f" y="%.3f">%s</text>'\
-                % (.5 * (start + end), -.6 - .4 * (i % 2), text)
-        for i, (text, start, end) in\
-            enumerate(other.iter_groups(options["min_start"], options["max_end"])):
-            svg_core += '<text x="%.3f" y="%.3f">%s</text>'\
-                % (.5 * (start + end), .6 + .4 * (i % 2), text)
-        svg_core += "</g>"
-
-        template = "".join((
-            '<?xml version="1.0" encoding="UTF-8" standalone="no"?>',
-            '<svg xmlns="http://www.w3.org/2000/svg" viewBox="{VIEW_BOX}">',
-            '{SVG_CORE}',
-            '</svg>'
-        ))
-        with codecs.open(filename, "w", "utf8") as file:
-            file.write(template.format(
-                SVG_CORE=svg_core.strip(),
-                VIEW_BOX="%f %f %f %f" % view_box
-            ).strip())
+    def svg(self, other, filename, min_start=None, max_end=None, resolution=None):  # pylint: disable=R0913
+        """Draw a SVG object comparing two word sequences (see
+           svg.write_comparison)
+        """
+        write_comparison(self, other, filename, min_start, max_end, resolution)
 
     def from_list(elements):  # pylint: disable=E0213
         """Build a WordSequence from a list of triples of the form
@@ -195,37 +109,63 @@ class WordSequence(list):
                 ))
         return sequence
 
-    def from_subs(subs, language, keep_subs):  # pylint: disable=E0213
+    def from_subs(subs, language, keep_subs, tokenizer="nltk"):  # pylint: disable=E0213
         """Build a WordSequence from a list of Subtitle"""
         sequence = WordSequence()
-        for sub in subs:
-            if not sub.is_intradiegetic():
-                continue
-            tokens = [
-                re.sub(r"\W+", " ", token).strip()
-                for token in nltk.tokenize.word_tokenize(sub.text, language=language)
-                if token not in ",.;:/\\\"#()[]-_{}$%*?!'`"
-            ]
-            duration = time_to_timedelta(sub.end) - time_to_timedelta(sub.start)
+        for sub, tokens in tokenize_subs(subs, language, tokenizer):
+            duration = ms_to_timedelta(sub.end) - ms_to_timedelta(sub.start)
             total_chars = sum(map(len, tokens))
             current_offset = datetime.timedelta(seconds=0)
             for token in tokens:
                 if keep_subs:
                     sequence.append(WordSequenceElement(
                         token,
-                        time_to_timedelta(sub.start),
-                        time_to_timedelta(sub.end),
+                        ms_to_timedelta(sub.start),
+                        ms_to_timedelta(sub.end),
                     ))
                 else:
                     token_duration = len(token) / total_chars * duration
                     sequence.append(WordSequenceElement(
                         token,
-                        time_to_timedelta(sub.start) + current_offset,
-                        time_to_timedelta(sub.start) + current_offset + token_duration,
+                        ms_to_timedelta(sub.start) + current_offset,
+                        ms_to_timedelta(sub.start) + current_offset + token_duration,
                     ))
                     current_offset += token_duration
         return sequence
 
+    def map_words(self, function):
+        """Return a new WordSequence with words transformed by a function"""
+        sequence = WordSequence()
+        for element in self:
+            sequence.append(WordSequenceElement(
+                function(element.word),
+                element.start_time,
+                element.end_time
+            ))
+        return sequence
+
+    def words(self):
+        """Return the set of the words of the sequence"""
+        return {element.word for element in self}
+
+    def encode(self, encoder):
+        """Encode the words of the sequence, and return three NumPy arrays:
+           encodings, start times and end times (in seconds). Elements whose
+           word has no encoding are left out.
+        """
+        encodings, starts, ends = list(), list(), list()
+        for element in self:
+            encoding = encoder.encode(element.word)
+            if encoding is not None:
+                encodings.append(encoding)
+                starts.append(element.start_time.total_seconds())
+                ends.append(element.end_time.total_seconds())
+        return (
+            numpy.array(encodings, dtype=int),
+            numpy.array(starts, dtype=float),
+            numpy.array(ends, dtype=float)
+        )
+
     def save(self, filename, codec):
         """Write the sequence to a .tsv file"""
         with codecs.open(filename, "w", codec) as file:
@@ -244,25 +184,58 @@ class WordSequence(list):
         """Return duration of the sequence"""
         return self.end() - self.start()
 
-    def find_offset(self, other, lang, default_max_iters, similarity_measure_key):
+    @profiling.profiled
+    def find_offset(self, other, lang, default_max_iters, similarity_measure_key,  # pylint: disable=R0913
+                    search_engine="bruteforce", initial_offset=0, initial_width=None,
+                    encoder=None, target_encoder=None, curves=None):
         """Find a constant offset to apply to the target to align it on the
-           reference.
+           reference. With the 'fft' search engine, the first (coarsest)
+           round covers the full range of overlapping offsets; refinement
+           rounds only evaluate a handful of offsets and are bruteforced.
+           If an initial offset is known up to initial_width seconds, only
+           the finer widths are searched around it. The target may be
+           encoded by a distinct target_encoder. If a list is given as
+           curves, the similarity curve of each round is appended to it
+           (see build_curve).
         """
         logging.info("Finding offset between two sequences")
-        encoder = WordEncoder(lang)
-        total_offset = 0
-        previous_width = None
-        for width in [5, 2, 1, .5, .2, .1, .05, .02, .01]:
+        if encoder is None:
+            encoder = WordEncoder(lang)
+        if target_encoder is None:
+            target_encoder = encoder
+        reference = WordBucketPyramid(encoder, self)
+        target = WordBucketPyramid(target_encoder, other)
+        total_offset = initial_offset
+        previous_width = initial_width
+        for width in BUCKET_WIDTHS:
+            if previous_width is not None and width >= previous_width:
+                continue
             max_iters = default_max_iters
+            engine = SEARCH_ENGINE_INDEX[search_engine]
+            window = None
             if previous_width is not None:
                 max_iters = 2 * math.ceil(previous_width / width) + 1
-            bucket = WordBucketSequence(encoder, self, width, 0)
-            target_bucket = WordBucketSequence(encoder, other, width, total_offset)
-            offset, _ = bucket.find_offset(
-                target_bucket,
-                max_iters,
-                SIMILARITY_MEASURE_INDEX[similarity_measure_key]
-            )
+                engine = WordBucketSequence.similarity_curve
+                window = reference.overlap(target, total_offset, previous_width + width)
+            elif search_engine == "fft":
+                max_iters = None
+            with profiling.span("find_offset %gs" % width):
+                bucket = reference.level(width, 0, window)
+                target_bucket = target.level(width, total_offset, window)
+                offsets, values = engine(
+                    bucket,
+                    target_bucket,
+                    max_iters,
+                    SIMILARITY_MEASURE_INDEX[similarity_measure_key]
+                )
+                offset, _ = curve_peak(offsets, values)
+            if curves is not None:
+                curves.append(build_curve(
+                    "%gs" % width, total_offset - offsets * width, values, width))
+            if profiling.enabled():
+                profiling.count("buckets", len(bucket) + len(target_bucket))
+                profiling.count("offsets_evaluated", evaluated_offsets(
+                    bucket, target_bucket, max_iters))
             total_offset -= offset * width
             previous_width = width
             logging.debug(
@@ -278,54 +251,339 @@ class WordSequence(list):
             )
         return total_offset
 
+    @profiling.profiled
+    def find_offset_by_voting(self, other, lang, default_max_iters,  # pylint: disable=R0913
+                              similarity_measure_key, search_engine="bruteforce",
+                              encoder=None, target_encoder=None, curves=None):
+        """Find a constant offset to apply to the target to align it on the
+           reference. A first estimate is voted by matching word pairs (see
+           vote_offsets), and is then refined with the finer bucket widths.
+           If a list is given as curves, the vote histogram and the
+           similarity curves of the refinement are appended to it.
+        """
+        logging.info("Voting for an offset between two sequences")
+        if encoder is None:
+            encoder = WordEncoder(lang)
+        offsets, votes = vote_offsets(encoder, self, other, target_encoder=target_encoder)
+        if len(votes) == 0:
+            logging.warning("No matching words found; falling back on buckets")
+            return self.find_offset(other, lang, default_max_iters,
+                                    similarity_measure_key, search_engine,
+                                    encoder=encoder, target_encoder=target_encoder,
+                                    curves=curves)
+        if curves is not None:
+            curves.append(build_curve("votes", offsets, votes, ANCHOR_WINDOW))
+        best = int(numpy.argmax(votes))
+        logging.debug(
+            "Voted offset of %.2fs (votes: %.2f)",
+            offsets[best],
+            votes[best]
+        )
+        return self.find_offset(
+            other,
+            lang,
+            default_max_iters,
+            similarity_measure_key,
+            search_engine,
+            initial_offset=float(offsets[best]),
+            initial_width=ANCHOR_WINDOW,
+            encoder=encoder,
+            target_encoder=target_encoder,
+            curves=curves,
+        )
+
+
+def evaluated_offsets(bucket, target_bucket, max_iters):
+    """Return the number of offsets evaluated by a search engine between two
+       WordBucketSequence: max_iters, or every overlapping offset if it is
+       None
+    """
+    if max_iters is not None:
+        return max_iters
+    if len(bucket) == 0 or len(target_bucket) == 0:
+        return 0
+    return max(bucket) - min(bucket) + max(target_bucket) - min(target_bucket) + 1
+
+
+@profiling.profiled
+def vote_offsets(encoder, reference, target, resolution=None, window=None,  # pylint: disable=R0913
+                 target_encoder=None):
+    """Build a histogram of candidate offsets to apply to the target. Each
+       pair of occurrences of a same encoded word in the reference and in the
+       target votes for the difference of their middle times. Each word
+       carries a total weight of one, spread over its pairs, so that rare
+       words count more. Words with more than MAX_ANCHOR_PAIRS pairs are
+       ignored. Votes are summed over a sliding window of the given width
+       (in seconds) to absorb timing noise. Return a pair of NumPy arrays
+       (offsets, votes), offsets being the centers of the histogram bins.
+       The target may be encoded by a distinct target_encoder.
+    """
+    if target_encoder is None:
+        target_encoder = encoder
+    if resolution is None:
+        resolution = ANCHOR_RESOLUTION
+    if window is None:
+        window = ANCHOR_WINDOW
+    index = dict()  # dict of {encoding: reference times}
+    reference_encodings, reference_starts, reference_ends = reference.encode(encoder)
+    target_encodings, target_starts, target_ends = target.encode(target_encoder)
+    for encoding, times in group_by_encoding(
+            reference_encodings, .5 * (reference_starts + reference_ends)):
+        index[encoding] = times
+    bins, weights = list(), list()
+    for encoding, target_times in group_by_encoding(
+            target_encodings, .5 * (target_starts + target_ends)):
+        reference_times = index.get(encoding)
+        if reference_times is None:
+            continue
+        pairs = len(reference_times) * len(target_times)
+        if pairs > MAX_ANCHOR_PAIRS:
+            continue
+        deltas = numpy.subtract.outer(reference_times, target_times).ravel()
+        bins.append(numpy.floor(deltas / resolution).astype(int))
+        weights.append(numpy.full(pairs, 1 / pairs))
+    if len(bins) == 0:
+        return numpy.zeros(0), numpy.zeros(0)
+    bins, weights = numpy.concatenate(bins), numpy.concatenate(weights)
+    first = bins.min()
+    histogram = numpy.bincount(bins - first, weights=weights)
+    kernel = numpy.ones(max(1, int(round(window / resolution))))
+    votes = numpy.convolve(histogram, kernel, mode="same")
+    offsets = (numpy.arange(len(votes)) + first + .5) * resolution
+    return offsets, votes
+
+
+def vote_confidence(offsets, votes, exclusion=None):
+    """Return a pair (peak, ratio) where peak is the highest vote, and ratio
+       is the quotient of the peak by the highest vote further than exclusion
+       seconds from it (infinite if there is none).
+    """
+    if exclusion is None:
+        exclusion = ANCHOR_WINDOW
+    if len(votes) == 0:
+        return 0, 0
+    best = int(numpy.argmax(votes))
+    outside = numpy.abs(offsets - offsets[best]) > exclusion
+    runner_up = votes[outside].max() if outside.any() else 0
+    if runner_up <= 0:
+        return votes[best], math.inf
+    return votes[best], votes[best] / runner_up
+
+
+def curve_peak(offsets, values):
+    """Return the first offset of highest value of a similarity curve, and
+       that value
+    """
+    best = int(numpy.argmax(values))
+    return int(offsets[best]), values[best]
+
+
+def curve_confidence(offsets, values, exclusion):
+    """Return the sharpness of the peak of a similarity curve, between 0 and
+       1: the margin of the peak over the highest value further than
+       exclusion from it, relative to the margin of the peak over the median
+       value. 1 means that no other offset stands out of the baseline, 0
+       that another offset is as likely.
+    """
+    if len(values) == 0:
+        return 0.
+    best = int(numpy.argmax(values))
+    baseline = numpy.median(values)
+    if values[best] <= baseline:
+        return 0.
+    outside = numpy.abs(offsets - offsets[best]) > exclusion
+    runner_up = max(baseline, values[outside].max()) if outside.any() else baseline
+    return float((values[best] - runner_up) / (values[best] - baseline))
+
+
+def build_curve(level, offsets, values, exclusion):
+    """Return the dict of a similarity curve of the offset search: its level
+       name, its offsets (to apply to the target, in seconds) and values
+       sorted by offset, the best offset and the confidence of its peak
+    """
+    order = numpy.argsort(offsets, kind="stable")
+    offsets, values = numpy.asarray(offsets)[order], numpy.asarray(values)[order]
+    best = int(numpy.argmax(values)) if len(values) > 0 else None
+    return {
+        "level": level,
+        "offsets": offsets,
+        "values": values,
+        "best": None if best is None else float(offsets[best]),
+        "confidence": curve_confidence(offsets, values, exclusion),
+    }
+
+
+def group_by_encoding(encodings, values):
+    """Iterate over pairs (encoding, values) where values is the array of
+       values associated with each distinct encoding.
+    """
+    if len(encodings) == 0:
+        return
+    order = numpy.argsort(encodings, kind="stable")
+    encodings, values = encodings[order], values[order]
+    bounds = numpy.concatenate((
+        [0],
+        numpy.flatnonzero(numpy.diff(encodings)) + 1,
+        [len(encodings)]
+    )).tolist()
+    for encoding, low, high in zip(encodings[bounds[:-1]].tolist(), bounds[:-1], bounds[1:]):
+        yield encoding, values[low:high]
+
+
+@functools.lru_cache(maxsize=None)
+def load_stopwords(language):
+    """Return the frozen set of the NLTK stopwords of a language, loaded once
+       per process
+    """
+    import nltk.corpus  # pylint: disable=E0401,C0415
+    return frozenset(nltk.corpus.stopwords.words(language))
+
+
+@functools.lru_cache(maxsize=None)
+def load_stemmer(language):
+    """Return the NLTK Snowball stemmer of a language, built once per process"""
+    import nltk.stem.snowball  # pylint: disable=E0401,C0415
+    return nltk.stem.snowball.SnowballStemmer(language)
+
 
 class WordEncoder:
-    """Map words to integers for faster comparison"""
+    """Map words to integers for faster comparison. Lemmas of an optional
+       vocabulary (sorted NumPy array, such as the destination stems of a
+       stem index) are encoded by their position in it.
+    """
 
-    def __init__(self, language):
-        self.stopwords = frozenset(nltk.corpus.stopwords.words(language))
-        self.stemmer = nltk.stem.snowball.SnowballStemmer(language)
-        self.counter = 0
+    def __init__(self, language, store=None, vocabulary=None):
+        self.language = language
+        self.store = store  # optional store.LemmaStore
+        self.vocabulary = vocabulary
+        self._stopwords = None
+        self._stemmer = None
+        self.counter = 0 if vocabulary is None else len(vocabulary)
         self.index = dict()  # dict of {word: number}
+        self.aliases = dict()  # dict of {number: number} of merged encodings
         self.lemmas = dict()  # dict of {word: lemma}
+        self.pending = dict()  # lemmas not written to the store yet
+        self.hits = 0  # lemmatizations served by the lemmas dict
+        self.misses = 0  # lemmatizations computed by the stemmer
+
+    @property
+    def stopwords(self):
+        """Frozen set of the stopwords of the language, loaded on first use"""
+        if self._stopwords is None:
+            self._stopwords = load_stopwords(self.language)
+        return self._stopwords
+
+    @property
+    def stemmer(self):
+        """Snowball stemmer of the language, built on first use"""
+        if self._stemmer is None:
+            self._stemmer = load_stemmer(self.language)
+        return self._stemmer
 
     def encode(self, word):
         """Return the integer encoding of a word"""
         if " " in word:
-            numbers = list()
-            for sub_word in word.split(" "):
-                lemma = self.lemmatize(sub_word)
-                number = self.index.get(lemma)
-                if number is not None:
-                    numbers.append(number)
-            if len(numbers) > 0:
-                target_number = numbers[0]
-            else:
-                target_number = self.counter
-                self.counter += 1
-            for sub_word in word.split(" "):
-                lemma = self.lemmatize(sub_word)
-                self.index[lemma] = target_number
-            return target_number
+            return self.encode_lemmas([self.lemmatize(sub_word) for sub_word in word.split(" ")])
         lemma = self.lemmatize(word)
         if lemma is None:
             return None
+        return self.encode_lemma(lemma)
+
+    def encode_lemma(self, lemma):
+        """Return the integer encoding of a lemma"""
         number = self.index.get(lemma)
         if number is None:
-            number = self.counter
-            self.counter += 1
+            number = self.vocabulary_position(lemma)
+            if number is None:
+                number = self.counter
+                self.counter += 1
             self.index[lemma] = number
             self.index[number] = lemma
+        while number in self.aliases:
+            number = self.aliases[number]
         return number
 
+    def vocabulary_position(self, lemma):
+        """Return the position of a lemma in the vocabulary, or None"""
+        if self.vocabulary is None:
+            return None
+        position = int(numpy.searchsorted(self.vocabulary, lemma))
+        if position == len(self.vocabulary) or self.vocabulary[position] != lemma:
+            return None
+        return position
+
+    def merge(self, numbers):
+        """Return the integer encoding shared by a group of encodings, such
+           as those of the translations of one word: the first one already
+           given to a lemma, or the first one. The others become aliases of
+           it. Return None for an empty group.
+        """
+        resolved = list()
+        for number in numbers:
+            while number in self.aliases:
+                number = self.aliases[number]
+            resolved.append(number)
+        if len(resolved) == 0:
+            return None
+        encoded = [number for number in resolved if number in self.index]
+        target_number = encoded[0] if len(encoded) > 0 else resolved[0]
+        for number in resolved:
+            if number != target_number:
+                self.aliases[number] = target_number
+        return target_number
+
+    def encode_lemmas(self, lemmas):
+        """Return the integer encoding shared by a group of lemmas, such as
+           the sub-words of one word: the encoding of the first lemma
+           already encoded, or of the first lemma (see merge). Stopwords
+           (None lemmas) are ignored.
+        """
+        lemmas = sorted(
+            (lemma for lemma in lemmas if lemma is not None),
+            key=lambda lemma: lemma not in self.index
+        )
+        return self.merge([self.encode_lemma(lemma) for lemma in lemmas])
+
     def lemmatize(self, word):
         """Return the cannonic form a word, to relax the incoming strict matching"""
-        lemma = self.lemmas.get(word)
-        if lemma is None and word.lower() not in self.stopwords:
+        if word in self.lemmas:
+            self.hits += 1
+            return self.lemmas[word]
+        self.misses += 1
+        lemma = None
+        if word.lower() not in self.stopwords:
             lemma = self.stemmer.stem(word.lower())
-            self.lemmas[word] = lemma
+        self.lemmas[word] = lemma
+        if self.store is not None:
+            self.pending[word] = lemma
         return lemma
 
+    def prefetch(self, words):
+        """Lemmatize words in bulk: lemmas are read from the store in a few
+           queries, and the missing ones are computed and written back
+        """
+        missing = {
+            sub_word
+            for word in words
+            for sub_word in word.split(" ")
+            if sub_word not in self.lemmas
+        }
+        if self.store is not None and len(missing) > 0:
+            found = self.store.get_many(missing)
+            logging.debug("Found %d lemmas out of %d in store", len(found), len(missing))
+            profiling.count("lemma_store_hits", len(found))
+            self.lemmas.update(found)
+            missing.difference_update(found)
+        for word in missing:
+            self.lemmatize(word)
+        self.flush()
+
+    def flush(self):
+        """Write the lemmas computed since the last flush to the store"""
+        if self.store is not None and len(self.pending) > 0:
+            self.store.put_many(self.pending.items())
+            self.pending = dict()
+
 
 
 class WordBucketSequence(dict):
@@ -353,6 +611,28 @@ class WordBucketSequence(dict):
             else:
                 self[bucket_id] = frozenset(self[bucket_id])
 
+    def from_pairs(width, shift, bucket_ids, encodings):  # pylint: disable=E0213
+        """Build a WordBucketSequence from two parallel NumPy arrays of bucket
+           ids and encodings, without walking through a WordSequence.
+        """
+        buckets = WordBucketSequence.__new__(WordBucketSequence)
+        dict.__init__(buckets)
+        buckets.width = width
+        buckets.shift = shift
+        if len(bucket_ids) == 0:
+            return buckets
+        order = numpy.argsort(bucket_ids, kind="stable")
+        bucket_ids, encodings = bucket_ids[order], encodings[order].tolist()
+        bounds = numpy.concatenate((
+            [0],
+            numpy.flatnonzero(numpy.diff(bucket_ids)) + 1,
+            [len(encodings)]
+        )).tolist()
+        for bucket_id, low, high in zip(bucket_ids[bounds[:-1]].tolist(),
+                                        bounds[:-1], bounds[1:]):
+            buckets[bucket_id] = frozenset(encodings[low:high])
+        return buckets
+
     def hash(self, timecode):
         """Take a timedelta object and return a bucket id"""
         return math.floor((timecode.total_seconds() + self.shift) / self.width)
@@ -364,16 +644,168 @@ class WordBucketSequence(dict):
             for bucket_id in self
         ) / len(self)
 
+    def similarity_curve(self, other, max_iters, similarity_measure):
+        """Compute the similarity of the max_iters offsets closest to zero,
+           in search order (0, 1, -1, 2, ...). Return a pair (offsets,
+           values) of NumPy arrays.
+        """
+        offsets = [(-1) ** i * (i // 2) for i in range(1, max_iters + 1)]
+        return numpy.array(offsets, dtype=int), numpy.array([
+            self.similarity(other, offset, similarity_measure)
+            for offset in offsets
+        ], dtype=float)
+
     def find_offset(self, other, max_iters, similarity_measure):
         """Find the best offset to align two WordBucketSequence"""
-        maximum_index, maximum_value = None, None
-        for i in range(1, max_iters + 1):
-            offset = (-1) ** i * (i // 2)
-            similarity = self.similarity(other, offset, similarity_measure)
-            if maximum_value is None or similarity > maximum_value:
-                maximum_value = similarity
-                maximum_index = offset
-        return maximum_index, maximum_value
+        return curve_peak(*self.similarity_curve(other, max_iters, similarity_measure))
+
+    def correlate(self, other, normalize=False):
+        """Compute, for every offset with a non-empty overlap, the sum over
+           buckets of the intersection sizes between self[bucket_id] and
+           other[bucket_id + offset]. All offsets are computed at once with a
+           FFT cross-correlation of per-word indicator signals. If normalize
+           is set, indicators are divided by the square root of their bucket
+           size, so that each term becomes a cosine similarity. Return a pair
+           (offsets, values) of NumPy arrays.
+        """
+        shared = set().union(*self.values()) & set().union(*other.values())
+        self_first, other_first = min(self), min(other)
+        self_length = max(self) - self_first + 1
+        other_length = max(other) - other_first + 1
+        offsets = numpy.arange(-self_length + 1, other_length)\
+            - self_first + other_first
+        if len(shared) == 0:
+            return offsets, numpy.zeros(len(offsets))
+        fft_size = 1 << (self_length + other_length - 2).bit_length()
+        rows = {word: row for row, word in enumerate(sorted(shared))}
+        self_signals = self.indicator_signals(rows, self_first, normalize)
+        other_signals = other.indicator_signals(rows, other_first, normalize)
+        chunk_size = max(1, FFT_CHUNK_CELLS // fft_size)
+        spectrum = numpy.zeros(fft_size // 2 + 1, dtype=complex)
+        for low in range(0, len(rows), chunk_size):
+            high = min(low + chunk_size, len(rows))
+            self_matrix = numpy.zeros((high - low, fft_size))
+            other_matrix = numpy.zeros((high - low, fft_size))
+            for matrix, (signal_rows, signal_cols, signal_weights)\
+                    in [(self_matrix, self_signals), (other_matrix, other_signals)]:
+                mask = (signal_rows >= low) & (signal_rows < high)
+                matrix[signal_rows[mask] - low, signal_cols[mask]] = signal_weights[mask]
+            spectrum += (
+                numpy.conj(numpy.fft.rfft(self_matrix, axis=1))
+                * numpy.fft.rfft(other_matrix, axis=1)
+            ).sum(axis=0)
+        correlation = numpy.fft.irfft(spectrum, fft_size)
+        values = numpy.concatenate((
+            correlation[fft_size - self_length + 1:],
+            correlation[:other_length]
+        ))
+        if not normalize:
+            values = numpy.rint(values)
+        return offsets, values
+
+    def indicator_signals(self, rows, first, normalize):
+        """Return the sparse per-word indicator signals of the buckets, as
+           three arrays (rows, columns, weights). Rows are given by the rows
+           dictionnary, columns are bucket ids relative to first.
+        """
+        signal_rows, signal_cols, signal_weights = list(), list(), list()
+        for bucket_id, bucket in self.items():
+            weight = 1 / math.sqrt(len(bucket)) if normalize else 1
+            for word in bucket:
+                row = rows.get(word)
+                if row is not None:
+                    signal_rows.append(row)
+                    signal_cols.append(bucket_id - first)
+                    signal_weights.append(weight)
+        return (
+            numpy.array(signal_rows, dtype=int),
+            numpy.array(signal_cols, dtype=int),
+            numpy.array(signal_weights, dtype=float)
+        )
+
+    def similarity_curve_fft(self, other, max_iters, similarity_measure):
+        """Compute the similarity of the offsets searched by find_offset,
+           or of the whole overlapping range if max_iters is None, in one
+           FFT cross-correlation. The overlap-count measure is reproduced
+           exactly, other measures are approximated by the cosine similarity
+           of the buckets. Return a pair (offsets, values) of NumPy arrays,
+           in search order.
+        """
+        offsets, values = self.correlate(
+            other,
+            normalize=similarity_measure is not overlap_count
+        )
+        if max_iters is not None:
+            candidates = numpy.array([(-1) ** i * (i // 2) for i in range(1, max_iters + 1)])
+            indices = candidates - offsets[0]
+            inside = (indices >= 0) & (indices < len(offsets))
+            candidate_values = numpy.zeros(len(candidates))
+            candidate_values[inside] = values[indices[inside]]
+            offsets, values = candidates, candidate_values
+        else:
+            order = numpy.lexsort((offsets < 0, numpy.abs(offsets)))
+            offsets, values = offsets[order], values[order]
+        return offsets, values / len(self)
+
+    def find_offset_fft(self, other, max_iters, similarity_measure):
+        """Find the best offset to align two WordBucketSequence using a FFT
+           cross-correlation (see similarity_curve_fft)
+        """
+        return curve_peak(*self.similarity_curve_fft(other, max_iters, similarity_measure))
+
+
+class WordBucketPyramid:
+    """Multi-resolution view of a sequence as WordBucketSequence levels. The
+       words are encoded once, and each level is then hashed from the encoded
+       arrays, so that building a finer level or shifting the sequence does
+       not walk through the sequence elements again.
+    """
+
+    def __init__(self, encoder, sequence):
+        with profiling.span("encode"):
+            self.encodings, self.starts, self.ends = sequence.encode(encoder)
+
+    def span(self):
+        """Return the first start time and the last end time, in seconds"""
+        if len(self.encodings) == 0:
+            return None
+        return self.starts.min(), self.ends.max()
+
+    def overlap(self, other, shift, margin):
+        """Return the time window (in reference time, in seconds) where this
+           sequence and the other one shifted by shift seconds overlap,
+           extended by a margin on both sides, or None if they do not.
+        """
+        self_span, other_span = self.span(), other.span()
+        if self_span is None or other_span is None:
+            return None
+        start = max(self_span[0], other_span[0] + shift) - margin
+        end = min(self_span[1], other_span[1] + shift) + margin
+        if start > end:
+            return None
+        return start, end
+
+    def level(self, width, shift=0, window=None):
+        """Return the WordBucketSequence of given width, for the sequence
+           shifted by shift seconds. If a window (start, end) is given (in
+           shifted time, in seconds), only the elements intersecting it are
+           bucketed.
+        """
+        starts, ends, encodings = self.starts + shift, self.ends + shift, self.encodings
+        if window is not None:
+            mask = (ends >= window[0]) & (starts <= window[1])
+            starts, ends, encodings = starts[mask], ends[mask], encodings[mask]
+        first = numpy.floor(starts / width).astype(int)
+        counts = numpy.maximum(0, numpy.floor(ends / width).astype(int) - first + 1)
+        elements = numpy.repeat(numpy.arange(len(first)), counts)
+        ranks = numpy.arange(len(elements))\
+            - numpy.repeat(numpy.cumsum(counts) - counts, counts)
+        return WordBucketSequence.from_pairs(
+            width,
+            shift,
+            first[elements] + ranks,
+            encodings[elements]
+        )
 
 
 def jaccard_index(bucket_a, bucket_b):
@@ -397,3 +829,21 @@ SIMILARITY_MEASURE_INDEX = {
     "overlap-coeff": overlap_coefficient,
     "overlap-count": overlap_count
 }
+
+SEARCH_ENGINE_INDEX = {
+    "bruteforce": WordBucketSequence.similarity_curve,
+    "fft": WordBucketSequence.similarity_curve_fft,
+}
+
+# Maximum number of cells of the dense matrices used by the FFT engine
+FFT_CHUNK_CELLS = 1 << 22
+
+# Bucket widths (in seconds) successively used to find an offset
+BUCKET_WIDTHS = [5, 2, 1, .5, .2, .1, .05, .02, .01]
+
+# Anchor voting histogram bin width and smoothing window (in seconds)
+ANCHOR_RESOLUTION = .1
+ANCHOR_WINDOW = 2
+
+# Words with more occurrence pairs than this are ignored by anchor voting
+MAX_ANCHOR_PAIRS = 10000
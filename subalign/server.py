@@ -0,0 +1,316 @@
+"""Local HTTP server running alignments in warm worker processes.
+
+Endpoints (JSON bodies):
+
+- ``POST /align``: ``input`` (path) or ``subtitles`` (SubRip content), and
+  ``reference`` (path) or ``reference_id`` (returned by a previous
+  alignment), with optional ``output`` (path relative to the output
+  folder of the server) and ``options`` (see ``REQUEST_OPTIONS``).
+  Returns the alignment summary, with the shifted ``subtitles`` if they
+  were given as content.
+- ``POST /plot``: ``reference`` and ``input`` subtitle paths. Returns the
+  SVG figure.
+- ``GET /status``: number of running and queued requests.
+"""
+
+import os
+import json
+import shutil
+import logging
+import tempfile
+import itertools
+import threading
+import http.server
+import multiprocessing
+from .cli import build_parser
+from .core import check_output_file
+from .core import initialize_worker
+from .core import run_in_worker
+from .core import worker_temp_folder
+from .core import LowConfidenceError
+from .core import UnknownReferenceError
+from .lang import LANGUAGES
+from .sequence import load_stopwords
+from .sequence import load_stemmer
+from .speech import get_decoder
+from .translate import get_translator
+
+# Arguments that requests may override
+REQUEST_OPTIONS = frozenset([
+    "reference_language",
+    "input_language",
+    "fragment_count",
+    "fragment_duration",
+    "fragment_selection",
+    "dialogue_weight",
+    "adaptive",
+    "confidence_ratio",
+    "keyword_decoding",
+    "max_iters",
+    "similarity_measure",
+    "search_engine",
+    "strategy",
+    "keep_subs",
+    "tokenizer",
+    "stem_index",
+    "columnar",
+    "stream_audio",
+    "plot_start",
+    "plot_end",
+    "plot_resolution",
+    "curve",
+    "dump_curve",
+    "min_confidence",
+])
+
+# Options holding a language code (see lang.LANGUAGES)
+LANGUAGE_OPTIONS = frozenset(["reference_language", "input_language"])
+
+# Command line actions of the request options, to validate their values
+OPTION_ACTIONS = {
+    action.dest: action
+    for action in build_parser()._actions  # pylint: disable=W0212
+    if action.dest in REQUEST_OPTIONS
+}
+
+
+class RequestError(Exception):
+    """Error to report to the client with an HTTP status code"""
+
+    def __init__(self, status, message):
+        super(RequestError, self).__init__(message)
+        self.status = status
+
+
+class AlignmentServer(http.server.ThreadingHTTPServer):
+    """HTTP server submitting its requests to a pool of worker processes
+       (see core.initialize_worker). At most concurrency requests run at
+       once, and at most queue_size more wait for a worker; further
+       requests are rejected.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, args, pool, concurrency, queue_size):
+        super(AlignmentServer, self).__init__(address, AlignmentRequestHandler)
+        self.args = args
+        self.pool = pool
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.slots = threading.Semaphore(concurrency)
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.counter = itertools.count()
+
+    def status(self):
+        """Return the numbers of running and queued requests"""
+        with self.lock:
+            pending = self.pending
+        running = min(pending, self.concurrency)
+        return {"running": running, "queued": pending - running}
+
+    def submit(self, action, options):
+        """Run an action in a worker with options, once a slot is free.
+           Return the worker result.
+        """
+        with self.lock:
+            if self.pending >= self.concurrency + self.queue_size:
+                raise RequestError(503, "Too many pending requests")
+            self.pending += 1
+        number = next(self.counter)
+        try:
+            with self.slots:
+                return self.pool.apply_async(run_in_worker, ((action, number, options),)).get()
+        finally:
+            shutil.rmtree(worker_temp_folder(self.args, number), ignore_errors=True)
+            with self.lock:
+                self.pending -= 1
+
+    def output_path(self, filename):
+        """Return the path of a file written by a request, relative to the
+           output folder of the server, whose folder is created. Paths
+           outside of the output folder are rejected.
+        """
+        folder = os.path.realpath(self.args.output_folder)
+        path = os.path.realpath(os.path.join(folder, filename))
+        if os.path.commonpath([folder, path]) != folder:
+            raise RequestError(403, "%s is outside of the output folder" % filename)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def align(self, request):
+        """Handle an alignment request"""
+        options = parse_options(request)
+        if options.get("dump_curve") is not None:
+            options["dump_curve"] = self.output_path(options["dump_curve"])
+        if request.get("reference_id") is not None:
+            options["reference_id"] = str(request["reference_id"])
+        elif request.get("reference") is not None:
+            options["reference_file"] = str(request["reference"])
+        else:
+            raise RequestError(400, "Missing 'reference' or 'reference_id'")
+        with tempfile.TemporaryDirectory() as folder:
+            if request.get("subtitles") is not None:
+                options["input_file"] = os.path.join(folder, "input.srt")
+                with open(options["input_file"], "w", encoding="utf8") as file:
+                    file.write(str(request["subtitles"]))
+            elif request.get("input") is not None:
+                options["input_file"] = str(request["input"])
+            else:
+                raise RequestError(400, "Missing 'input' or 'subtitles'")
+            if request.get("output") is not None:
+                options["output_file"] = self.output_path(str(request["output"]))
+            else:
+                options["output_file"] = os.path.join(folder, "output.srt")
+            try:
+                check_output_file(options["input_file"], options["output_file"])
+            except ValueError as error:
+                raise RequestError(400, str(error)) from error
+            result = self.submit("align", options)
+            result.pop("profile", None)
+            if result["error"] is not None:
+                status = 500
+                if result["error"].startswith(UnknownReferenceError.__name__):
+                    status = 404
+                elif result["error"].startswith(LowConfidenceError.__name__):
+                    status = 422
+                raise RequestError(status, result["error"])
+            if request.get("subtitles") is not None:
+                with open(options["output_file"], "r", encoding="utf8") as file:
+                    result["subtitles"] = file.read()
+            if request.get("output") is None:
+                result["output"] = None
+            result["input"] = request.get("input")
+        return result
+
+    def plot(self, request):
+        """Handle a plot request, returning the SVG content"""
+        if request.get("reference") is None or request.get("input") is None:
+            raise RequestError(400, "Missing 'reference' or 'input'")
+        options = parse_options(request)
+        options["reference_file"] = str(request["reference"])
+        options["input_file"] = str(request["input"])
+        with tempfile.TemporaryDirectory() as folder:
+            options["output_file"] = os.path.join(folder, "plot.svg")
+            self.submit("plot", options)
+            with open(options["output_file"], "r", encoding="utf8") as file:
+                return file.read()
+
+
+def parse_options(request):
+    """Return the argument overrides of a request, converted to the types of
+       the command line options. Invalid values are rejected.
+    """
+    options = request.get("options") or dict()
+    if not isinstance(options, dict):
+        raise RequestError(400, "'options' must be an object")
+    unknown = set(options).difference(REQUEST_OPTIONS)
+    if len(unknown) > 0:
+        raise RequestError(400, "Unknown options: %s" % ", ".join(sorted(unknown)))
+    parsed = dict()
+    for name, value in options.items():
+        action = OPTION_ACTIONS[name]
+        if value is not None and action.type is not None:
+            try:
+                value = action.type(value)
+            except (TypeError, ValueError) as error:
+                raise RequestError(400, "Invalid value for '%s': %s" % (name, error)) from error
+        if action.choices is not None and value not in action.choices:
+            raise RequestError(400, "Invalid value for '%s': %r" % (name, value))
+        if name in LANGUAGE_OPTIONS and value not in LANGUAGES:
+            raise RequestError(400, "Unknown language '%s'" % value)
+        parsed[name] = value
+    return parsed
+
+
+class AlignmentRequestHandler(http.server.BaseHTTPRequestHandler):
+    """Request handler of an AlignmentServer"""
+
+    def log_message(self, format, *args):  # pylint: disable=W0622
+        logging.debug("%s - %s", self.address_string(), format % args)
+
+    def send_content(self, status, content, content_type):
+        """Send a response"""
+        content = content.encode("utf8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def send_json(self, status, data):
+        """Send a JSON response"""
+        self.send_content(status, json.dumps(data), "application/json")
+
+    def read_request(self):
+        """Read the JSON object of the request body"""
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            request = json.loads(self.rfile.read(length).decode("utf8") or "{}")
+        except ValueError as error:
+            raise RequestError(400, "Invalid JSON: %s" % error) from error
+        if not isinstance(request, dict):
+            raise RequestError(400, "The request must be a JSON object")
+        return request
+
+    def do_GET(self):  # pylint: disable=C0103
+        """Handle GET requests"""
+        if self.path == "/status":
+            self.send_json(200, self.server.status())
+        else:
+            self.send_json(404, {"error": "Unknown path %s" % self.path})
+
+    def do_POST(self):  # pylint: disable=C0103
+        """Handle POST requests"""
+        try:
+            if self.path == "/align":
+                self.send_json(200, self.server.align(self.read_request()))
+            elif self.path == "/plot":
+                self.send_content(200, self.server.plot(self.read_request()), "image/svg+xml")
+            else:
+                raise RequestError(404, "Unknown path %s" % self.path)
+        except RequestError as error:
+            self.send_json(error.status, {"error": str(error)})
+        except Exception as error:  # pylint: disable=W0703
+            logging.exception("Could not handle request")
+            self.send_json(500, {"error": "%s: %s" % (type(error).__name__, error)})
+
+
+def initialize_server_worker(args):
+    """Store the base arguments in a worker process, and load the models of
+       the default languages, so that the first request is served warm
+    """
+    initialize_worker(args)
+    ref_lang = LANGUAGES[args.reference_language]
+    tgt_lang = LANGUAGES[args.input_language]
+    try:
+        load_stopwords(ref_lang.nltk)
+        load_stemmer(ref_lang.nltk)
+        get_decoder(ref_lang.iso)
+        if tgt_lang != ref_lang and not args.stem_index:
+            get_translator(tgt_lang.word2word, ref_lang.word2word)
+    except Exception:  # pylint: disable=W0703
+        logging.warning("Could not preload models", exc_info=True)
+
+
+def serve(args):
+    """Serve action: run the alignment server until interrupted"""
+    logging.info("Entering serve action")
+    with multiprocessing.Pool(
+            args.jobs,
+            initializer=initialize_server_worker,
+            initargs=(args,)) as pool:
+        server = AlignmentServer(
+            (args.host, args.port),
+            args,
+            pool,
+            args.jobs,
+            args.queue_size
+        )
+        logging.info("Serving on http://%s:%d", *server.server_address[:2])
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
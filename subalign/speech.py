@@ -5,7 +5,15 @@ import os
 import codecs
 import datetime
 import logging
-import pocketsphinx  # pylint: disable=E0401
+import functools
+import multiprocessing
+from .audio import open_audio
+from .audio import SAMPLE_WIDTH
+from .audio import BYTE_RATE
+from . import profiling
+
+# Detection threshold of keyword spotting
+KEYWORD_THRESHOLD = "1e-20"
 
 
 class TranscriptFragment:
@@ -150,74 +158,232 @@ class Transcript(list):
         return transcript
 
 
-def byte_int(raw):
-    """Convert bytes from WAVE header to an integer"""
-    return int.from_bytes(bytearray(raw), byteorder="little", signed=True)
+def model_path(language):
+    """Return the path to the CMUSphinx model folder of a language"""
+    return os.path.join("stt", language)
 
 
-def configure_decoder(language):
+def configure_decoder(language, keywords=None):
     """Initialize a pocketsphinx Decoder with the appropriate configuration.
+       If keywords is the path to a keyword list file, the decoder only
+       spots those keywords instead of searching the whole language model.
        TODO: Support language configuration
     """
+    import pocketsphinx  # pylint: disable=E0401,C0415
     config = pocketsphinx.Decoder.default_config()
-    model_path = os.path.join("stt", language)
-    logging.debug("Loading CMUSphinx model from %s", os.path.realpath(model_path))
-    config.set_string("-hmm", os.path.join(model_path, "acoustic-model"))
-    config.set_string("-lm", os.path.join(model_path, "language-model.lm.bin"))
-    config.set_string("-dict", os.path.join(model_path, "pronounciation-dictionary.dict"))
+    path = model_path(language)
+    logging.debug("Loading CMUSphinx model from %s", os.path.realpath(path))
+    config.set_string("-hmm", os.path.join(path, "acoustic-model"))
+    config.set_string("-lm", os.path.join(path, "language-model.lm.bin"))
+    config.set_string("-dict", os.path.join(path, "pronounciation-dictionary.dict"))
     config.set_string("-logfn", os.devnull)
     config.set_boolean("-remove_silence", False)
-    return pocketsphinx.Decoder(config)
+    decoder = pocketsphinx.Decoder(config)
+    if keywords is not None:
+        decoder.set_kws("keywords", keywords)
+        decoder.set_search("keywords")
+    return decoder
+
+
+# Decoders without keyword search, by language, reused by the successive
+# speech-to-text runs of a process
+DECODERS = dict()
+
+
+def get_decoder(language, keywords=None):
+    """Return a decoder for a language. Decoders searching the whole
+       language model are loaded once per process.
+    """
+    if keywords is not None:
+        return configure_decoder(language, keywords)
+    if language not in DECODERS:
+        DECODERS[language] = configure_decoder(language)
+    return DECODERS[language]
 
 
-def speech_to_text(filename, fragment_count, fragment_duration, language):
-    """Return a Transcript from an audio file"""
+def read_dictionary(filename):
+    """Return the set of words of a CMUSphinx pronunciation dictionary"""
+    words = set()
+    with codecs.open(filename, "r", "utf8") as file:
+        for line in file:
+            split = line.split(maxsplit=1)
+            if split:
+                words.add(re.sub(r"\(\d+\)$", "", split[0]))
+    return words
+
+
+def write_keyword_list(words, language, filename, excluded=frozenset()):
+    """Write a CMUSphinx keyword list with the words that can be spotted by
+       the model of a language, i.e. those of its pronunciation dictionary,
+       except excluded ones. Return the number of written keywords.
+    """
+    dictionary = read_dictionary(
+        os.path.join(model_path(language), "pronounciation-dictionary.dict"))
+    keywords = sorted(
+        word for word in set(word.lower() for word in words)
+        if word in dictionary and word not in excluded
+    )
     logging.info(
-        "Using Speech-to-text on %s (%d fragments of %ds)",
-        os.path.realpath(filename),
-        fragment_count,
+        "Writing %d keywords to %s",
+        len(keywords),
+        os.path.realpath(filename)
+    )
+    with codecs.open(filename, "w", "utf8") as file:
+        for keyword in keywords:
+            file.write("%s /%s/\n" % (keyword, KEYWORD_THRESHOLD))
+    return len(keywords)
+
+
+def decode_fragment(decoder, audio, anchor, fragment_duration):
+    """Decode one fragment of an audio source (see audio.open_audio),
+       starting at byte anchor of its data, and return a TranscriptFragment
+    """
+    offset = (anchor // SAMPLE_WIDTH * SAMPLE_WIDTH) / BYTE_RATE
+    with profiling.span("decode_fragment", offset=offset):
+        samples = audio.fragment(anchor, fragment_duration)
+        profiling.count("decoded_seconds", len(samples) / BYTE_RATE)
+        decoder.start_stream()
+        decoder.start_utt()
+        decoder.process_raw(samples, False, False)
+        decoder.end_utt()
+        samples.release()
+    logging.debug(
+        "Fragment at %.2fs hypothesis: %s",
+        offset,
+        decoder.hyp().hypstr if decoder.hyp() is not None else "None"
+    )
+    return TranscriptFragment.from_decoder(
+        offset,
+        fragment_duration,
+        decoder
+    )
+
+
+# State of a speech_to_text worker process: its decoder and its audio source
+WORKER_STATE = dict()
+
+
+def initialize_worker(audio, language, keywords):
+    """Load the decoder and open the audio source of a worker process"""
+    profiling.initialize_worker()
+    WORKER_STATE["decoder"] = configure_decoder(language, keywords)
+    WORKER_STATE["audio"] = open_audio(audio)
+
+
+def decode_fragment_in_worker(anchor, fragment_duration):
+    """Decode one fragment with the state of the current worker process.
+       Return the fragment and the profiling records of the worker (see
+       profiling.take).
+    """
+    fragment = decode_fragment(
+        WORKER_STATE["decoder"],
+        WORKER_STATE["audio"],
+        anchor,
         fragment_duration
     )
+    return fragment, profiling.take()
+
+
+def merge_worker_records(results):
+    """Iterate over the fragments of pairs (fragment, records) returned by
+       decode_fragment_in_worker, merging the records into the profiler of
+       the current process
+    """
+    for fragment, records in results:
+        profiling.merge(records)
+        yield fragment
+
+
+def spread_order(anchors):
+    """Reorder anchors so that any prefix of the result is spread over the
+       whole range: the first anchor, then the middle one, then quarters...
+    """
+    anchors = sorted(anchors)
+    remaining = list(range(len(anchors)))
+    order = list()
+    numerator, denominator = 0, 1
+    while remaining:
+        target = numerator / denominator * len(anchors)
+        nearest = min(remaining, key=lambda index, target=target: abs(index - target))
+        remaining.remove(nearest)
+        order.append(anchors[nearest])
+        numerator += 2
+        if numerator > denominator:
+            numerator, denominator = 1, 2 * denominator
+    return order
+
+
+@profiling.profiled
+def speech_to_text(audio, fragment_count, fragment_duration, language,  # pylint: disable=R0913
+                   jobs=1, anchors=None, stop=None, keywords=None):
+    """Return a Transcript from an audio file name or an audio source (see
+       audio.open_audio). Fragments start at the given byte anchors, or are
+       evenly spaced if anchors is None. They are decoded by a pool of jobs
+       processes if jobs is greater than one.
+       If a stop function is given, fragments are decoded in a spread order
+       (see spread_order), and decoding stops as soon as stop returns True
+       when called with the transcript decoded so far. If keywords is the
+       path to a keyword list, only those keywords are spotted.
+    """
+    logging.info(
+        "Using Speech-to-text on %s (%d fragments of %ds, %d job(s))",
+        audio,
+        fragment_count,
+        fragment_duration,
+        jobs
+    )
+    with open_audio(audio) as source:
+        bytesize = source.bytesize()
+    if anchors is None:
+        step = max(SAMPLE_WIDTH, bytesize // fragment_count // SAMPLE_WIDTH * SAMPLE_WIDTH)
+        anchors = list(range(0, bytesize, step))
+    if stop is not None:
+        anchors = spread_order(anchors)
     transcript = Transcript()
-    byte_rate = 16000 * 2  # sample rate * sample width
-    buffer_size = 1024
-    buffer = bytearray(buffer_size)
-    decoder = configure_decoder(language)
-    seconds_per_buffer = buffer_size / byte_rate
-    with open(filename, "rb") as file:
-        assert file.read(4).decode("ascii") == "RIFF"  # ChunkID
-        file.seek(8)
-        assert file.read(4).decode("ascii") == "WAVE"  # Format
-        assert file.read(4).decode("ascii") == "fmt "  # Subchunk1ID
-        assert byte_int(file.read(4)) == 16  # Subchunk1Size (PCM)
-        assert byte_int(file.read(2)) == 1  # AudioFormat (PCM)
-        assert byte_int(file.read(2)) == 1  # NumChannels
-        assert byte_int(file.read(4)) == 16000  # SampleRate
-        assert byte_int(file.read(4)) == 32000  # ByteRate
-        assert byte_int(file.read(2)) == 2  # BlockAlign
-        assert byte_int(file.read(2)) == 16  # BitsPerSample
-        assert file.read(4).decode("ascii") == "data"  # Subchunk2ID
-        bytesize = byte_int(file.read(4))  # Subchunk2Size
-        for i, anchor in enumerate(range(0, bytesize, bytesize // fragment_count)):
-            file.seek(anchor)
-            offset_time = 0
-            decoder.start_stream()
-            decoder.start_utt()
-            while file.readinto(buffer):
-                offset_time += seconds_per_buffer
-                decoder.process_raw(buffer, False, False)
-                if offset_time >= fragment_duration:
-                    break
-            decoder.end_utt()
-            transcript.append(TranscriptFragment.from_decoder(
-                anchor / byte_rate,
-                fragment_duration,
-                decoder
-            ))
-            logging.debug(
-                "Fragment %d/%d hypothesis: %s",
-                i + 1,
-                fragment_count,
-                decoder.hyp().hypstr if decoder.hyp() is not None else "None"
+    if jobs <= 1:
+        decoder = get_decoder(language, keywords)
+        with open_audio(audio) as source:
+            collect_fragments(
+                transcript,
+                (decode_fragment(decoder, source, anchor, fragment_duration)
+                 for anchor in anchors),
+                len(anchors),
+                stop
             )
+    else:
+        with multiprocessing.Pool(
+                min(jobs, len(anchors)),
+                initializer=initialize_worker,
+                initargs=(audio, language, keywords)) as pool:
+            collect_fragments(
+                transcript,
+                merge_worker_records(pool.imap(
+                    functools.partial(
+                        decode_fragment_in_worker,
+                        fragment_duration=fragment_duration
+                    ),
+                    anchors,
+                    chunksize=1
+                )),
+                len(anchors),
+                stop
+            )
+    transcript.sort(key=lambda fragment: fragment.offset)
     return transcript
+
+
+def collect_fragments(transcript, fragments, total, stop):
+    """Append fragments to a transcript, until the stop function, if any,
+       returns True
+    """
+    for fragment in fragments:
+        transcript.append(fragment)
+        if stop is not None and stop(transcript):
+            logging.info(
+                "Stopped speech-to-text after %d/%d fragments",
+                len(transcript),
+                total
+            )
+            return
+    if stop is not None:
+        logging.info("Decoded all %d fragments without reaching confidence", total)
@@ -0,0 +1,144 @@
+"""Precompiled cross-lingual stem index, mapping the stems of the words of
+   one language to the stems of their translations in another language.
+   Indexes are built offline from the word2word lexicons, and stored as
+   NumPy arrays that are memory-mapped when loaded.
+"""
+
+import os
+import logging
+import numpy  # pylint: disable=E0401
+from .sequence import WordEncoder
+from .translate import get_translator
+
+# Number of translations kept per word, as word2word returns by default
+TRANSLATIONS_PER_WORD = 5
+
+# Arrays of an index: sorted source stems, sorted destination stems, and the
+# destination stem ids of each source stem in compressed sparse row format
+INDEX_ARRAYS = ["from_stems", "to_stems", "offsets", "values"]
+
+
+def index_folder(folder, from_language, to_language):
+    """Return the folder of the index of a language pair (Language objects)"""
+    return os.path.join(folder, "%s-%s" % (from_language.iso, to_language.iso))
+
+
+def build_stem_index(folder, from_language, to_language):
+    """Build and save the stem index of a language pair (Language objects).
+       Each source stem is mapped to the union of the stems of the
+       translations of the words sharing this stem. Stopwords are left out.
+       Return the number of indexed source stems.
+    """
+    logging.info("Building '%s' to '%s' stem index", from_language.iso, to_language.iso)
+    translator = get_translator(from_language.word2word, to_language.word2word)
+    from_encoder = WordEncoder(from_language.nltk)
+    to_encoder = WordEncoder(to_language.nltk)
+    mapping = dict()
+    for word, word_id in translator.word2x.items():
+        from_stem = from_encoder.lemmatize(word)
+        if from_stem is None:
+            continue
+        for translation_id in translator.x2ys.get(word_id, [])[:TRANSLATIONS_PER_WORD]:
+            to_stem = to_encoder.lemmatize(translator.y2word[translation_id].lower())
+            if to_stem is not None:
+                mapping.setdefault(from_stem, set()).add(to_stem)
+    from_stems = sorted(mapping)
+    to_stems = sorted(set().union(*mapping.values()))
+    to_ids = {stem: i for i, stem in enumerate(to_stems)}
+    offsets = numpy.zeros(len(from_stems) + 1, dtype=numpy.int32)
+    values = list()
+    for i, stem in enumerate(from_stems):
+        values.extend(sorted(to_ids[to_stem] for to_stem in mapping[stem]))
+        offsets[i + 1] = len(values)
+    path = index_folder(folder, from_language, to_language)
+    os.makedirs(path, exist_ok=True)
+    arrays = {
+        "from_stems": numpy.array(from_stems, dtype=str),
+        "to_stems": numpy.array(to_stems, dtype=str),
+        "offsets": offsets,
+        "values": numpy.array(values, dtype=numpy.int32),
+    }
+    for name in INDEX_ARRAYS:
+        numpy.save(os.path.join(path, name + ".npy"), arrays[name])
+    logging.info("Indexed %d stems into %d stems at %s", len(from_stems), len(to_stems), path)
+    return len(from_stems)
+
+
+class StemIndex:
+    """Memory-mapped stem index of a language pair"""
+
+    def __init__(self, path):
+        self.path = path
+        arrays = {
+            name: numpy.load(os.path.join(path, name + ".npy"), mmap_mode="r")
+            for name in INDEX_ARRAYS
+        }
+        self.from_stems = arrays["from_stems"]
+        self.to_stems = arrays["to_stems"]
+        self.offsets = arrays["offsets"]
+        self.values = arrays["values"]
+
+    def __len__(self):
+        return len(self.from_stems)
+
+    def lookup(self, stem):
+        """Return the array of the ids of the destination stems of a source
+           stem (their positions in to_stems), or None if it is not indexed
+        """
+        position = int(numpy.searchsorted(self.from_stems, stem))
+        if position == len(self.from_stems) or self.from_stems[position] != stem:
+            return None
+        return self.values[self.offsets[position]:self.offsets[position + 1]]
+
+
+def load_stem_index(folder, from_language, to_language):
+    """Return the StemIndex of a language pair, or None if it was not built"""
+    path = index_folder(folder, from_language, to_language)
+    if not os.path.isfile(os.path.join(path, INDEX_ARRAYS[-1] + ".npy")):
+        logging.warning(
+            "No '%s' to '%s' stem index in %s (see the index action)",
+            from_language.iso,
+            to_language.iso,
+            folder
+        )
+        return None
+    return StemIndex(path)
+
+
+class CrossLingualEncoder:
+    """Encoder of the words of one language into the encoding space of a
+       WordEncoder of another language, through a stem index: a word is
+       stemmed, and its stem is mapped to the stems of its translations.
+       Words missing from the index are encoded as they are, as translation
+       would have kept them untouched. The WordEncoder must have the
+       destination stems of the index as vocabulary, so that their ids are
+       their encodings.
+    """
+
+    def __init__(self, encoder, index, language):
+        if encoder.vocabulary is not index.to_stems:
+            raise ValueError("The encoder vocabulary must be the destination stems of the index")
+        self.encoder = encoder
+        self.index = index
+        self.source = WordEncoder(language)
+        self.encodings = dict()  # dict of {word: number}
+
+    def encode(self, word):
+        """Return the integer encoding of a word"""
+        if word in self.encodings:
+            return self.encodings[word]
+        numbers = list()
+        for sub_word in word.split(" "):
+            stem = self.source.lemmatize(sub_word)
+            if stem is None:
+                continue
+            to_ids = self.index.lookup(stem)
+            if to_ids is None:
+                number = self.encoder.encode(sub_word)
+                if number is not None:
+                    numbers.append(number)
+            else:
+                numbers.extend(to_ids.tolist())
+        number = self.encoder.merge(numbers)
+        self.encodings[word] = number
+        return number
@@ -0,0 +1,139 @@
+"""Persistent key-value tables, shared by concurrent processes"""
+
+import os
+import time
+import sqlite3
+import logging
+import contextlib
+
+# Seconds to wait for a lock held by another process
+BUSY_TIMEOUT = 30
+
+# Maximum number of keys per query (SQLite limits the number of variables)
+QUERY_CHUNK_SIZE = 500
+
+# Default maximum number of rows of a store file
+MAX_ENTRIES = 1000000
+
+
+class KeyValueStore:
+    """SQLite table of string values addressed by a namespace and a string
+       key. Several processes may read and write the same file: it is opened
+       in write-ahead logging mode and writes are serialized by immediate
+       transactions. The number of rows is bounded by evicting the least
+       recently used ones.
+    """
+
+    def __init__(self, filename, table, namespace, max_entries=MAX_ENTRIES):
+        self.filename = filename
+        self.table = table
+        self.namespace = namespace
+        self.max_entries = max_entries
+        os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+        self.connection = sqlite3.connect(
+            filename,
+            timeout=BUSY_TIMEOUT,
+            isolation_level=None,
+            check_same_thread=False
+        )
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        with self.transaction():
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS %s (namespace TEXT NOT NULL, "
+                "key TEXT NOT NULL, value TEXT, used REAL NOT NULL, "
+                "PRIMARY KEY (namespace, key))" % table)
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS %s_used ON %s (used)" % (table, table))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self):
+        """Close the database connection"""
+        self.connection.close()
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Context manager holding the write lock of the database"""
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.connection.execute("COMMIT")
+
+    def get_many(self, keys):
+        """Return a dict of the values of the stored keys among keys. Values
+           may be None.
+        """
+        keys = list(keys)
+        values = dict()
+        now = time.time()
+        with self.transaction():
+            for i in range(0, len(keys), QUERY_CHUNK_SIZE):
+                chunk = keys[i:i + QUERY_CHUNK_SIZE]
+                condition = "namespace = ? AND key IN (%s)" % ",".join("?" * len(chunk))
+                values.update(self.connection.execute(
+                    "SELECT key, value FROM %s WHERE %s" % (self.table, condition),
+                    [self.namespace] + chunk
+                ))
+                self.connection.execute(
+                    "UPDATE %s SET used = ? WHERE %s" % (self.table, condition),
+                    [now, self.namespace] + chunk
+                )
+        return values
+
+    def put_many(self, items):
+        """Store pairs (key, value), and evict the least recently used rows if
+           the table is too large
+        """
+        now = time.time()
+        with self.transaction():
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO %s (namespace, key, value, used) "
+                "VALUES (?, ?, ?, ?)" % self.table,
+                ((self.namespace, key, value, now) for key, value in items)
+            )
+            count, = self.connection.execute(
+                "SELECT COUNT(*) FROM %s" % self.table).fetchone()
+            if count > self.max_entries:
+                logging.debug("Evicting %d rows from %s", count - self.max_entries, self.filename)
+                self.connection.execute(
+                    "DELETE FROM %s WHERE rowid IN (SELECT rowid FROM %s "
+                    "ORDER BY used LIMIT ?)" % (self.table, self.table),
+                    [count - self.max_entries]
+                )
+
+    def __len__(self):
+        count, = self.connection.execute(
+            "SELECT COUNT(*) FROM %s WHERE namespace = ?" % self.table,
+            [self.namespace]
+        ).fetchone()
+        return count
+
+
+class LemmaStore(KeyValueStore):
+    """Store of the lemmas of words in one language. Stopwords have a None
+       lemma.
+    """
+
+    def __init__(self, filename, language, max_entries=MAX_ENTRIES):
+        super(LemmaStore, self).__init__(filename, "lemmas", language, max_entries)
+
+
+class TranslationStore(KeyValueStore):
+    """Store of the word translations from one language to another. Unknown
+       words have a None translation.
+    """
+
+    def __init__(self, filename, from_language, to_language, max_entries=MAX_ENTRIES):
+        super(TranslationStore, self).__init__(
+            filename,
+            "translations",
+            "%s-%s" % (from_language, to_language),
+            max_entries
+        )
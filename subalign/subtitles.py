@@ -3,31 +3,54 @@
 """
 import re
 import os
-import codecs
-import datetime
 import logging
 
 
-def parse_subrip_timecode(timecode):
-    """Returns a datetime.time object from a SubRip timecode string"""
-    return datetime.datetime.strptime(timecode.strip(), "%H:%M:%S,%f").time()
+# A SubRip cue: optional index line, timecode line and non-empty text lines.
+# Text lines stop at the next timecode line (and its index line), so that
+# cues missing their blank separator line are still split.
+SUBRIP_TIMECODE = r"(\d+):(\d{1,2}):(\d{1,2})[,.](\d{1,3})"
+SUBRIP_CUE_PATTERN = re.compile(
+    r"^[ \t]*(?:\d+[ \t]*\n[ \t]*)?"
+    + SUBRIP_TIMECODE + r"[ \t]*-->[ \t]*" + SUBRIP_TIMECODE + r"[^\n]*\n"
+    r"((?:(?![ \t]*(?:\d+[ \t]*\n[ \t]*)?\d+:\d+:\d+[,.]\d+[ \t]*-->)"
+    r"[^\n]*\S[^\n]*(?:\n|\Z))+)",
+    re.MULTILINE
+)
+
+
+# Subtitles enclosed in brackets or stars describe sounds or images
+DESCRIPTION_PATTERN = re.compile(r"^[\*\(\[^].+[\*\(\[^]$")
+
 
+def subrip_milliseconds(hours, minutes, seconds, fraction):
+    """Return a number of milliseconds from the string groups of a SubRip
+       timecode
+    """
+    return ((int(hours) * 60 + int(minutes)) * 60 + int(seconds)) * 1000\
+        + int(fraction.ljust(3, "0"))
 
-def format_time_to_subrip_timecode(timestamp):
-    """Returns a SubRip timecode string from a datetime.time object"""
-    return timestamp.strftime("%H:%M:%S") + ",%s" % timestamp.strftime("%f")[:3]
+
+def parse_subrip_timecode(timecode):
+    """Returns a number of milliseconds from a SubRip timecode string"""
+    match = re.fullmatch(SUBRIP_TIMECODE, timecode.strip())
+    if match is None:
+        raise ValueError("Invalid SubRip timecode '%s'" % timecode)
+    return subrip_milliseconds(*match.groups())
 
 
-def add_delta_to_time(timestamp, delta):
-    """Utility to add a datetime.timedelta object to a datetime.time one"""
-    return (
-        datetime.datetime.combine(datetime.date(2012, 1, 1), timestamp)
-        + datetime.timedelta(seconds=delta)
-    ).time()
+def format_subrip_timecode(milliseconds):
+    """Returns a SubRip timecode string from a number of milliseconds"""
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return "%02d:%02d:%02d,%03d" % (hours, minutes, seconds, milliseconds)
 
 
 class Subtitle:
-    """A class to represent one subtitle entry."""
+    """A class to represent one subtitle entry. Times are integer
+       milliseconds.
+    """
 
     def __init__(self, start, end, text):
         self.start = start
@@ -39,16 +62,17 @@ class Subtitle:
 
     def __str__(self):
         return "Sub(%s, %s): %s" % (
-            self.start,
-            self.end,
+            format_subrip_timecode(self.start),
+            format_subrip_timecode(self.end),
             self.text.replace("\n", "\\n")
         )
 
     def shift(self, offset):
-        """Create a copy with shifted times"""
+        """Create a copy with times shifted by offset seconds, clamped at 0"""
+        delta = round(offset * 1000)
         return Subtitle(
-            add_delta_to_time(self.start, offset),
-            add_delta_to_time(self.end, offset),
+            max(0, self.start + delta),
+            max(0, self.end + delta),
             self.text
         )
 
@@ -60,7 +84,7 @@ class Subtitle:
             return False
         if "♪" in self.text:
             return False
-        if re.match(r"^[\*\(\[^].+[\*\(\[^]$", self.text):
+        if DESCRIPTION_PATTERN.match(self.text):
             return False
         return True
 
@@ -75,8 +99,10 @@ class SubtitleFormatter:
         """Read a filename and output a list of Subtitle"""
         raise NotImplementedError
 
-    def write(self, subs, filename, codec):
-        """Write a list of subtitles to a file"""
+    def write(self, subs, filename, codec, offset=0):
+        """Write a list of subtitles to a file, with times shifted by offset
+           seconds and clamped at 0
+        """
         raise NotImplementedError
 
 
@@ -87,42 +113,37 @@ class SubRipFormatter(SubtitleFormatter):
         super(SubRipFormatter, self).__init__("srt")
 
     def read(self, filename, codec):
-        subs = list()
         logging.debug("Reading subtitles file at %s",
                       os.path.realpath(filename))
-        with codecs.open(filename, "r", codec) as file:
-            buffer = {"time": "", "text": ""}
-            for line in file.readlines():
-                if not line.strip() and buffer["time"] and buffer["text"]:
-                    timecode_start, timecode_end = buffer["time"].split("-->")
-                    subs.append(Subtitle(
-                        parse_subrip_timecode(timecode_start),
-                        parse_subrip_timecode(timecode_end),
-                        buffer["text"]
-                    ))
-                    buffer = {"time": "", "text": ""}
-                elif re.match(r"^\d+$", line.strip()):
-                    continue
-                elif re.match(r"^[\d:, ]+-->[\d:, ]+$", line.strip()):
-                    buffer["time"] = line.strip()
-                else:
-                    if buffer["text"]:
-                        buffer["text"] += "\n"
-                    buffer["text"] += line.strip()
+        with open(filename, "r", encoding=codec) as file:
+            content = file.read()
+        if content.startswith("\ufeff"):
+            content = content[1:]
+        subs = list()
+        for match in SUBRIP_CUE_PATTERN.finditer(content):
+            groups = match.groups()
+            subs.append(Subtitle(
+                subrip_milliseconds(*groups[0:4]),
+                subrip_milliseconds(*groups[4:8]),
+                "\n".join(line.strip() for line in groups[8].strip().split("\n"))
+            ))
         logging.debug("Loaded %s subtitles", len(subs))
         return subs
 
-    def write(self, subs, filename, codec):
+    def write(self, subs, filename, codec, offset=0):
         logging.info("Writing %d subtitles to %s",
                      len(subs), os.path.realpath(filename))
-        with codecs.open(filename, "w", codec) as file:
-            for i, sub in enumerate(subs):
-                file.write("%d\n%s --> %s\n%s\n\n" % (
+        delta = round(offset * 1000)
+        with open(filename, "w", encoding=codec) as file:
+            file.write("".join(
+                "%d\n%s --> %s\n%s\n\n" % (
                     i + 1,
-                    format_time_to_subrip_timecode(sub.start),
-                    format_time_to_subrip_timecode(sub.end),
+                    format_subrip_timecode(max(0, sub.start + delta)),
+                    format_subrip_timecode(max(0, sub.end + delta)),
                     sub.text
-                ))
+                )
+                for i, sub in enumerate(subs)
+            ))
 
 
 class SubtitleFactory:
@@ -148,14 +169,43 @@ class SubtitleFactory:
         return self.formatters[extension].read(filename, self.codec)
 
     def write(self, subs, filename, extension="srt"):
-        """Write a list of subtitles to a file"""
+        """Write a list of subtitles, or a ShiftedSubtitles view, to a file"""
         if extension not in self.formatters:
             logging.warning(
                 "No subtitles formatter found for extension '%s'", extension)
             extension = "srt"
-        self.formatters[extension].write(subs, filename, self.codec)
+        offset = 0
+        if isinstance(subs, ShiftedSubtitles):
+            subs, offset = subs.subs, subs.offset
+        self.formatters[extension].write(subs, filename, self.codec, offset)
+
+
+class ShiftedSubtitles:
+    """Read-only view of a list of Subtitle with times shifted by offset
+       seconds and clamped at 0. The list is never copied: cues are shifted
+       when accessed, and SubtitleFactory.write applies the offset while
+       formatting. Shifting a view composes the offsets.
+    """
+
+    def __init__(self, subs, offset):
+        if isinstance(subs, ShiftedSubtitles):
+            subs, offset = subs.subs, subs.offset + offset
+        self.subs = subs
+        self.offset = offset
+
+    def __len__(self):
+        return len(self.subs)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return ShiftedSubtitles(self.subs[index], self.offset)
+        return self.subs[index].shift(self.offset)
+
+    def __iter__(self):
+        for sub in self.subs:
+            yield sub.shift(self.offset)
 
 
 def shift_subs(subs, offset):
-    """Create a copy of subs with shifted timecodes"""
-    return [sub.shift(offset) for sub in subs]
+    """Return a view of subs with shifted timecodes"""
+    return ShiftedSubtitles(subs, offset)
@@ -0,0 +1,134 @@
+"""SVG plots comparing two word sequences, written to the file as the
+   sequences are traversed. When a long time range is plotted, word groups
+   within the same resolution unit are merged into aggregate rectangles, and
+   labels are left out.
+"""
+
+import codecs
+import datetime
+from xml.sax.saxutils import escape
+
+# Number of resolution units across the plot when the resolution is not given
+PLOT_UNITS = 4000
+
+# Word labels are only written if the resolution is at most this (seconds)
+MAX_LABEL_RESOLUTION = .1
+
+# Candidate spacings of the time axis labels (seconds), and maximum number
+# of labels
+AXIS_STEPS = [1, 2, 5, 10, 15, 30, 60, 120, 300, 600, 900, 1800, 3600]
+MAX_AXIS_LABELS = 200
+
+HEADER = "".join([
+    '<?xml version="1.0" encoding="UTF-8" standalone="no"?>',
+    '<svg xmlns="http://www.w3.org/2000/svg" viewBox="%f %f %f %f">',
+    '<rect x="%f" y="%f" width="%f" height="%f" fill="white" />',
+    '<defs>',
+    '<pattern id="small_grid" width=".1" height=".1" patternUnits="userSpaceOnUse">',
+    '<path d="M 0 0 L 0 0 0 .1" fill="none" stroke="gray" stroke-width=".002"/>',
+    '</pattern>',
+    '<pattern id="grid" width="1" height="1" patternUnits="userSpaceOnUse">',
+    '<rect width="1" height="1" fill="url(#small_grid)"/>',
+    '<path d="M 0 0 L 0 0 0 1" fill="none" stroke="gray" stroke-width=".02"/>',
+    '</pattern>',
+    '</defs>',
+    '<rect x="%f" y="%f" width="%f" height="%f" fill="url(#grid)" />',
+    '<line stroke="black" stroke-width=".01" x1="%f" y1="0" x2="%f" y2="0" />',
+])
+
+# Fill color and vertical position of the rectangles, and vertical positions
+# of the alternating labels, of the reference and of the target
+ROWS = [
+    ("#4c72b0", -1.3, (-.6, -1)),
+    ("#dd8452", .3, (.6, 1)),
+]
+
+
+def axis_step(duration):
+    """Return the spacing of the time axis labels for a plotted duration"""
+    for step in AXIS_STEPS:
+        if duration / step <= MAX_AXIS_LABELS:
+            return step
+    return AXIS_STEPS[-1]
+
+
+def merge_groups(groups, resolution):
+    """Merge consecutive word groups (text, start, end) as long as the
+       merged span lasts at most resolution seconds, so that at most one
+       rectangle is drawn per resolution unit. Yield tuples (text, start,
+       end, count), text being None for merged groups of count > 1.
+    """
+    merged = None
+    for text, start, end in groups:
+        if merged is not None and end - merged[1] <= resolution:
+            merged[0] = None
+            merged[2] = max(merged[2], end)
+            merged[3] += 1
+            continue
+        if merged is not None:
+            yield tuple(merged)
+        merged = [text, start, end, 1]
+    if merged is not None:
+        yield tuple(merged)
+
+
+def write_row(file, groups, row, resolution, labels):
+    """Write the rectangles of one sequence, and return its labels to write
+       once all the rectangles are drawn
+    """
+    color, top, label_heights = ROWS[row]
+    file.write('<g fill="%s" stroke="black" stroke-width="0.005">' % color)
+    texts = list()
+    for text, start, end, count in merge_groups(groups, resolution):
+        if count > 1:
+            file.write(
+                '<rect x="%.3f" y="%.3f" width="%.3f" height="1" fill-opacity=".5">'
+                '<title>%d word groups</title></rect>'
+                % (start, top, end - start, count))
+            continue
+        file.write('<rect x="%.3f" y="%.3f" width="%.3f" height="1" />' % (start, top, end - start))
+        if labels:
+            texts.append('<text x="%.3f" y="%.3f">%s</text>' % (
+                .5 * (start + end), label_heights[len(texts) % 2], escape(text)))
+    file.write("</g>")
+    return texts
+
+
+def write_comparison(reference, target, filename, min_start=None, max_end=None,  # pylint: disable=R0913
+                     resolution=None, padding=.2):
+    """Write a SVG file comparing two word sequences, between min_start and
+       max_end seconds if given. Word groups are merged by resolution units
+       (see merge_groups); by default, the resolution divides the plotted
+       duration into PLOT_UNITS.
+    """
+    first = min(reference.start(), target.start()).total_seconds()
+    last = max(reference.end(), target.end()).total_seconds()
+    if min_start is not None:
+        first = max(first, min_start)
+    if max_end is not None:
+        last = min(last, max_end)
+    first, last = first - padding, last + padding
+    if resolution is None:
+        resolution = (last - first) / PLOT_UNITS
+    view_box = (first, -1.5, last - first, 3)
+    step = axis_step(last - first)
+    with codecs.open(filename, "w", "utf8") as file:
+        file.write(HEADER % (view_box + view_box + view_box + (first, last)))
+        file.write('<g font-family="Segoe UI" font-size=".09" text-anchor="middle">')
+        for i in range(int(first / step), int(last / step)):
+            file.write('<text x="%d" y=".12">%s</text>' % (
+                i * step, datetime.timedelta(seconds=i * step)))
+        file.write("</g>")
+        labels = resolution <= MAX_LABEL_RESOLUTION
+        texts = list()
+        for row, sequence in enumerate([reference, target]):
+            texts += write_row(
+                file,
+                sequence.iter_groups(min_start, max_end),
+                row,
+                resolution,
+                labels
+            )
+        file.write('<g font-family="Segoe UI" font-size=".1" text-anchor="middle" fill="black">')
+        file.write("".join(texts))
+        file.write("</g></svg>")
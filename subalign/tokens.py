@@ -0,0 +1,141 @@
+"""Tokenization of subtitle texts into words. The default tokenizer is
+   NLTK's word_tokenize, which splits sentences with Punkt before applying
+   the rules of its word tokenizer. The regex tokenizer applies the rules of
+   the word tokenizer of NLTK 3.6.5 (see requirements.txt) once over all the
+   cues of a file, joined by a separator, instead of once per cue. It does
+   not split sentences, so tokens may differ at sentence ends inside a cue.
+"""
+
+import re
+
+# Tokens dropped before normalization: any substring of this string
+SKIPPED_PUNCTUATION = ",.;:/\\\"#()[]-_{}$%*?!'`"
+SKIPPED_TOKENS = frozenset(
+    SKIPPED_PUNCTUATION[i:j]
+    for i in range(len(SKIPPED_PUNCTUATION))
+    for j in range(i, len(SKIPPED_PUNCTUATION) + 1)
+)
+
+NON_WORD_PATTERN = re.compile(r"\W+")
+
+# Character joining the cues of a batch. Rules anchored at the start or the
+# end of a text are anchored at separators instead, and negated character
+# classes never match it, so that no rule spans two cues.
+SEPARATOR = "\x00"
+TEXT_START = r"(?<![^\x00])"
+TEXT_END = r"(?![^\x00])"
+
+# Rules of nltk.tokenize.NLTKWordTokenizer (NLTK 3.6.5), in the same order,
+# as triples (characters, pattern, substitution): a rule is skipped when the
+# batch contains none of its characters
+STARTING_QUOTES = [
+    ("«“‘„`", re.compile("([«“‘„]|[`]+)"), r" \1 "),
+    ("\"", re.compile(TEXT_START + r"\""), r"``"),
+    ("`", re.compile(r"(``)"), r" \1 "),
+    ("\"'", re.compile(r"([ \(\[{<])(\"|\'{2})"), r"\1 `` "),
+    ("'", re.compile(r"(?i)(\')(?!re|ve|ll|m|t|s|d|n)(\w)\b"), r"\1 \2"),
+]
+PUNCTUATION = [
+    (".", re.compile(r"([^\.\x00])(\.)([\]\)}>\"\'»”’ ]*)\s*" + TEXT_END), r"\1 \2 \3 "),
+    (":,", re.compile(r"([:,])([^\d\x00])"), r" \1 \2"),
+    (":,", re.compile(r"([:,])" + TEXT_END), r" \1 "),
+    (".", re.compile(r"\.{2,}"), r" \g<0> "),
+    (";@#$%&", re.compile(r"[;@#$%&]"), r" \g<0> "),
+    (".", re.compile(r"([^\.\x00])(\.)([\]\)}>\"\']*)\s*" + TEXT_END), r"\1 \2\3 "),
+    ("?!", re.compile(r"[?!]"), r" \g<0> "),
+    ("'", re.compile(r"([^'\x00])' "), r"\1 ' "),
+    ("*", re.compile(r"[*]"), r" \g<0> "),
+    ("[](){}<>", re.compile(r"[\]\[\(\)\{\}\<\>]"), r" \g<0> "),
+    ("-", re.compile(r"--"), r" -- "),
+]
+ENDING_QUOTES = [
+    ("»”’", re.compile("([»”’])"), r" \1 "),
+    ("\"", re.compile(r'"'), " '' "),
+    ("'", re.compile(r"([^\s\x00])('')"), r"\1 \2 "),
+    ("'", re.compile(r"([^' \x00])('[sS]|'[mM]|'[dD]|') "), r"\1 \2 "),
+    ("'", re.compile(r"([^' \x00])('ll|'LL|'re|'RE|'ve|'VE|n't|N'T) "), r"\1 \2 "),
+]
+
+# NLTK's contractions rules split each word at a fixed position. Those of a
+# pass match disjoint words; the passes are applied in the order of NLTK, as
+# the ' 'tis' and ' 'twas' rules may match spaces inserted by previous ones
+CONTRACTIONS = {
+    "cannot": 3,
+    "d'ye": 1,
+    "gimme": 3,
+    "gonna": 3,
+    "gotta": 3,
+    "lemme": 3,
+    "more'n": 4,
+    "wanna": 3,
+    " 'tis": 3,
+    " 'twas": 3,
+}
+CONTRACTIONS_PATTERNS = [
+    re.compile(r"(?i)\b(?:cannot|d'ye|gimme|gonna|gotta|lemme|more'n)\b|\bwanna(?=\s)"),
+    re.compile(r"(?i) 'tis\b"),
+    re.compile(r"(?i) 'twas\b"),
+]
+
+
+def split_contraction(match):
+    """Substitution function for CONTRACTIONS_PATTERNS"""
+    word = match.group(0)
+    position = CONTRACTIONS[word.lower()]
+    return " %s %s " % (word[:position].strip(), word[position:])
+
+
+def apply_rules(rules, batch):
+    """Apply a list of rules (characters, pattern, substitution) to a string"""
+    for characters, pattern, substitution in rules:
+        if any(char in batch for char in characters):
+            batch = pattern.sub(substitution, batch)
+    return batch
+
+
+TOKENIZERS = ["regex", "nltk"]
+
+
+def tokenize_batch(texts):
+    """Split a list of texts into lists of raw tokens, as NLTK's word
+       tokenizer would split each of them
+    """
+    if len(texts) == 0:
+        return list()
+    batch = SEPARATOR.join(text.replace(SEPARATOR, " ") for text in texts)
+    batch = apply_rules(STARTING_QUOTES + PUNCTUATION, batch)
+    batch = " %s " % batch.replace(SEPARATOR, " %s " % SEPARATOR)
+    batch = apply_rules(ENDING_QUOTES, batch)
+    for pattern in CONTRACTIONS_PATTERNS:
+        batch = pattern.sub(split_contraction, batch)
+    return [text.split() for text in batch.split(SEPARATOR)]
+
+
+def tokenize_nltk(texts, language):
+    """Split a list of texts into lists of raw tokens with NLTK, including
+       Punkt sentence splitting
+    """
+    import nltk.tokenize  # pylint: disable=E0401,C0415
+    return [nltk.tokenize.word_tokenize(text, language=language) for text in texts]
+
+
+def normalize_tokens(tokens):
+    """Drop punctuation tokens and replace non-word characters with spaces"""
+    return [
+        NON_WORD_PATTERN.sub(" ", token).strip()
+        for token in tokens
+        if token not in SKIPPED_TOKENS
+    ]
+
+
+def tokenize_subs(subs, language, tokenizer="nltk"):
+    """Tokenize the intradiegetic subtitles of a list, returning a list of
+       pairs (sub, tokens)
+    """
+    subs = [sub for sub in subs if sub.is_intradiegetic()]
+    texts = [sub.text for sub in subs]
+    if tokenizer == "nltk":
+        batches = tokenize_nltk(texts, language)
+    else:
+        batches = tokenize_batch(texts)
+    return [(sub, normalize_tokens(tokens)) for sub, tokens in zip(subs, batches)]
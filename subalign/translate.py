@@ -1,17 +1,60 @@
 """This module provides tools to translate subs from one language to another"""
 
 import logging
-import word2word  #pylint: disable=E0401
+from . import profiling
 
+# Process-wide word2word translators, by (from, to) language pair
+TRANSLATORS = dict()
 
-def translate(sequence, from_language, to_language):
-    """Translate a WordSequence from one language to another"""
+
+def get_translator(from_language, to_language):
+    """Return the word2word translator for a language pair, loading its
+       lexicon on first use only
+    """
+    key = (from_language, to_language)
+    if key not in TRANSLATORS:
+        import word2word  # pylint: disable=E0401,C0415
+        logging.debug("Loading '%s' to '%s' lexicon", from_language, to_language)
+        TRANSLATORS[key] = word2word.Word2word(from_language, to_language)
+    return TRANSLATORS[key]
+
+
+def translate_words(words, from_language, to_language, store=None):
+    """Return a dict mapping each of the unique words to its translation, or
+       None if it is unknown. Translations are read from and written to an
+       optional store.TranslationStore.
+    """
+    words = set(words)
+    translations = dict()
+    if store is not None:
+        translations = store.get_many(words)
+        logging.debug("Found %d translations out of %d in store", len(translations), len(words))
+    missing = words.difference(translations)
+    if len(missing) > 0:
+        translator = get_translator(from_language, to_language)
+        computed = dict()
+        for word in missing:
+            try:
+                computed[word] = " ".join(map(lambda s: s.lower(), translator(word)))
+            except KeyError:
+                computed[word] = None
+        translations.update(computed)
+        if store is not None:
+            store.put_many(computed.items())
+    return translations
+
+
+@profiling.profiled
+def translate(sequence, from_language, to_language, store=None):
+    """Translate a WordSequence from one language to another. Each unique
+       word is translated once; unknown words are left untouched.
+    """
     logging.info("Translating sequence from '%s' to '%s'", from_language, to_language)
-    translator = word2word.Word2word(from_language, to_language)
-    new_sequence = sequence.offset(0)
-    for element in new_sequence:
-        try:
-            element.word = " ".join(map(lambda s: s.lower(), translator(element.word)))
-        except KeyError:
-            pass
-    return new_sequence
+    translations = translate_words(sequence.words(), from_language, to_language, store)
+
+    def translate_word(word):
+        """Translate one word, leaving unknown words untouched"""
+        translation = translations.get(word)
+        return word if translation is None else translation
+
+    return sequence.map_words(translate_word)
@@ -0,0 +1,58 @@
+"""Tests for subalign.activity"""
+
+import os
+import math
+import wave
+import struct
+import datetime
+import unittest
+import tempfile
+import subalign.activity
+import subalign.sequence
+
+
+def write_bursts(filename, duration, bursts, sample_rate=16000):
+    """Write a WAVE file of faint noise, with 200Hz tone bursts at the given
+       (start, end) time ranges, in seconds
+    """
+    samples = list()
+    for i in range(duration * sample_rate):
+        time = i / sample_rate
+        if any(start <= time < end for start, end in bursts):
+            samples.append(int(8000 * math.sin(2 * math.pi * 200 * time)))
+        else:
+            samples.append((i * 7919) % 21 - 10)
+    with wave.open(filename, "wb") as file:
+        file.setnchannels(1)
+        file.setsampwidth(2)
+        file.setframerate(sample_rate)
+        file.writeframes(struct.pack("<%dh" % len(samples), *samples))
+
+
+class SelectFragmentsTest(unittest.TestCase):
+
+    """Test case for subalign.activity.select_fragments"""
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.folder.name, "audio.wav")
+        write_bursts(self.filename, 60, [(10, 15), (40, 45)])
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_speech_windows(self):
+        """Check that the windows with tone bursts are selected"""
+        anchors = subalign.activity.select_fragments(self.filename, 2, 5)
+        self.assertEqual(2, len(anchors))
+        for anchor, expected in zip(anchors, [10, 40]):
+            self.assertEqual(0, anchor % 2)
+            self.assertAlmostEqual(expected, anchor / 32000, delta=.5)
+
+    def test_dialogue_weight(self):
+        """Check that the dialogue density breaks ties between windows"""
+        sequence = subalign.sequence.WordSequence.from_list([
+            ("hello", datetime.timedelta(seconds=40), datetime.timedelta(seconds=45)),
+        ])
+        anchors = subalign.activity.select_fragments(self.filename, 1, 5, sequence, .5)
+        self.assertAlmostEqual(40, anchors[0] / 32000, delta=.5)
@@ -0,0 +1,146 @@
+"""Tests for subalign.audio"""
+
+import os
+import sys
+import mmap
+import struct
+import unittest
+import tempfile
+import unittest.mock
+import subalign.audio
+import subalign.extract
+
+
+# Imitation of FFMPEG, serving 3 seconds of samples whose values are their
+# indices modulo 10000, and failing on track 9
+FAKE_FFMPEG = """#!%s
+import sys, struct
+args = sys.argv[1:]
+if "pipe:1" not in args:
+    sys.stderr.write("  Duration: 00:00:03.00, start: 0.000000, bitrate: 256 kb/s\\n")
+    sys.exit(1)
+if "0:9" in args:
+    sys.stderr.write("Stream map '0:9' matches no streams.\\n")
+    sys.exit(1)
+start = float(args[args.index("-ss") + 1]) if "-ss" in args else 0
+duration = float(args[args.index("-t") + 1]) if "-t" in args else 3 - start
+first = int(start * 16000)
+last = min(48000, first + int(duration * 16000))
+sys.stdout.buffer.write(struct.pack("<%%dh" %% (last - first),
+                                    *(i %% 10000 for i in range(first, last))))
+""" % sys.executable
+
+
+def wave_bytes(samples, sample_rate=16000, channels=1, extra_chunks=b""):
+    """Build a WAVE file content, with extra chunks before the data chunk"""
+    fmt = struct.pack("<HHIIHH", 1, channels, sample_rate,
+                      sample_rate * 2 * channels, 2 * channels, 16)
+    data = struct.pack("<%dh" % len(samples), *samples)
+    body = b"WAVE" + b"fmt " + struct.pack("<I", len(fmt)) + fmt + extra_chunks\
+        + b"data" + struct.pack("<I", len(data)) + data
+    return b"RIFF" + struct.pack("<I", len(body)) + body
+
+
+class WaveFileTest(unittest.TestCase):
+
+    """Test case for subalign.audio.WaveFile"""
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.folder.name, "audio.wav")
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def write(self, content):
+        """Write the test file"""
+        with open(self.filename, "wb") as file:
+            file.write(content)
+
+    def test_extra_chunks(self):
+        """Check that chunks before the data chunk are skipped"""
+        self.write(wave_bytes(range(32000), extra_chunks=b"LIST\x03\x00\x00\x00abc\x00"))
+        with subalign.audio.WaveFile(self.filename) as wave:
+            self.assertEqual(64000, wave.bytesize())
+            self.assertEqual(2, wave.duration())
+            fragment = wave.fragment(16001, .5)
+            self.assertEqual((8000, 8001), struct.unpack("<2h", fragment[:4]))
+            self.assertEqual(16000, len(fragment))
+            fragment.release()
+
+    def test_truncated(self):
+        """Check that a placeholder data size is clamped to the file size"""
+        content = bytearray(wave_bytes(range(100)))
+        content[40:44] = struct.pack("<I", 0xFFFFFFFF)
+        self.write(bytes(content[:-1]))
+        with subalign.audio.WaveFile(self.filename) as wave:
+            self.assertEqual(198, wave.bytesize())
+
+    def test_short_fmt(self):
+        """Check that short or truncated fmt chunks are rejected"""
+        content = wave_bytes(range(100))
+        with self.assertRaisesRegex(ValueError, "fmt"):
+            subalign.audio.find_wave_data(content[:12] + b"fmt " + struct.pack("<I", 8)
+                                          + content[20:28] + content[36:])
+        with self.assertRaisesRegex(ValueError, "fmt"):
+            subalign.audio.find_wave_data(content[:30])
+
+    def test_unsupported(self):
+        """Check that unsupported formats are rejected"""
+        self.write(wave_bytes(range(100), sample_rate=44100))
+        with self.assertRaises(ValueError):
+            subalign.audio.WaveFile(self.filename)
+        self.write(b"not a wave file")
+        maps, original = list(), mmap.mmap
+
+        def record_mmap(*args, **kwargs):
+            maps.append(original(*args, **kwargs))
+            return maps[-1]
+
+        with unittest.mock.patch("subalign.audio.mmap.mmap", record_mmap):
+            with self.assertRaises(ValueError):
+                subalign.audio.WaveFile(self.filename)
+        self.assertTrue(maps[0].closed)
+
+
+class FFmpegAudioTest(unittest.TestCase):
+
+    """Test case for subalign.audio.FFmpegAudio"""
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.ffmpeg = os.path.join(self.folder.name, "ffmpeg")
+        with open(self.ffmpeg, "w") as file:
+            file.write(FAKE_FFMPEG)
+        os.chmod(self.ffmpeg, 0o755)
+        self.audio = subalign.audio.FFmpegAudio(self.ffmpeg, "video.mkv", 2)
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_duration(self):
+        """Check that the duration is probed"""
+        self.assertEqual(3, self.audio.duration())
+        self.assertEqual(96000, self.audio.bytesize())
+        self.assertEqual(5025.5, subalign.extract.parse_ffmpeg_duration(
+            "Duration: 01:23:45.50, start"))
+        self.assertIsNone(subalign.extract.parse_ffmpeg_duration("nothing"))
+
+    def test_fragment(self):
+        """Check that fragments are decoded from the seeked position"""
+        fragment = self.audio.fragment(32001, .5)
+        self.assertEqual(16000, len(fragment))
+        self.assertEqual((6000, 6001), struct.unpack("<2h", fragment[:4]))
+
+    def test_blocks(self):
+        """Check that the whole stream is read by blocks"""
+        blocks = list(self.audio.iter_blocks(40000))
+        self.assertEqual([40000, 40000, 16000], [len(block) for block in blocks])
+
+    def test_errors(self):
+        """Check that FFMPEG errors are raised with its message"""
+        audio = subalign.audio.FFmpegAudio(self.ffmpeg, "video.mkv", 9)
+        with self.assertRaisesRegex(ValueError, "matches no streams"):
+            audio.fragment(0, .5)
+        with self.assertRaisesRegex(ValueError, "matches no streams"):
+            list(audio.iter_blocks(40000))
@@ -0,0 +1,126 @@
+"""Tests for subalign.batch"""
+
+import os
+import json
+import random
+import unittest
+import tempfile
+import subalign.cli
+import subalign.core
+import subalign.batch
+from subalign.subtitles import Subtitle
+from subalign.subtitles import SubtitleFactory
+
+
+def touch(folder, filename):
+    """Create an empty file"""
+    with open(os.path.join(folder, filename), "w"):
+        pass
+
+
+def random_subtitles(seed, offset=0):
+    """Return three minutes of subtitles made of random pseudo-words,
+       shifted by offset seconds
+    """
+    rng = random.Random(seed)
+    words = ["".join(rng.choice("bdfgklmnprstvz") + rng.choice("aeiou") for _ in range(3))
+             for _ in range(300)]
+    subs, time = list(), 2000
+    while time < 180000:
+        start = time + round(offset * 1000)
+        subs.append(Subtitle(start, start + 2000, " ".join(rng.choices(words, k=8))))
+        time += rng.randint(2500, 6000)
+    return subs
+
+
+class MatchPairsTest(unittest.TestCase):
+
+    """Test case for subalign.batch.match_pairs"""
+
+    def test_keys(self):
+        """Check episode and name keys"""
+        self.assertEqual((1, 2), subalign.batch.pair_key("Show.S01E02.720p.mkv"))
+        self.assertEqual((1, 2), subalign.batch.pair_key("show-1x02-fr.srt"))
+        self.assertEqual("movie", subalign.batch.pair_key("Movie.fr.srt"))
+
+    def test_match(self):
+        """Check that files are matched by episode, and others left out"""
+        with tempfile.TemporaryDirectory() as references, \
+                tempfile.TemporaryDirectory() as inputs:
+            for filename in ["show.s01e01.mkv", "show.s01e02.mp4", "notes.txt"]:
+                touch(references, filename)
+            for filename in ["Show - 1x02.srt", "Show - 1x01.srt", "Show - 1x03.srt"]:
+                touch(inputs, filename)
+            pairs = subalign.batch.match_pairs(references, inputs)
+        self.assertEqual(
+            [("show.s01e01.mkv", "Show - 1x01.srt"), ("show.s01e02.mp4", "Show - 1x02.srt")],
+            [(os.path.basename(reference), os.path.basename(subs)) for reference, subs in pairs]
+        )
+
+    def test_manifest(self):
+        """Check that manifest paths are relative to the manifest"""
+        with tempfile.TemporaryDirectory() as folder:
+            filename = os.path.join(folder, "manifest.json")
+            with open(filename, "w") as file:
+                json.dump([
+                    {"reference": "a.mkv", "input": "a.srt"},
+                    {"reference": "b.mkv", "input": "b.srt", "output": "out/b.srt"},
+                ], file)
+            self.assertEqual(
+                [
+                    (os.path.join(folder, "a.mkv"), os.path.join(folder, "a.srt"), None),
+                    (os.path.join(folder, "b.mkv"), os.path.join(folder, "b.srt"),
+                     os.path.join(folder, "out/b.srt")),
+                ],
+                subalign.batch.read_manifest(filename)
+            )
+
+
+class BatchTest(unittest.TestCase):
+
+    """Test case for subalign.core.batch"""
+
+    def test_workers(self):
+        """Check that parallel alignments write their outputs in subfolders,
+           and all their cache entries, and that the unused output folder is
+           not created
+        """
+        with tempfile.TemporaryDirectory() as folder:
+            factory = SubtitleFactory("utf8")
+            manifest = list()
+            for seed in range(2):
+                reference = os.path.join(folder, "reference-%d.srt" % seed)
+                factory.write(random_subtitles(seed), reference)
+                factory.write(
+                    random_subtitles(seed, 4.5),
+                    os.path.join(folder, "input-%d.srt" % seed)
+                )
+                manifest.append({
+                    "reference": os.path.basename(reference),
+                    "input": "input-%d.srt" % seed,
+                    "output": "aligned/%d/output.srt" % seed,
+                })
+            with open(os.path.join(folder, "manifest.json"), "w") as file:
+                json.dump(manifest, file)
+            args = subalign.cli.build_parser().parse_args([
+                "batch", os.path.join(folder, "manifest.json"), "-rl", "en", "-il", "en",
+                "-tk", "regex",
+                "-j", "2",
+                "-tmp", os.path.join(folder, "tmp"),
+                "-of", os.path.join(folder, "output"),
+                "--cache-folder", os.path.join(folder, "cache"),
+                "--summary-file", os.path.join(folder, "summary.json"),
+            ])
+            summary = subalign.core.batch(args)
+            self.assertEqual(2, summary["aligned"])
+            for seed, result in enumerate(summary["results"]):
+                self.assertAlmostEqual(-4.5, result["offset"], delta=.05)
+                self.assertTrue(os.path.isfile(
+                    os.path.join(folder, "aligned", str(seed), "output.srt")))
+            self.assertFalse(os.path.isdir(os.path.join(folder, "output")))
+            with open(os.path.join(folder, "cache", "index.json")) as file:
+                entries = json.load(file)["entries"]
+            self.assertEqual(
+                {result["reference_id"] for result in summary["results"]},
+                {key for key in entries if entries[key]["path"].endswith("ref_seq.tsv")}
+            )
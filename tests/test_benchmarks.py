@@ -0,0 +1,94 @@
+"""Tests for the benchmarks package"""
+
+import os
+import tempfile
+import unittest
+from benchmarks import accuracy
+from benchmarks import generators
+from benchmarks import suite
+from subalign.subtitles import SubtitleFactory
+
+
+class GeneratorsTest(unittest.TestCase):
+
+    """Test case for benchmarks.generators"""
+
+    def test_subtitles(self):
+        """Check that subtitles are reproducible, shifted and span the duration"""
+        subs = generators.synthetic_subtitles(10, 100, seed=3)
+        shifted = generators.synthetic_subtitles(10, 100, seed=3, offset=2.5)
+        self.assertEqual([sub.text for sub in subs], [sub.text for sub in shifted])
+        self.assertEqual([sub.start + 2500 for sub in subs], [sub.start for sub in shifted])
+        self.assertGreater(subs[-1].end, 9 * 60000)
+        self.assertLess(subs[-1].start, 10 * 60000)
+
+    def test_known_offset(self):
+        """Check that the offset of the synthetic subtitles is found"""
+        workspace = suite.Workspace(None, 5, 500, 0, 12.5)
+        function, _ = suite.CASES["find_offset"](workspace)
+        self.assertAlmostEqual(-12.5, function(), delta=.05)
+
+
+class SuiteTest(unittest.TestCase):
+
+    """Test case for benchmarks.suite"""
+
+    def test_run_and_compare(self):
+        """Check the results of a short run, and their comparison"""
+        data = suite.run_benchmarks([1, 2], ["srt_read", "find_offset"], repeat=1)
+        self.assertEqual(4, len(data["results"]))
+        result = data["results"][1]
+        self.assertEqual(("find_offset", 1), (result["benchmark"], result["minutes"]))
+        self.assertIn("find_offset 5s", result["spans"])
+        self.assertGreater(result["peak_memory"], 0)
+        self.assertIn("scaling", suite.format_report(data))
+        slower = {"results": [dict(result, seconds=result["seconds"] * 2)]}
+        rows = suite.compare_results(data, slower)
+        self.assertEqual([("find_offset", 1)], [row[:2] for row in rows])
+        self.assertAlmostEqual(2, rows[0][2])
+        self.assertEqual("slower", rows[0][4])
+
+
+class AccuracyTest(unittest.TestCase):
+
+    """Test case for benchmarks.accuracy"""
+
+    def test_grid(self):
+        """Check that parameter values are converted and combined"""
+        grid = accuracy.parameter_grid(["fragment-count=2,4", "similarity_measure=overlap-count"])
+        self.assertEqual([
+            {"fragment_count": 2, "similarity_measure": "overlap-count"},
+            {"fragment_count": 4, "similarity_measure": "overlap-count"},
+        ], grid)
+        with self.assertRaises(ValueError):
+            accuracy.parameter_grid(["unknown=1"])
+
+    def test_pareto(self):
+        """Check that dominated parameter sets are left out of the front"""
+        summaries = accuracy.pareto_front([
+            {"seconds": 1, "within_slo": .5},
+            {"seconds": 2, "within_slo": 1},
+            {"seconds": 3, "within_slo": 1},
+            {"seconds": 1, "within_slo": .2},
+        ])
+        self.assertEqual([True, True, False, False], [summary["pareto"] for summary in summaries])
+        self.assertIs(summaries[1], accuracy.cheapest_within_slo(summaries, .9))
+
+    def test_evaluate(self):
+        """Check that shifted subtitles are aligned back on a subtitle reference"""
+        with tempfile.TemporaryDirectory() as folder:
+            SubtitleFactory("utf8").write(
+                generators.synthetic_subtitles(5, 500),
+                os.path.join(folder, "episode.srt")
+            )
+            summaries, trials = accuracy.evaluate(
+                accuracy.list_corpus(folder),
+                accuracy.parameter_grid(["fragment_count=4", "fragment_duration=20"]),
+                ["-rl", "en", "-il", "en", "-tk", "regex", "--no-cache"],
+                shifts=2,
+                folder=folder
+            )
+        self.assertEqual(2, len(trials))
+        self.assertEqual(1, summaries[0]["within_slo"])
+        self.assertEqual(80, summaries[0]["decoded_seconds"])
+        self.assertIn(">*", accuracy.format_table(summaries))
@@ -0,0 +1,139 @@
+"""Tests for subalign.cache"""
+
+import os
+import unittest
+import tempfile
+import multiprocessing
+import subalign.cache
+
+
+def write_file(filename, content):
+    """Write a text file"""
+    with open(filename, "w", encoding="utf8") as file:
+        file.write(content)
+
+
+def read_file(filename):
+    """Read a text file"""
+    with open(filename, "r", encoding="utf8") as file:
+        return file.read()
+
+
+def put_entries(job):
+    """Put numbered entries into a cache from a worker process"""
+    folder, first, count = job
+    cache = subalign.cache.Cache(os.path.join(folder, "cache"), 1 << 20)
+    filename = os.path.join(folder, "seq-%d.tsv" % first)
+    write_file(filename, "abc")
+    for number in range(first, first + count):
+        cache.put(cache.key(number), filename)
+
+
+class CacheTest(unittest.TestCase):
+
+    """Test case for subalign.cache.Cache"""
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.cache = subalign.cache.Cache(os.path.join(self.folder.name, "cache"), 10)
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_file_hash(self):
+        """Check that digests depend on content and are kept in the index"""
+        first = os.path.join(self.folder.name, "first.txt")
+        second = os.path.join(self.folder.name, "second.txt")
+        write_file(first, "hello")
+        write_file(second, "hello")
+        self.assertEqual(self.cache.file_hash(first), self.cache.file_hash(second))
+        reloaded = subalign.cache.Cache(self.cache.folder, 10)
+        self.assertIn(os.path.realpath(first), reloaded.index["hashes"])
+        write_file(second, "world")
+        self.assertNotEqual(self.cache.file_hash(first), self.cache.file_hash(second))
+
+    def test_get_put(self):
+        """Check that a stored entry is found by its key only"""
+        filename = os.path.join(self.folder.name, "seq.tsv")
+        write_file(filename, "abc")
+        key = self.cache.key("stage", 1)
+        self.assertIsNone(self.cache.get(key, filename))
+        self.cache.put(key, filename)
+        self.assertEqual("abc", read_file(self.cache.get(key, filename)))
+        self.assertIsNone(self.cache.get(self.cache.key("stage", 2), filename))
+
+    def test_eviction(self):
+        """Check that least recently used entries are evicted first"""
+        filename = os.path.join(self.folder.name, "seq.tsv")
+        keys = [self.cache.key(i) for i in range(3)]
+        for key in keys[:2]:
+            write_file(filename, "12345")
+            self.cache.put(key, filename)
+        with self.cache.update_index() as index:
+            index["entries"][keys[1]]["used"] = 0
+        self.cache.get(keys[0], filename)
+        self.cache.put(keys[2], filename)
+        self.assertIsNotNone(self.cache.get(keys[0], filename))
+        self.assertIsNone(self.cache.get(keys[1], filename))
+        self.assertIsNotNone(self.cache.get(keys[2], filename))
+        self.assertLessEqual(self.cache.size(), 10)
+
+    def test_shared(self):
+        """Check that the entries of two instances sharing a folder are merged"""
+        other = subalign.cache.Cache(self.cache.folder, 10)
+        filename = os.path.join(self.folder.name, "seq.tsv")
+        write_file(filename, "abc")
+        self.cache.put(self.cache.key(1), filename)
+        other.put(other.key(2), filename)
+        reloaded = subalign.cache.Cache(self.cache.folder, 10)
+        self.assertEqual(2, len(reloaded.index["entries"]))
+        self.assertIsNotNone(other.get(other.key(1), filename))
+
+    def test_processes(self):
+        """Check that the entries put by concurrent processes are all kept"""
+        with multiprocessing.Pool(2) as pool:
+            pool.map(put_entries, [(self.folder.name, 0, 20), (self.folder.name, 20, 20)])
+        reloaded = subalign.cache.Cache(self.cache.folder, 1 << 20)
+        self.assertEqual(
+            {reloaded.key(number) for number in range(40)},
+            set(reloaded.index["entries"])
+        )
+
+    def test_orphans(self):
+        """Check that old entry files missing from the index are removed"""
+        filename = os.path.join(self.folder.name, "seq.tsv")
+        write_file(filename, "abc")
+        orphan = self.cache.path(self.cache.key(1), filename)
+        write_file(orphan, "abc")
+        write_file(os.path.join(self.cache.folder, "lemmas.sqlite"), "")
+        self.cache.put(self.cache.key(2), filename)
+        self.assertTrue(os.path.isfile(orphan))
+        os.utime(orphan, (0, 0))
+        self.cache.put(self.cache.key(2), filename)
+        self.assertFalse(os.path.isfile(orphan))
+        self.assertTrue(os.path.isfile(os.path.join(self.cache.folder, "lemmas.sqlite")))
+
+
+class RunStageTest(unittest.TestCase):
+
+    """Test case for subalign.cache.run_stage"""
+
+    def test_hit(self):
+        """Check that a stage is only built once"""
+        calls = list()
+
+        def build(filename):
+            calls.append(filename)
+            write_file(filename, "output")
+            return "built"
+
+        with tempfile.TemporaryDirectory() as folder:
+            cache = subalign.cache.Cache(os.path.join(folder, "cache"), 1000)
+            filename = os.path.join(folder, "out.txt")
+            self.assertEqual("built", subalign.cache.run_stage(
+                cache, ["stage"], filename, build, read_file))
+            self.assertEqual("output", subalign.cache.run_stage(
+                cache, ["stage"], filename, build, read_file))
+            self.assertEqual("built", subalign.cache.run_stage(
+                None, ["stage"], filename, build, read_file))
+        self.assertEqual(2, len(calls))
@@ -0,0 +1,196 @@
+"""Tests for subalign.columnar"""
+
+import os
+import sys
+import random
+import unittest
+import datetime
+import tempfile
+import subprocess
+import unittest.mock
+import subalign.lang
+import subalign.sequence
+import subalign.columnar
+import subalign.stemindex
+import subalign.translate
+
+
+class IdentityLexicon:
+
+    """Imitation of a word2word bilingual lexicon translating words into
+       themselves
+    """
+
+    def __init__(self, words):
+        words = sorted(set(words))
+        self.word2x = {word: i for i, word in enumerate(words)}
+        self.y2word = dict(enumerate(words))
+        self.x2ys = {i: [i] for i in range(len(words))}
+
+
+def pseudo_words(seed=0, count=300):
+    """Return a list of random pronounceable words"""
+    rng = random.Random(seed)
+    return [
+        "".join(rng.choice("bdfgklmnprstvz") + rng.choice("aeiou") for _ in range(3))
+        for _ in range(count)
+    ]
+
+
+def write_alignment_inputs(folder, offset, seed=0):
+    """Write subtitles of random pseudo-words shifted by offset seconds to
+       input.srt, and the matching reference sequence to tmp/ref_seq.tsv.
+       Return the start of the first reference word, in seconds.
+    """
+    rng = random.Random(seed)
+    vocabulary = pseudo_words(seed)
+    os.makedirs(os.path.join(folder, "tmp"), exist_ok=True)
+    time = 2.
+    with open(os.path.join(folder, "input.srt"), "w", encoding="utf8") as srt, \
+            open(os.path.join(folder, "tmp", "ref_seq.tsv"), "w", encoding="utf8") as tsv:
+        for index in range(150):
+            words = rng.choices(vocabulary, k=rng.randint(3, 8))
+            duration = .4 * len(words)
+            srt.write("%d\n%s --> %s\n%s\n\n" % (
+                index + 1,
+                subrip_timecode(time + offset),
+                subrip_timecode(time + offset + duration),
+                " ".join(words)
+            ))
+            for i, word in enumerate(words):
+                tsv.write("%s\t%f\t%f\n" % (word, time + .4 * i, time + .4 * (i + 1)))
+            time += duration + rng.uniform(.5, 3)
+    return 2.
+
+
+def subrip_timecode(seconds):
+    """Format a number of seconds as a SubRip timecode"""
+    milliseconds = round(seconds * 1000)
+    return "%02d:%02d:%02d,%03d" % (
+        milliseconds // 3600000,
+        milliseconds // 60000 % 60,
+        milliseconds // 1000 % 60,
+        milliseconds % 1000
+    )
+
+
+def first_start(filename):
+    """Return the start of the first subtitle of a SubRip file, in seconds"""
+    with open(filename, "r", encoding="utf8") as file:
+        timecode = file.read().split("\n")[1].split(" --> ")[0]
+    hours, minutes, seconds = timecode.replace(",", ".").split(":")
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def run_align(folder, *options):
+    """Run the align action with columnar sequences on the inputs written
+       by write_alignment_inputs, reusing the reference sequence
+    """
+    return subprocess.run(
+        [
+            sys.executable, "-m", "subalign", "align", "reference.mkv", "input.srt",
+            "-cs", "-rr", "-tk", "regex", "--no-cache", "-tmp", "tmp", "-o", "output.srt",
+        ] + list(options),
+        cwd=folder,
+        env=dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(
+            os.path.abspath(subalign.columnar.__file__)))),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        check=False
+    )
+
+
+class ColumnarWordSequenceTest(unittest.TestCase):
+
+    """Test case for subalign.columnar.ColumnarWordSequence"""
+
+    def setUp(self):
+        self.elements = [
+            ("hello", datetime.timedelta(seconds=1), datetime.timedelta(seconds=2)),
+            ("my", datetime.timedelta(seconds=2), datetime.timedelta(seconds=3)),
+            ("name", datetime.timedelta(seconds=2), datetime.timedelta(seconds=3)),
+            ("hello", datetime.timedelta(seconds=4.5), datetime.timedelta(seconds=5)),
+        ]
+        self.sequence = subalign.sequence.WordSequence.from_list(self.elements)
+        self.columnar = subalign.columnar.ColumnarWordSequence.from_list(self.elements)
+
+    def test_vocabulary(self):
+        """Check that repeated words share one id"""
+        self.assertEqual(3, len(self.columnar.vocabulary))
+        self.assertEqual(self.columnar.word_ids[0], self.columnar.word_ids[3])
+
+    def test_offset(self):
+        """Check that offset shifts times and shares the word ids"""
+        shifted = self.columnar.offset(1.5)
+        self.assertIs(self.columnar.word_ids, shifted.word_ids)
+        self.assertEqual(datetime.timedelta(seconds=2.5), shifted.start())
+        self.assertEqual(datetime.timedelta(seconds=1), self.columnar.start())
+
+    def test_iter_groups(self):
+        """Check that groups match those of a WordSequence"""
+        self.assertEqual(
+            list(self.sequence.iter_groups()),
+            list(self.columnar.iter_groups())
+        )
+        self.assertEqual(
+            list(self.sequence.iter_groups(1.5, 5)),
+            list(self.columnar.iter_groups(1.5, 5))
+        )
+
+    def test_save(self):
+        """Check that a saved sequence can be loaded back"""
+        with tempfile.TemporaryDirectory() as folder:
+            filename = os.path.join(folder, "seq.tsv")
+            self.columnar.save(filename, "utf8")
+            loaded = subalign.columnar.ColumnarWordSequence.from_file(filename, "utf8")
+            reference = subalign.sequence.WordSequence.from_file(filename, "utf8")
+        self.assertEqual(list(self.columnar.iter_groups()), list(loaded.iter_groups()))
+        self.assertEqual(list(reference.iter_groups()), list(loaded.iter_groups()))
+
+    def test_map_words(self):
+        """Check that words are mapped once per vocabulary entry"""
+        calls = list()
+        mapped = self.columnar.map_words(lambda word: calls.append(word) or word.upper())
+        self.assertEqual(["hello", "my", "name"], calls)
+        self.assertEqual(["HELLO", "MY", "NAME", "HELLO"], [element.word for element in mapped])
+
+
+class ColumnarAlignmentTest(unittest.TestCase):
+
+    """Test case for alignments with columnar sequences (--columnar)"""
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.start = write_alignment_inputs(self.folder.name, 12.5)
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_align(self):
+        """Check that the known offset is found with both strategies"""
+        for strategy in ["bucket-ladder", "anchor-voting"]:
+            process = run_align(self.folder.name, "-rl", "en", "-il", "en", "-st", strategy)
+            self.assertEqual(0, process.returncode, process.stdout.decode("utf8"))
+            self.assertAlmostEqual(
+                self.start,
+                first_start(os.path.join(self.folder.name, "output.srt")),
+                delta=.05
+            )
+
+    def test_stem_index(self):
+        """Check that the known offset is found through a stem index"""
+        lexicon = IdentityLexicon(pseudo_words())
+        with unittest.mock.patch.dict(subalign.translate.TRANSLATORS, {("fr", "en"): lexicon}):
+            subalign.stemindex.build_stem_index(
+                os.path.join(self.folder.name, "cache", "stems"),
+                subalign.lang.LANGUAGES["fr"],
+                subalign.lang.LANGUAGES["en"]
+            )
+        process = run_align(
+            self.folder.name, "-rl", "en", "-il", "fr", "-si", "--cache-folder", "cache")
+        self.assertEqual(0, process.returncode, process.stdout.decode("utf8"))
+        self.assertAlmostEqual(
+            self.start,
+            first_start(os.path.join(self.folder.name, "output.srt")),
+            delta=.05
+        )
@@ -0,0 +1,87 @@
+"""Tests for subalign.curves"""
+
+import os
+import csv
+import random
+import tempfile
+import unittest
+import xml.etree.ElementTree
+import numpy  # pylint: disable=E0401
+import subalign.cli
+import subalign.core
+import subalign.curves
+import subalign.sequence
+from subalign.subtitles import Subtitle
+from subalign.subtitles import SubtitleFactory
+
+SVG_NAMESPACE = "{http://www.w3.org/2000/svg}"
+
+
+def random_subtitles(seed=0):
+    """Return three minutes of subtitles made of random pseudo-words"""
+    rng = random.Random(seed)
+    words = ["".join(rng.choice("bdfgklmnprstvz") + rng.choice("aeiou") for _ in range(3))
+             for _ in range(300)]
+    subs, time = list(), 2000
+    while time < 180000:
+        subs.append(Subtitle(time, time + 2000, " ".join(rng.choices(words, k=8))))
+        time += rng.randint(2500, 6000)
+    return subs
+
+
+class CurvesTest(unittest.TestCase):
+
+    """Test case for subalign.curves"""
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.curves = [
+            subalign.sequence.build_curve(
+                "5s", numpy.array([5., -5., 0.]), numpy.array([.1, .2, .9]), 5),
+            subalign.sequence.build_curve("votes", numpy.zeros(0), numpy.zeros(0), 2),
+        ]
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_csv(self):
+        """Check that each point is written as a row, sorted by offset"""
+        filename = os.path.join(self.folder.name, "curve.csv")
+        subalign.curves.write_curves(self.curves, filename)
+        with open(filename, "r", encoding="utf8") as file:
+            rows = list(csv.DictReader(file))
+        self.assertEqual(["-5.000", "0.000", "5.000"], [row["offset"] for row in rows])
+        self.assertEqual({"5s"}, {row["level"] for row in rows})
+
+    def test_svg(self):
+        """Check that each curve gets a panel"""
+        filename = os.path.join(self.folder.name, "curve.svg")
+        subalign.curves.write_curves(self.curves, filename)
+        root = xml.etree.ElementTree.parse(filename).getroot()
+        self.assertEqual(1, len(root.findall(".//%spolyline" % SVG_NAMESPACE)))
+        titles = [text.text for text in root.iter(SVG_NAMESPACE + "text")]
+        self.assertIn("5s: 3 offsets, best 0.00s, confidence 1.00", titles)
+        self.assertIn("votes: 0 offsets, best -, confidence 0.00", titles)
+
+
+class MinConfidenceTest(unittest.TestCase):
+
+    """Test case for the rejection of alignments (--min-confidence)"""
+
+    def test_reject(self):
+        """Check that a rejected alignment writes no subtitles"""
+        with tempfile.TemporaryDirectory() as folder:
+            reference = os.path.join(folder, "reference.srt")
+            output = os.path.join(folder, "output.srt")
+            SubtitleFactory("utf8").write(random_subtitles(), reference)
+            parser = subalign.cli.build_parser()
+            options = [
+                "align", reference, reference, "-rl", "en", "-il", "en", "-tk", "regex",
+                "--no-cache", "-o", output, "-tmp", os.path.join(folder, "tmp"),
+            ]
+            self.assertIsNone(subalign.core.align(
+                parser.parse_args(options + ["--min-confidence", "1.01"])))
+            self.assertFalse(os.path.isfile(output))
+            self.assertEqual(0, subalign.core.align(
+                parser.parse_args(options + ["--min-confidence", ".5"])))
+            self.assertTrue(os.path.isfile(output))
@@ -0,0 +1,120 @@
+"""Tests for subalign.profiling"""
+
+import os
+import json
+import random
+import datetime
+import tempfile
+import unittest
+import subalign.profiling
+import subalign.sequence
+
+
+@subalign.profiling.profiled
+def square(number):
+    """Profiled function"""
+    return number * number
+
+
+class IdentityEncoder:
+
+    """Encoder mapping words to integers without any NLP processing"""
+
+    def __init__(self):
+        self.index = dict()
+
+    def encode(self, word):
+        """Return the integer encoding of a word"""
+        return self.index.setdefault(word, len(self.index))
+
+
+def random_sequence(seed, length, shift=0):
+    """Generate a random WordSequence of 40 distinct words"""
+    rng = random.Random(seed)
+    elements = list()
+    time = 0
+    for _ in range(length):
+        duration = rng.uniform(.1, 1.5)
+        elements.append((
+            "w%d" % rng.randrange(40),
+            datetime.timedelta(seconds=time + shift),
+            datetime.timedelta(seconds=time + shift + duration),
+        ))
+        time += duration + rng.uniform(0, 2)
+    return subalign.sequence.WordSequence.from_list(elements)
+
+
+class ProfilingTest(unittest.TestCase):
+
+    """Test case for subalign.profiling"""
+
+    def tearDown(self):
+        subalign.profiling.deactivate()
+
+    def test_inactive(self):
+        """Check that nothing is recorded without an active profiler"""
+        with subalign.profiling.span("stage"):
+            subalign.profiling.count("items", 3)
+        self.assertEqual(4, square(2))
+        self.assertIsNone(subalign.profiling.take())
+        self.assertFalse(subalign.profiling.enabled())
+
+    def test_summary(self):
+        """Check that nested spans and counters are summarized"""
+        profiler = subalign.profiling.activate()
+        with subalign.profiling.span("outer"):
+            for i in range(3):
+                square(i)
+            subalign.profiling.count("items", 2)
+            subalign.profiling.count("items", .5)
+        rows, counters = profiler.summary()
+        self.assertEqual(["outer", "square"], [row[0] for row in rows])
+        self.assertEqual([0, 1], [row[1] for row in rows])
+        self.assertEqual([1, 3], [row[2] for row in rows])
+        self.assertGreaterEqual(rows[0][3], rows[1][3])
+        self.assertEqual([("items", 2.5)], counters)
+        self.assertIn("  square", profiler.format_summary())
+
+    def test_trace(self):
+        """Check that the trace file holds complete and counter events"""
+        profiler = subalign.profiling.activate()
+        with subalign.profiling.span("stage", width=5):
+            subalign.profiling.count("items")
+        with tempfile.TemporaryDirectory() as folder:
+            filename = os.path.join(folder, "trace.json")
+            profiler.write_trace(filename)
+            with open(filename, "r", encoding="utf8") as file:
+                events = json.load(file)["traceEvents"]
+        self.assertEqual(["X", "C"], sorted(event["ph"] for event in events)[::-1])
+        stage = [event for event in events if event["ph"] == "X"][0]
+        self.assertEqual(5, stage["args"]["width"])
+        self.assertGreaterEqual(stage["dur"], 0)
+
+    def test_merge(self):
+        """Check that taken records are merged back"""
+        profiler = subalign.profiling.activate()
+        square(1)
+        subalign.profiling.count("items")
+        recording = subalign.profiling.take()
+        self.assertEqual(0, len(profiler.events))
+        subalign.profiling.merge(recording)
+        subalign.profiling.merge(recording)
+        self.assertEqual(2, profiler.counters["items"])
+        self.assertEqual(2, profiler.summary()[0][0][2])
+
+    def test_find_offset(self):
+        """Check that each bucket width of find_offset is recorded"""
+        profiler = subalign.profiling.activate()
+        subalign.sequence.WordSequence.find_offset(
+            random_sequence(0, 200),
+            random_sequence(0, 200, 3),
+            "english",
+            20,
+            "overlap-count",
+            encoder=IdentityEncoder()
+        )
+        names = [row[0] for row in profiler.summary()[0]]
+        for width in subalign.sequence.BUCKET_WIDTHS:
+            self.assertIn("find_offset %gs" % width, names)
+        self.assertGreater(profiler.counters["offsets_evaluated"], 20)
+        self.assertGreater(profiler.counters["buckets"], 0)
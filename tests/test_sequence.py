@@ -0,0 +1,166 @@
+"""Tests for subalign.sequence"""
+
+import unittest
+import random
+import datetime
+import numpy  # pylint: disable=E0401
+import subalign.sequence
+
+
+class IdentityEncoder:
+
+    """Encoder mapping words to integers without any NLP processing"""
+
+    def __init__(self):
+        self.index = dict()
+
+    def encode(self, word):
+        """Return the integer encoding of a word"""
+        return self.index.setdefault(word, len(self.index))
+
+
+def random_sequence(seed, length, vocabulary_size, shift=0):
+    """Generate a random WordSequence"""
+    rng = random.Random(seed)
+    elements = list()
+    time = 0
+    for _ in range(length):
+        duration = rng.uniform(.1, 1.5)
+        elements.append((
+            "w%d" % rng.randrange(vocabulary_size),
+            datetime.timedelta(seconds=time + shift),
+            datetime.timedelta(seconds=time + shift + duration),
+        ))
+        time += duration + rng.uniform(0, 2)
+    return subalign.sequence.WordSequence.from_list(elements)
+
+
+class WordBucketSequenceTest(unittest.TestCase):
+
+    """Test case for subalign.sequence.WordBucketSequence"""
+
+    def setUp(self):
+        encoder = IdentityEncoder()
+        self.reference = subalign.sequence.WordBucketSequence(
+            encoder, random_sequence(0, 300, 40), 1, 0)
+        self.target = subalign.sequence.WordBucketSequence(
+            encoder, random_sequence(0, 300, 40, 17.3), 1, 0)
+
+    def test_fft_overlap_count(self):
+        """Check that the FFT engine reproduces the overlap count exactly"""
+        measure = subalign.sequence.overlap_count
+        offsets, values = self.reference.correlate(self.target)
+        for offset, value in zip(offsets, values):
+            self.assertEqual(
+                self.reference.similarity(self.target, offset, measure) * len(self.reference),
+                value
+            )
+        self.assertEqual(
+            self.reference.find_offset(self.target, 100, measure),
+            self.reference.find_offset_fft(self.target, 100, measure)
+        )
+
+    def test_fft_full_range(self):
+        """Check that the full range search finds the known offset"""
+        for measure in subalign.sequence.SIMILARITY_MEASURE_INDEX.values():
+            offset, _ = self.reference.find_offset_fft(self.target, None, measure)
+            self.assertEqual(17, offset)
+
+
+class VoteOffsetsTest(unittest.TestCase):
+
+    """Test case for subalign.sequence.vote_offsets"""
+
+    def test_large_offset(self):
+        """Check that a large offset gets the most votes"""
+        offsets, votes = subalign.sequence.vote_offsets(
+            IdentityEncoder(),
+            random_sequence(0, 500, 100),
+            random_sequence(0, 500, 100, -312.34)
+        )
+        self.assertAlmostEqual(312.34, offsets[votes.argmax()], delta=1)
+
+    def test_no_match(self):
+        """Check that disjoint vocabularies yield no votes"""
+        encoder = IdentityEncoder()
+        reference = random_sequence(0, 10, 5)
+        target = subalign.sequence.WordSequence.from_list([
+            ("other", element.start_time, element.end_time)
+            for element in reference
+        ])
+        offsets, votes = subalign.sequence.vote_offsets(encoder, reference, target)
+        self.assertEqual(0, len(offsets))
+        self.assertEqual(0, len(votes))
+
+    def test_confidence(self):
+        """Check that a clear offset peak is ahead of the runner-up"""
+        offsets, votes = subalign.sequence.vote_offsets(
+            IdentityEncoder(),
+            random_sequence(0, 300, 100),
+            random_sequence(0, 300, 100, 42)
+        )
+        peak, ratio = subalign.sequence.vote_confidence(offsets, votes)
+        self.assertGreater(peak, 10)
+        self.assertGreater(ratio, 2)
+        self.assertEqual((0, 0), subalign.sequence.vote_confidence([], []))
+
+
+class SimilarityCurveTest(unittest.TestCase):
+
+    """Test case for the similarity curves of WordSequence.find_offset"""
+
+    def test_curves(self):
+        """Check that each round appends a curve peaking at its result"""
+        curves = list()
+        offset = subalign.sequence.WordSequence.find_offset(
+            random_sequence(0, 300, 100),
+            random_sequence(0, 300, 100, -42.3),
+            "english",
+            100,
+            "overlap-count",
+            "fft",
+            encoder=IdentityEncoder(),
+            curves=curves
+        )
+        self.assertAlmostEqual(42.3, offset, delta=.05)
+        self.assertEqual(
+            ["%gs" % width for width in subalign.sequence.BUCKET_WIDTHS],
+            [curve["level"] for curve in curves]
+        )
+        self.assertAlmostEqual(offset, curves[-1]["best"])
+        self.assertTrue((curves[0]["offsets"][1:] > curves[0]["offsets"][:-1]).all())
+        self.assertGreater(curves[0]["confidence"], .5)
+
+    def test_confidence(self):
+        """Check the peak sharpness of clear and ambiguous curves"""
+        offsets = numpy.arange(10, dtype=float)
+        confidence = subalign.sequence.curve_confidence
+        self.assertEqual(1, confidence(offsets, numpy.array([0, 0, 0, 0, 9, 3, 0, 0, 0, 0]), 1))
+        self.assertEqual(0, confidence(offsets, numpy.array([0, 9, 0, 0, 0, 0, 0, 9, 0, 0]), 1))
+        self.assertEqual(0, confidence(offsets, numpy.ones(10), 1))
+        self.assertEqual(0, confidence([], [], 1))
+
+
+class WordBucketPyramidTest(unittest.TestCase):
+
+    """Test case for subalign.sequence.WordBucketPyramid"""
+
+    def test_levels(self):
+        """Check that levels match directly built bucket sequences"""
+        sequence = random_sequence(0, 200, 30)
+        encoder = IdentityEncoder()
+        pyramid = subalign.sequence.WordBucketPyramid(encoder, sequence)
+        for width in [5, .5, .05]:
+            for shift in [0, 3.21, -7.5]:
+                self.assertEqual(
+                    subalign.sequence.WordBucketSequence(encoder, sequence, width, shift),
+                    pyramid.level(width, shift)
+                )
+
+    def test_window(self):
+        """Check that a window only keeps the intersecting elements"""
+        sequence = random_sequence(0, 200, 30)
+        pyramid = subalign.sequence.WordBucketPyramid(IdentityEncoder(), sequence)
+        level = pyramid.level(1, 0, (100, 120))
+        self.assertGreaterEqual(min(level), 98)
+        self.assertLessEqual(max(level), 122)
@@ -0,0 +1,136 @@
+"""Tests for subalign.server"""
+
+import os
+import json
+import shutil
+import argparse
+import tempfile
+import threading
+import unittest
+import unittest.mock
+import urllib.error
+import urllib.request
+import multiprocessing.pool
+import subalign.core
+import subalign.server
+
+
+def fake_alignment(args):
+    """Copy the input subtitles to the output file"""
+    shutil.copyfile(args.input_file, args.output_file)
+    return {"offset": 1.5, "reference_id": "abc"}
+
+
+def missing_reference(args):
+    """Fail as an alignment on an unknown reference id"""
+    raise subalign.core.UnknownReferenceError("Unknown reference id %s" % args.reference_id)
+
+
+def failing_alignment(args):
+    """Fail as an alignment with an internal error"""
+    raise KeyError(args.input_file)
+
+
+class AlignmentServerTest(unittest.TestCase):
+
+    """Test case for subalign.server.AlignmentServer"""
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        args = argparse.Namespace(
+            temp_folder=self.folder.name, reference_file=None, reference_id=None,
+            output_folder=os.path.join(self.folder.name, "aligned"))
+        subalign.core.initialize_worker(args)
+        self.pool = multiprocessing.pool.ThreadPool(1)
+        self.server = subalign.server.AlignmentServer(("127.0.0.1", 0), args, self.pool, 1, 0)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.url = "http://127.0.0.1:%d" % self.server.server_address[1]
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        self.pool.close()
+        self.folder.cleanup()
+
+    def request(self, path, data=None):
+        """Return the status and the decoded JSON response of a request"""
+        if data is not None:
+            data = json.dumps(data).encode("utf8")
+        try:
+            with urllib.request.urlopen(self.url + path, data) as response:
+                return response.status, json.loads(response.read().decode("utf8"))
+        except urllib.error.HTTPError as error:
+            return error.code, json.loads(error.read().decode("utf8"))
+
+    def test_align(self):
+        """Check that subtitles sent as content are returned shifted"""
+        content = "1\n00:00:01,000 --> 00:00:02,000\nHello\n"
+        with unittest.mock.patch("subalign.core.run_alignment", fake_alignment):
+            status, result = self.request(
+                "/align", {"reference": "video.mkv", "subtitles": content})
+        self.assertEqual(200, status)
+        self.assertEqual(1.5, result["offset"])
+        self.assertEqual("abc", result["reference_id"])
+        self.assertEqual(content, result["subtitles"])
+        self.assertIsNone(result["output"])
+
+    def test_errors(self):
+        """Check the status codes of invalid requests"""
+        self.assertEqual(404, self.request("/unknown", {})[0])
+        self.assertEqual(400, self.request("/align", {"subtitles": ""})[0])
+        status, result = self.request("/align", {
+            "reference": "video.mkv",
+            "subtitles": "",
+            "options": {"temp_folder": "/"}
+        })
+        self.assertEqual(400, status)
+        self.assertIn("temp_folder", result["error"])
+        for options in [{"reference_language": "xx"}, {"strategy": "other"},
+                        {"fragment_count": "many"}]:
+            status, result = self.request("/align", {
+                "reference": "video.mkv", "subtitles": "", "options": options})
+            self.assertEqual(400, status, options)
+
+    def test_output(self):
+        """Check that outputs are written in the output folder, and never over
+           their input
+        """
+        content = "1\n00:00:01,000 --> 00:00:02,000\nHello\n"
+        input_file = os.path.join(self.folder.name, "aligned", "input.srt")
+        os.makedirs(os.path.dirname(input_file))
+        with open(input_file, "w", encoding="utf8") as file:
+            file.write(content)
+        with unittest.mock.patch("subalign.core.run_alignment", fake_alignment):
+            status, result = self.request("/align", {
+                "reference": "video.mkv", "input": input_file, "output": "fr/output.srt"})
+            self.assertEqual(200, status)
+            self.assertEqual(
+                os.path.realpath(os.path.join(self.folder.name, "aligned", "fr", "output.srt")),
+                result["output"])
+            status, _ = self.request("/align", {
+                "reference": "video.mkv", "input": input_file, "output": "input.srt"})
+            self.assertEqual(400, status)
+            status, _ = self.request("/align", {
+                "reference": "video.mkv", "subtitles": content, "output": "../output.srt"})
+            self.assertEqual(403, status)
+        with open(input_file, "r", encoding="utf8") as file:
+            self.assertEqual(content, file.read())
+
+    def test_alignment_errors(self):
+        """Check that only unknown reference ids are reported as not found"""
+        with unittest.mock.patch("subalign.core.run_alignment", missing_reference):
+            status, _ = self.request("/align", {"reference_id": "abc", "subtitles": ""})
+        self.assertEqual(404, status)
+        with unittest.mock.patch("subalign.core.run_alignment", failing_alignment):
+            status, _ = self.request("/align", {"reference_id": "abc", "subtitles": ""})
+        self.assertEqual(500, status)
+
+    def test_queue_full(self):
+        """Check that requests are rejected when no worker is free"""
+        self.server.pending = 1
+        status, _ = self.request("/align", {"reference": "video.mkv", "subtitles": ""})
+        self.assertEqual(503, status)
+        self.assertEqual({"running": 1, "queued": 0}, self.request("/status")[1])
+        self.server.pending = 0
@@ -0,0 +1,154 @@
+"""Tests for subalign.speech"""
+
+import os
+import wave
+import struct
+import unittest
+import tempfile
+import unittest.mock
+import subalign.speech
+
+
+class FakeSegment:
+
+    """Imitation of a pocketsphinx segment"""
+
+    def __init__(self, word, start_frame, end_frame):
+        self.word = word
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+        self.prob = 0
+        self.ascore = 0
+        self.lscore = 0
+        self.lback = 1
+
+
+class FakeDecoder:
+
+    """Imitation of a pocketsphinx decoder, hearing the sum of the samples of
+       each processed buffer as a word
+    """
+
+    def __init__(self, *_):
+        self.segments = list()
+        self.samples = 0
+
+    def start_stream(self):
+        """Start a new stream"""
+
+    def start_utt(self):
+        """Start a new utterance"""
+        self.segments = list()
+        self.samples = 0
+
+    def process_raw(self, buffer, *_):
+        """Process a buffer of raw samples"""
+        samples = struct.unpack("<%dh" % (len(buffer) // 2), bytes(buffer))
+        self.segments.append(FakeSegment(
+            "w%d" % sum(samples),
+            self.samples // 160,
+            (self.samples + len(samples)) // 160
+        ))
+        self.samples += len(samples)
+
+    def end_utt(self):
+        """End the current utterance"""
+
+    def n_frames(self):
+        """Return the number of processed frames"""
+        return self.samples // 160
+
+    def seg(self):
+        """Return the decoded segments"""
+        return self.segments
+
+    def hyp(self):
+        """Return the best hypothesis"""
+        return None
+
+
+def write_wave(filename, duration, sample_rate=16000):
+    """Write a synthetic 16kHz mono 16bit PCM WAVE file"""
+    with wave.open(filename, "wb") as file:
+        file.setnchannels(1)
+        file.setsampwidth(2)
+        file.setframerate(sample_rate)
+        file.writeframes(struct.pack(
+            "<%dh" % (duration * sample_rate),
+            *((i * 7) % 2000 - 1000 for i in range(duration * sample_rate))
+        ))
+
+
+class SpeechToTextTest(unittest.TestCase):
+
+    """Test case for subalign.speech.speech_to_text"""
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.folder.name, "audio.wav")
+        write_wave(self.filename, 30)
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def transcribe(self, *args, **kwargs):
+        """Run speech_to_text with a fake decoder and return its entries"""
+        with unittest.mock.patch("subalign.speech.configure_decoder", FakeDecoder),\
+                unittest.mock.patch.dict(subalign.speech.DECODERS, clear=True):
+            transcript = subalign.speech.speech_to_text(self.filename, *args, **kwargs)
+        return transcript, [
+            (fragment.offset, entry.word, entry.start_frame, entry.end_frame)
+            for fragment, entry in transcript.iter_entries()
+        ]
+
+    def test_fragments(self):
+        """Check the fragment offsets and durations"""
+        transcript, _ = self.transcribe(5, 2, "en")
+        self.assertEqual([0, 6, 12, 18, 24], [fragment.offset for fragment in transcript])
+        for fragment in transcript:
+            self.assertGreaterEqual(fragment.frames, 200)
+
+    def test_jobs(self):
+        """Check that parallel decoding yields the serial output"""
+        _, serial = self.transcribe(6, 2, "en")
+        _, parallel = self.transcribe(6, 2, "en", jobs=3)
+        self.assertEqual(serial, parallel)
+
+    def test_stop(self):
+        """Check that decoding stops when asked, and keeps offset order"""
+        for jobs in [1, 2]:
+            transcript, _ = self.transcribe(8, 1, "en", jobs=jobs,
+                                            stop=lambda transcript: len(transcript) >= 3)
+            self.assertEqual(3, len(transcript))
+            offsets = [fragment.offset for fragment in transcript]
+            self.assertEqual(sorted(offsets), offsets)
+            self.assertIn(0, offsets)
+
+    def test_spread_order(self):
+        """Check that the spread order starts with far apart anchors"""
+        order = subalign.speech.spread_order(list(range(0, 80, 10)))
+        self.assertEqual([0, 40, 20, 60], order[:4])
+        self.assertEqual(list(range(0, 80, 10)), sorted(order))
+
+
+class KeywordListTest(unittest.TestCase):
+
+    """Test case for subalign.speech.write_keyword_list"""
+
+    def test_keywords(self):
+        """Check that only known, non-excluded words become keywords"""
+        with tempfile.TemporaryDirectory() as folder:
+            with open(os.path.join(folder, "pronounciation-dictionary.dict"), "w") as file:
+                file.write("hello HH AH L OW\nhello(2) HH EH L OW\nworld W ER L D\nthe DH AH\n")
+            filename = os.path.join(folder, "keywords.txt")
+            with unittest.mock.patch("subalign.speech.model_path", lambda _: folder):
+                count = subalign.speech.write_keyword_list(
+                    ["Hello", "world", "hello", "the", "unknown"],
+                    "en",
+                    filename,
+                    frozenset(["the"])
+                )
+            with open(filename) as file:
+                lines = file.read().splitlines()
+        self.assertEqual(2, count)
+        self.assertEqual(["hello /1e-20/", "world /1e-20/"], lines)
@@ -0,0 +1,50 @@
+"""Tests of the import cost of the command line interface"""
+
+import sys
+import subprocess
+import unittest
+
+# Heavy dependencies, imported only by the stages that need them
+LAZY_MODULES = ["nltk", "word2word", "pocketsphinx"]
+
+# Maximum cumulative import time of subalign.core, in microseconds
+IMPORT_BUDGET = 500000
+
+
+def imported_modules(*arguments):
+    """Run the Python interpreter with -X importtime, and return a dict
+       mapping the imported modules to their cumulative import times, in
+       microseconds
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime"] + list(arguments),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True
+    )
+    modules = dict()
+    for line in process.stderr.split("\n"):
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(cumulative)
+    return modules
+
+
+class StartupTest(unittest.TestCase):
+
+    """Test case for the import cost of subalign"""
+
+    def test_lazy_imports(self):
+        """Check that importing the actions loads no heavy dependency"""
+        modules = imported_modules("-c", "import subalign.core")
+        for name in LAZY_MODULES:
+            self.assertNotIn(name, modules)
+        self.assertLessEqual(modules["subalign.core"], IMPORT_BUDGET)
+
+    def test_help(self):
+        """Check that the help does not import the actions"""
+        modules = imported_modules("-m", "subalign", "--help")
+        self.assertNotIn("subalign.core", modules)
+        self.assertNotIn("numpy", modules)
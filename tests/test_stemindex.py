@@ -0,0 +1,79 @@
+"""Tests for subalign.stemindex"""
+
+import datetime
+import unittest
+import tempfile
+import unittest.mock
+import subalign.lang
+import subalign.sequence
+import subalign.stemindex
+import subalign.translate
+
+
+class FakeLexicon:
+
+    """Imitation of a word2word bilingual lexicon"""
+
+    def __init__(self, translations):
+        words = sorted(translations)
+        targets = sorted({target for values in translations.values() for target in values})
+        self.word2x = {word: i for i, word in enumerate(words)}
+        self.y2word = dict(enumerate(targets))
+        self.x2ys = {
+            i: [targets.index(target) for target in translations[word]]
+            for i, word in enumerate(words)
+        }
+
+
+class StemIndexTest(unittest.TestCase):
+
+    """Test case for subalign.stemindex"""
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.french = subalign.lang.LANGUAGES["fr"]
+        self.english = subalign.lang.LANGUAGES["en"]
+        lexicon = FakeLexicon({
+            "chat": ["cat", "cats"],
+            "chats": ["cats"],
+            "maison": ["house", "home"],
+            "le": ["the"],
+        })
+        with unittest.mock.patch.dict(subalign.translate.TRANSLATORS, {("fr", "en"): lexicon}):
+            subalign.stemindex.build_stem_index(self.folder.name, self.french, self.english)
+        self.index = subalign.stemindex.load_stem_index(
+            self.folder.name, self.french, self.english)
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_lookup(self):
+        """Check the stems of the translations of indexed stems"""
+        self.assertEqual(2, len(self.index))
+        self.assertEqual(["cat", "home", "hous"], list(self.index.to_stems))
+        self.assertEqual([0], self.index.lookup("chat").tolist())
+        self.assertEqual([1, 2], self.index.lookup("maison").tolist())
+        self.assertIsNone(self.index.lookup("le"))
+        self.assertIsNone(self.index.lookup("zzz"))
+        self.assertIsNone(subalign.stemindex.load_stem_index(
+            self.folder.name, self.english, self.french))
+
+    def test_encoder(self):
+        """Check that target words are encoded in the reference space"""
+        dtd = datetime.timedelta()
+        reference = subalign.sequence.WordSequence.from_list([
+            (word, dtd, dtd) for word in ["cats", "houses", "paris"]
+        ])
+        target = subalign.sequence.WordSequence.from_list([
+            (word, dtd, dtd) for word in ["chats", "la maison", "paris", "le"]
+        ])
+        encoder = subalign.sequence.WordEncoder("english", vocabulary=self.index.to_stems)
+        target_encoder = subalign.stemindex.CrossLingualEncoder(encoder, self.index, "french")
+        reference_encodings, _, _ = reference.encode(encoder)
+        target_encodings, _, _ = target.encode(target_encoder)
+        self.assertEqual(list(reference_encodings), list(target_encodings))
+        self.assertEqual([0, 2], list(reference_encodings[:2]))
+        self.assertEqual(2, encoder.encode("home"))
+        with self.assertRaises(ValueError):
+            subalign.stemindex.CrossLingualEncoder(
+                subalign.sequence.WordEncoder("english"), self.index, "french")
@@ -0,0 +1,67 @@
+"""Tests for subalign.store"""
+
+import os
+import unittest
+import tempfile
+import subalign.store
+import subalign.sequence
+
+
+class KeyValueStoreTest(unittest.TestCase):
+
+    """Test case for subalign.store.KeyValueStore"""
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.folder.name, "store.sqlite")
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_get_put(self):
+        """Check that values are shared between connections, by namespace"""
+        with subalign.store.KeyValueStore(self.filename, "items", "en") as store:
+            store.put_many([("runs", "run"), ("the", None)])
+        with subalign.store.KeyValueStore(self.filename, "items", "en") as store:
+            self.assertEqual(
+                {"runs": "run", "the": None},
+                store.get_many(["runs", "the", "missing"])
+            )
+        with subalign.store.KeyValueStore(self.filename, "items", "fr") as store:
+            self.assertEqual({}, store.get_many(["runs"]))
+
+    def test_chunks(self):
+        """Check queries with more keys than a chunk"""
+        keys = ["w%d" % i for i in range(2 * subalign.store.QUERY_CHUNK_SIZE + 1)]
+        with subalign.store.KeyValueStore(self.filename, "items", "en") as store:
+            store.put_many((key, key.upper()) for key in keys)
+            self.assertEqual(len(keys), len(store.get_many(keys)))
+
+    def test_eviction(self):
+        """Check that the least recently used rows are evicted"""
+        with subalign.store.KeyValueStore(self.filename, "items", "en", 2) as store:
+            store.put_many([("a", "1"), ("b", "2")])
+            store.connection.execute("UPDATE items SET used = 0 WHERE key = 'b'")
+            store.put_many([("c", "3")])
+            self.assertEqual(2, len(store))
+            self.assertEqual({"a": "1", "c": "3"}, store.get_many(["a", "b", "c"]))
+
+
+class WordEncoderStoreTest(unittest.TestCase):
+
+    """Test case for subalign.sequence.WordEncoder with a lemma store"""
+
+    def test_prefetch(self):
+        """Check that lemmas are written to and then read from the store"""
+        with tempfile.TemporaryDirectory() as folder:
+            filename = os.path.join(folder, "lemmas.sqlite")
+            with subalign.store.LemmaStore(filename, "english") as store:
+                encoder = subalign.sequence.WordEncoder("english", store)
+                encoder.prefetch(["running dogs", "the"])
+                self.assertEqual({"running": "run", "dogs": "dog", "the": None},
+                                 store.get_many(["running", "dogs", "the"]))
+            with subalign.store.LemmaStore(filename, "english") as store:
+                encoder = subalign.sequence.WordEncoder("english", store)
+                encoder.prefetch(["running"])
+                self.assertEqual("run", encoder.lemmatize("running"))
+                self.assertIsNone(encoder._stemmer)  # pylint: disable=W0212
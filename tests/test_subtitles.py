@@ -0,0 +1,107 @@
+"""Tests for subalign.subtitles"""
+
+import os
+import unittest
+import tempfile
+import subalign.subtitles
+
+
+class SubRipFormatterTest(unittest.TestCase):
+
+    """Test case for subalign.subtitles.SubRipFormatter"""
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.folder.name, "subs.srt")
+        self.formatter = subalign.subtitles.SubRipFormatter()
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def read(self, content):
+        """Parse SubRip content given as bytes"""
+        with open(self.filename, "wb") as file:
+            file.write(content)
+        return self.formatter.read(self.filename, "utf8")
+
+    def test_timecodes(self):
+        """Check the conversion between timecodes and milliseconds"""
+        self.assertEqual(3723004, subalign.subtitles.parse_subrip_timecode("01:02:03,004"))
+        self.assertEqual("01:02:03,004", subalign.subtitles.format_subrip_timecode(3723004))
+        self.assertEqual("00:00:00,000", subalign.subtitles.format_subrip_timecode(0))
+        with self.assertRaises(ValueError):
+            subalign.subtitles.parse_subrip_timecode("1:02")
+
+    def test_bom_crlf(self):
+        """Check that a BOM and CRLF line endings are supported"""
+        subs = self.read(
+            "\ufeff1\r\n00:00:01,500 --> 00:00:02,000\r\nHello\r\nworld\r\n\r\n"
+            "2\r\n00:00:03,000 --> 00:00:04,250\r\nBye\r\n".encode("utf8"))
+        self.assertEqual(
+            [(1500, 2000, "Hello\nworld"), (3000, 4250, "Bye")],
+            [(sub.start, sub.end, sub.text) for sub in subs]
+        )
+
+    def test_malformed(self):
+        """Check that malformed cues are skipped and missing separators
+           tolerated
+        """
+        subs = self.read(
+            b"1\n00:00:01,000 --> 00:00:02,000\n\n"
+            b"2\n00:00:0x,000 --> 00:00:03,000\nBroken\n\n"
+            b"3\n00:00:04,000 --> 00:00:05,000\nFirst\n"
+            b"4\n00:00:06,000 --> 00:00:07,000\nSecond\n\n\n")
+        self.assertEqual(
+            [(4000, 5000, "First"), (6000, 7000, "Second")],
+            [(sub.start, sub.end, sub.text) for sub in subs]
+        )
+
+    def test_round_trip(self):
+        """Check that written subtitles are read back identically"""
+        subs = [
+            subalign.subtitles.Subtitle(0, 1001, "A"),
+            subalign.subtitles.Subtitle(3599999, 3600000, "B\nC"),
+        ]
+        self.formatter.write(subs, self.filename, "utf8")
+        self.assertEqual(
+            [(sub.start, sub.end, sub.text) for sub in subs],
+            [(sub.start, sub.end, sub.text)
+             for sub in self.formatter.read(self.filename, "utf8")]
+        )
+
+    def test_shift(self):
+        """Check that shifted times are clamped at zero"""
+        sub = subalign.subtitles.Subtitle(1000, 2000, "A").shift(-1.5)
+        self.assertEqual((0, 500), (sub.start, sub.end))
+
+
+class ShiftedSubtitlesTest(unittest.TestCase):
+
+    """Test case for subalign.subtitles.ShiftedSubtitles"""
+
+    def test_view(self):
+        """Check that views shift lazily, compose and clamp at zero"""
+        subs = [
+            subalign.subtitles.Subtitle(1000, 2000, "A"),
+            subalign.subtitles.Subtitle(5000, 6000, "B"),
+        ]
+        shifted = subalign.subtitles.shift_subs(
+            subalign.subtitles.shift_subs(subs, -3), 1.5)
+        self.assertIs(subs, shifted.subs)
+        self.assertEqual(2, len(shifted))
+        self.assertEqual(
+            [(0, 500), (3500, 4500)],
+            [(sub.start, sub.end) for sub in shifted]
+        )
+        self.assertEqual(3500, shifted[1:][0].start)
+        self.assertEqual(1000, subs[0].start)
+
+    def test_write(self):
+        """Check that the factory writes the shifted times"""
+        subs = [subalign.subtitles.Subtitle(1000, 2000, "A")]
+        factory = subalign.subtitles.SubtitleFactory("utf8")
+        with tempfile.TemporaryDirectory() as folder:
+            filename = os.path.join(folder, "subs.srt")
+            factory.write(subalign.subtitles.shift_subs(subs, -1.25), filename)
+            with open(filename, encoding="utf8") as file:
+                self.assertEqual("1\n00:00:00,000 --> 00:00:00,750\nA\n\n", file.read())
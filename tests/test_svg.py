@@ -0,0 +1,79 @@
+"""Tests for subalign.svg"""
+
+import os
+import datetime
+import tempfile
+import unittest
+import xml.etree.ElementTree
+import subalign.svg
+import subalign.sequence
+
+SVG_NAMESPACE = "{http://www.w3.org/2000/svg}"
+
+
+def word_sequence(words, duration=.5, shift=0):
+    """Return a WordSequence of consecutive words lasting duration seconds"""
+    return subalign.sequence.WordSequence.from_list([
+        (
+            word,
+            datetime.timedelta(seconds=shift + i * duration),
+            datetime.timedelta(seconds=shift + (i + 1) * duration),
+        )
+        for i, word in enumerate(words)
+    ])
+
+
+class SvgTest(unittest.TestCase):
+
+    """Test case for subalign.svg"""
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.folder.name, "plot.svg")
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def plot(self, reference, target, **options):
+        """Plot two sequences and return the parsed SVG root element"""
+        subalign.svg.write_comparison(reference, target, self.filename, **options)
+        return xml.etree.ElementTree.parse(self.filename).getroot()
+
+    def test_merge(self):
+        """Check that groups are merged within resolution units"""
+        groups = [("a", 0, .5), ("b", .5, 1), ("c", 1, 3), ("d", 3, 3.2)]
+        self.assertEqual(
+            [(None, 0, 1, 2), ("c", 1, 3, 1), ("d", 3, 3.2, 1)],
+            list(subalign.svg.merge_groups(groups, 1))
+        )
+
+    def test_labels(self):
+        """Check that every group is drawn and labeled when zoomed in"""
+        root = self.plot(word_sequence(["a", "b&c"]), word_sequence(["d"], shift=.2))
+        texts = [text.text for text in root.iter(SVG_NAMESPACE + "text")]
+        for word in ["a", "b&c", "d"]:
+            self.assertIn(word, texts)
+
+    def test_decimation(self):
+        """Check that dense regions are aggregated when zoomed out"""
+        words = ["w%d" % i for i in range(20000)]
+        root = self.plot(word_sequence(words), word_sequence(words, shift=3))
+        rects = [
+            rect for rect in root.iter(SVG_NAMESPACE + "rect")
+            if rect.get("height") == "1"
+        ]
+        self.assertLessEqual(len(rects), 2 * (subalign.svg.PLOT_UNITS + 1))
+        self.assertGreater(len(rects), subalign.svg.PLOT_UNITS)
+        self.assertNotIn("w0", [text.text for text in root.iter(SVG_NAMESPACE + "text")])
+
+    def test_window(self):
+        """Check that only the groups within the time window are drawn"""
+        words = ["w%d" % i for i in range(100)]
+        root = self.plot(word_sequence(words), word_sequence(words), min_start=10, max_end=12)
+        texts = [text.text for text in root.iter(SVG_NAMESPACE + "text")]
+        self.assertIn("w20", texts)
+        self.assertNotIn("w19", texts)
+        self.assertNotIn("w24", texts)
+        view_box = [float(value) for value in root.get("viewBox").split()]
+        self.assertAlmostEqual(9.8, view_box[0])
+        self.assertAlmostEqual(2.4, view_box[2])
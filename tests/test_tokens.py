@@ -0,0 +1,93 @@
+"""Tests for subalign.tokens"""
+
+import unittest
+import subalign.tokens
+import subalign.subtitles
+
+# Regression corpus of subtitle texts, with the tokens of the word tokenizer
+# of NLTK 3.6.5 (see requirements.txt)
+CORPUS = [
+    ('"Hello," he said. I can\'t do it...',
+     ["``", "Hello", ",", "''", "he", "said.", "I", "ca", "n't", "do", "it", "..."]),
+    ("Mr. Smith's cat -- 3.5 dollars! (yes)",
+     ["Mr.", "Smith", "'s", "cat", "--", "3.5", "dollars", "!", "(", "yes", ")"]),
+    ("l'homme, aujourd'hui.",
+     ["l'homme", ",", "aujourd'hui", "."]),
+    ("Qu'est-ce que c'est?",
+     ["Qu'est-ce", "que", "c'est", "?"]),
+    ("'Tis the season, 'twas fun.",
+     ["'T", "is", "the", "season", ",", "'t", "was", "fun", "."]),
+    ("I'm gonna wanna gimme that, y'know?",
+     ["I", "'m", "gon", "na", "wan", "na", "gim", "me", "that", ",", "y'know", "?"]),
+    ("We'll see... Won't we?",
+     ["We", "'ll", "see", "...", "Wo", "n't", "we", "?"]),
+    ("- Who's there?\n- Me!",
+     ["-", "Who", "'s", "there", "?", "-", "Me", "!"]),
+    ("It costs $3,50: cheap.",
+     ["It", "costs", "$", "3,50", ":", "cheap", "."]),
+    ("‘Single’ “double” «chevron»",
+     ["‘", "Single", "’", "“", "double", "”", "«", "chevron", "»"]),
+    ("Cannot, lemme, gotta, more'n, D'ye",
+     ["Can", "not", ",", "lem", "me", ",", "got", "ta", ",", "more", "'n", ",", "D", "'ye"]),
+    ("Dogs' bones.",
+     ["Dogs", "'", "bones", "."]),
+    ("I said 'hello' to her",
+     ["I", "said", "'hello", "'", "to", "her"]),
+    ("Time: 10:30, ok,",
+     ["Time", ":", "10:30", ",", "ok", ","]),
+    ("<i>Italic</i> text",
+     ["<", "i", ">", "Italic", "<", "/i", ">", "text"]),
+    ('He\'s... fine."',
+     ["He", "'s", "...", "fine", ".", "''"]),
+    ("U.S.A. is big.",
+     ["U.S.A.", "is", "big", "."]),
+    ("A * B & C @ D # E; F",
+     ["A", "*", "B", "&", "C", "@", "D", "#", "E", ";", "F"]),
+    ("en–dash — em",
+     ["en–dash", "—", "em"]),
+    ("''Two quotes'' and ``backticks``",
+     ["''Two", "quotes", "''", "and", "``", "backticks", "``"]),
+    (".",
+     ["."]),
+    ("",
+     []),
+    ("[Door opens]",
+     ["[", "Door", "opens", "]"]),
+    ("Stop!!! Now?!",
+     ["Stop", "!", "!", "!", "Now", "?", "!"]),
+    ("multi\nline. Cue.",
+     ["multi", "line.", "Cue", "."]),
+]
+
+
+class TokenizeBatchTest(unittest.TestCase):
+
+    """Test case for subalign.tokens.tokenize_batch"""
+
+    def test_regression_corpus(self):
+        """Check that batches yield the tokens of NLTK's word tokenizer"""
+        self.assertEqual(
+            [tokens for _, tokens in CORPUS],
+            subalign.tokens.tokenize_batch([text for text, _ in CORPUS])
+        )
+        self.assertEqual([], subalign.tokens.tokenize_batch([]))
+
+    def test_normalize(self):
+        """Check that punctuation is dropped and non-word characters replaced"""
+        self.assertEqual(
+            ["Hello", "", "", "n t", "aujourd hui"],
+            subalign.tokens.normalize_tokens(
+                ["Hello", ",", "``", "...", "n't", "aujourd'hui", "?!"])
+        )
+
+    def test_subs(self):
+        """Check that only intradiegetic subtitles are tokenized"""
+        subs = [
+            subalign.subtitles.Subtitle(0, 1000, "Hi there!"),
+            subalign.subtitles.Subtitle(1000, 2000, "[MUSIC PLAYING]"),
+            subalign.subtitles.Subtitle(2000, 3000, "Don't go."),
+        ]
+        self.assertEqual(
+            [(subs[0], ["Hi", "there"]), (subs[2], ["Do", "n t", "go"])],
+            subalign.tokens.tokenize_subs(subs, "english", "regex")
+        )
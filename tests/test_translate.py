@@ -1,8 +1,13 @@
 """Tests for subalign.translate"""
 
+import os
 import unittest
 import datetime
+import tempfile
+import unittest.mock
+import subalign.store
 import subalign.sequence
+import subalign.columnar
 import subalign.translate
 
 
@@ -34,3 +39,66 @@ class TranslateTest(unittest.TestCase):
         """Check if unknown words are preseverd during translation"""
         seq = subalign.translate.translate(self.word_sequence, "en", "fr")
         self.assertEqual("odskfjoisdjf", seq[3].word)
+
+
+class CountingTranslator:
+
+    """Imitation of a word2word translator, counting its calls"""
+
+    def __init__(self):
+        self.calls = list()
+
+    def __call__(self, word):
+        self.calls.append(word)
+        if word == "unknown":
+            raise KeyError(word)
+        return [word.upper()]
+
+
+class TranslateWordsTest(unittest.TestCase):
+
+    """Test case for subalign.translate.translate_words"""
+
+    def setUp(self):
+        self.translator = CountingTranslator()
+        self.patch = unittest.mock.patch.dict(
+            subalign.translate.TRANSLATORS, {("xx", "yy"): self.translator})
+        self.patch.start()
+
+    def tearDown(self):
+        self.patch.stop()
+
+    def test_unique(self):
+        """Check that each unique word is translated once"""
+        dtd = datetime.timedelta()
+        sequence = subalign.sequence.WordSequence.from_list([
+            (word, dtd, dtd) for word in ["a", "b", "a", "unknown", "a"]
+        ])
+        translated = subalign.translate.translate(sequence, "xx", "yy")
+        self.assertEqual(["a", "b", "a", "unknown", "a"],
+                         [element.word for element in translated])
+        self.assertEqual(3, len(self.translator.calls))
+
+    def test_columnar(self):
+        """Check that columnar sequences are translated once per word"""
+        dtd = datetime.timedelta()
+        sequence = subalign.columnar.ColumnarWordSequence.from_list([
+            (word, dtd, dtd) for word in ["a", "b", "a", "unknown"]
+        ])
+        translated = subalign.translate.translate(sequence, "xx", "yy")
+        self.assertEqual(["a", "b", "a", "unknown"], [element.word for element in translated])
+        self.assertEqual(["a", "b", "unknown"], sorted(self.translator.calls))
+
+    def test_store(self):
+        """Check that stored translations are not computed again"""
+        with tempfile.TemporaryDirectory() as folder:
+            filename = os.path.join(folder, "translations.sqlite")
+            with subalign.store.TranslationStore(filename, "xx", "yy") as store:
+                subalign.translate.translate_words(["a", "unknown"], "xx", "yy", store)
+            with subalign.store.TranslationStore(filename, "xx", "yy") as store:
+                self.assertEqual(
+                    {"a": "a", "b": "b", "unknown": None},
+                    subalign.translate.translate_words(["a", "b", "unknown"], "xx", "yy", store)
+                )
+        self.assertEqual(3, len(self.translator.calls))
+        self.assertEqual("b", self.translator.calls[-1])